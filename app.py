@@ -1,52 +1,121 @@
 import os
-import random
 import re
 import requests
 import urllib.parse
-import jwt
 import datetime
 from functools import wraps
-from flask import Flask, render_template, request, send_file, jsonify, send_from_directory
-from plexapi.server import PlexServer
-import wikipediaapi
+from flask import Flask, Response, render_template, request, send_file, jsonify, send_from_directory
 from io import BytesIO
+import atexit
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import cache
+import counters
+import database
+import encoding
+import federation
+import library_index
+import matching
+import metrics
+import profiling
+import resilience
+import sampling
+import similarity
+import startup
+import static_assets
+from suggestion_pool import SuggestionPool
+import swipe_receipts
+import title_search
+from token_verification import FailureThrottle, TokenVerifier
+import user_lists
 
 app = Flask(__name__)
+metrics.init_app(app)
+encoding.init_app(app)
+static_assets.init_app(app)
+profiling.init_app(app)
+
+# Reverse proxies / load balancers in front of the app that append X-Forwarded-For.
+# With them trusted, request.remote_addr is the real client, which the /auth/plex throttle is keyed on.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+if TRUSTED_PROXY_HOPS:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS,
+                            x_host=TRUSTED_PROXY_HOPS)
 
 # JWT Secret Key - should be set via environment variable in production
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 
-# Enable sessions for caching
+# Key for signed Flask sessions
 app.secret_key = os.getenv("FLASK_SECRET_KEY", JWT_SECRET_KEY)
 
 # Backend API configuration
 BACKEND_API_URL = os.getenv("BACKEND_API_URL", "https://plex-like.satrawi.cc")
 
-# Plex config from environment
-PLEX_URL = os.getenv("PLEX_URL")
+# Plex config from environment (PLEX_SERVERS adds more servers, see federation.py)
+PLEX_URL = os.getenv("PLEX_URL") or federation.server_url(federation.PRIMARY)
 PLEX_TOKEN = os.getenv("PLEX_TOKEN")
 LIBRARY_NAME = os.getenv("PLEX_LIBRARY", "Movies")
 
-wiki_wiki = wikipediaapi.Wikipedia(
-    user_agent='PlexMovieSuggester/1.0 (example@mail.com)',  # Replace with your contact info
-    language='en'
-)
+# External metadata providers (overridable so benchmarks can point them at local stubs)
+DUCKDUCKGO_URL = os.getenv("DUCKDUCKGO_URL", "https://duckduckgo.com")
+ANILIST_API_URL = os.getenv("ANILIST_API_URL", "https://graphql.anilist.co")
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+
+# Scraped cast photos and trailer links rarely change; found ones are kept this many seconds
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", "86400"))
+actor_image_cache = cache.namespace('actor_images', ttl=SCRAPE_CACHE_TTL, max_local=4096)
+trailer_cache = cache.namespace('trailers', ttl=SCRAPE_CACHE_TTL, max_local=2048)
+
+# Reuse Plex connections for a few minutes instead of reconnecting on every pick
+PLEX_CONNECTION_TTL = int(os.getenv("PLEX_CONNECTION_TTL", "300"))
+MAX_PLEX_CONNECTIONS = 32
+_plex_connections = OrderedDict()
+_plex_connections_lock = threading.Lock()
+
+# Local swipe store used to rank match candidates
+database.init_db()
+
+# Set once warm_up() has succeeded; /health reports 503 until then
+_ready = threading.Event()
+# Why the last warm-up attempt failed, reported by /health
+_warm_up_error = None
+_warm_up_attempts = 0
+
+# Seconds before a failed warm-up is retried, doubling after each failure up to the maximum
+WARM_UP_RETRY_DELAY = float(os.getenv("WARM_UP_RETRY_DELAY", "5"))
+WARM_UP_RETRY_MAX_DELAY = float(os.getenv("WARM_UP_RETRY_MAX_DELAY", "300"))
+
+def check_plex_token(plex_token, plex_url):
+    """Ask Plex whether it accepts a token; raises when Plex could not answer"""
+    # Deferred so workers boot without loading plexapi
+    from plexapi.exceptions import Unauthorized
+    from plexapi.server import PlexServer
+    with metrics.span('plex') as span:
+        try:
+            # Try to access server info to verify token
+            PlexServer(plex_url, plex_token).machineIdentifier
+        except Unauthorized:
+            span.outcome = 'http_4xx'
+            return False
+    return True
+
+# Verified and rejected tokens are remembered, so page loads and refresh storms skip the Plex handshake
+token_verifier = TokenVerifier(check_plex_token)
+auth_throttle = FailureThrottle()
 
 def verify_plex_token(plex_token, plex_url=None):
-    """Verify if the provided Plex token is valid"""
-    try:
-        url = plex_url or PLEX_URL
-        if not url:
-            return False
-        plex = PlexServer(url, plex_token)
-        # Try to access server info to verify token
-        plex.machineIdentifier
-        return True
-    except Exception:
+    """Verify if the provided Plex token is valid: True, False, or None when Plex could not be reached"""
+    url = plex_url or PLEX_URL
+    if not url or not plex_token:
         return False
+    return token_verifier.verify(plex_token, url)
 
 def generate_jwt_token(plex_token):
     """Generate JWT token for authenticated user"""
+    import jwt
     payload = {
         'plex_token': plex_token,
         'exp': datetime.datetime.utcnow() + datetime.timedelta(days=30),
@@ -57,11 +126,13 @@ def generate_jwt_token(plex_token):
 def get_backend_jwt_token(plex_token):
     """Get JWT token from backend service using Plex token"""
     try:
-        response = requests.post(
-            f"{BACKEND_API_URL}/auth/plex",
-            json={"plex_token": plex_token},
-            timeout=10
-        )
+        with metrics.span('backend') as span:
+            response = requests.post(
+                f"{BACKEND_API_URL}/auth/plex",
+                json={"plex_token": plex_token},
+                timeout=10
+            )
+            span.outcome = metrics.http_outcome(response)
         if response.status_code == 200:
             data = response.json()
             return data.get('token')
@@ -96,18 +167,20 @@ def require_jwt_auth(f):
     
     return decorated_function
 
-def make_backend_request(method, endpoint, headers=None, json_data=None, params=None):
-    """Make authenticated request to backend API"""
+def make_backend_request(method, endpoint, headers=None, json_data=None, params=None, session=None):
+    """Make authenticated request to backend API, optionally over a shared requests.Session"""
     url = f"{BACKEND_API_URL}{endpoint}"
     try:
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=headers or {},
-            json=json_data,
-            params=params,
-            timeout=10
-        )
+        with metrics.span('backend') as span:
+            response = (session or requests).request(
+                method=method,
+                url=url,
+                headers=headers or {},
+                json=json_data,
+                params=params,
+                timeout=10
+            )
+            span.outcome = metrics.http_outcome(response)
         return response
     except Exception as e:
         print(f"Backend request failed: {e}")
@@ -115,6 +188,7 @@ def make_backend_request(method, endpoint, headers=None, json_data=None, params=
 
 def verify_jwt_token(token):
     """Verify and decode JWT token"""
+    import jwt
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
         return payload
@@ -151,13 +225,16 @@ def token_required(f):
 
 def get_wikipedia_actor_image(actor_name):
     try:
-        url = f"https://en.wikipedia.org/w/api.php?action=query&titles={actor_name}&prop=pageimages&format=json&pithumbsize=200"
-        resp = requests.get(url, timeout=2).json()
-        pages = resp.get("query", {}).get("pages", {})
-        for pageid, pagedata in pages.items():
-            thumbnail = pagedata.get("thumbnail", {})
-            if thumbnail:
-                return thumbnail.get("source")
+        url = f"{WIKIPEDIA_API_URL}?action=query&titles={actor_name}&prop=pageimages&format=json&pithumbsize=200"
+        with metrics.span('wikipedia') as span, resilience.guard('wikipedia', timeout=2) as call:
+            resp = call.check(requests.get(url, timeout=call.timeout)).json()
+            span.outcome = 'miss'
+            pages = resp.get("query", {}).get("pages", {})
+            for pageid, pagedata in pages.items():
+                thumbnail = pagedata.get("thumbnail", {})
+                if thumbnail:
+                    span.outcome = 'ok'
+                    return thumbnail.get("source")
     except Exception:
         pass
     return None  # Always return None if anything fails
@@ -169,11 +246,13 @@ def get_imdb_actor_image(actor_name):
     """
     try:
         # Use DuckDuckGo image search as a simple, free workaround (not official IMDB API)
-        search_url = f"https://duckduckgo.com/?q={actor_name}+imdb&iax=images&ia=images"
+        search_url = f"{DUCKDUCKGO_URL}/?q={actor_name}+imdb&iax=images&ia=images"
         headers = {"User-Agent": "Mozilla/5.0"}
-        html = requests.get(search_url, headers=headers, timeout=3).text
-        # Find first image URL in the HTML (very basic, not robust)
-        match = re.search(r'"image":"(https://[^"]+?)"', html)
+        with metrics.span('duckduckgo') as span, resilience.guard('duckduckgo', timeout=3) as call:
+            html = call.check(requests.get(search_url, headers=headers, timeout=call.timeout)).text
+            # Find first image URL in the HTML (very basic, not robust)
+            match = re.search(r'"image":"(https://[^"]+?)"', html)
+            span.outcome = 'ok' if match else 'miss'
         if match:
             return match.group(1).replace("\\/", "/")
     except Exception:
@@ -197,153 +276,324 @@ def get_anilist_actor_image(actor_name):
         }
         '''
         variables = {"search": actor_name}
-        url = "https://graphql.anilist.co"
-        response = requests.post(url, json={"query": query, "variables": variables}, timeout=3)
-        data = response.json()
-        image = (
-            data.get("data", {})
-                .get("Staff", {})
-                .get("image", {})
-                .get("large")
-        )
+        url = ANILIST_API_URL
+        with metrics.span('anilist') as span, resilience.guard('anilist', timeout=3) as call:
+            response = call.check(requests.post(url, json={"query": query, "variables": variables}, timeout=call.timeout))
+            data = response.json()
+            image = (
+                data.get("data", {})
+                    .get("Staff", {})
+                    .get("image", {})
+                    .get("large")
+            )
+            span.outcome = 'ok' if image else 'miss'
         return image
     except Exception:
         return None
 
+def plex_server_url(server=None):
+    """Base URL of a Plex server by name, the primary one by default"""
+    if server in (None, federation.PRIMARY):
+        return PLEX_URL
+    url = federation.server_url(server)
+    if url is None:
+        raise KeyError(f"Unknown Plex server: {server}")
+    return url
+
+def get_plex_server(plex_token, server=None):
+    """Return a PlexServer connection for a token, reusing recent ones (and their HTTP sessions)"""
+    url = plex_server_url(server)
+    key = hashlib.sha256(f"{url} {plex_token}".encode('utf-8')).hexdigest()
+    now = time.time()
+    with _plex_connections_lock:
+        entry = _plex_connections.get(key)
+        if entry and now - entry[1] < PLEX_CONNECTION_TTL:
+            _plex_connections.move_to_end(key)
+            metrics.cache_event('plex_connection', True)
+            return entry[0]
+
+    metrics.cache_event('plex_connection', False)
+    from plexapi.server import PlexServer
+    plex = PlexServer(url, plex_token)
+    with _plex_connections_lock:
+        _plex_connections[key] = (plex, now)
+        _plex_connections.move_to_end(key)
+        while len(_plex_connections) > MAX_PLEX_CONNECTIONS:
+            _plex_connections.popitem(last=False)
+    return plex
+
+def poster_url(thumb, server=None):
+    """Poster proxy URL for a Plex thumb, naming its server unless it is the primary one"""
+    if not thumb:
+        return "https://avatars.githubusercontent.com/u/72304665?v=4"
+    if server in (None, federation.PRIMARY):
+        return f"/poster{thumb}"
+    return f"/poster{thumb}?server={urllib.parse.quote(server)}"
+
+def parse_item_ids(ids):
+    """(server, rating_key) pairs for federated item ids, skipping malformed ones"""
+    pairs = set()
+    for value in ids or ():
+        try:
+            pairs.add(federation.parse_item_id(value))
+        except ValueError:
+            continue
+    return pairs
+
 def get_plex_libraries(plex_token=None):
     # Use provided token or fallback to environment variable
     token = plex_token or PLEX_TOKEN
     if not PLEX_URL or not token:
         return []
+
+    def sections(server):
+        with metrics.span('plex'):
+            return get_plex_server(token, server).library.sections()
+
     try:
-        plex = PlexServer(PLEX_URL, token)
-        # Include all video types (movie, show, etc.)
-        return [
-            {"title": section.title, "type": section.type}
-            for section in plex.library.sections()
-            if section.type in ("movie", "show", "anime", "other", "artist")
-        ]
+        # Libraries with the same title on several servers are listed once
+        libraries = OrderedDict()
+        for server, server_sections in federation.fan_out(sections, federation.SERVERS).items():
+            # Include all video types (movie, show, etc.)
+            for section in server_sections:
+                if section.type in ("movie", "show", "anime", "other", "artist"):
+                    library = libraries.setdefault(section.title, {"title": section.title, "type": section.type, "servers": []})
+                    library["servers"].append(server)
+        return list(libraries.values())
     except Exception:
         return []
 
-def get_random_movie_lightweight(library_name=None, plex_token=None):
-    """Optimized version for match rooms - only gets essential data"""
+def sample_servers(plex_token, library_name, count, exclude=None):
+    """
+    Up to count random unwatched (server, item) pairs from a library on every
+    Plex server that has it. Servers are asked concurrently and slow ones are
+    skipped; picks are spread over servers by their unwatched counts, and a
+    title found on several servers is only returned once.
+    """
+    from plexapi.exceptions import NotFound
+    excluded = parse_item_ids(exclude)
+    federated = federation.is_federated()
+
+    def sample(server):
+        server_exclude = {str(rating_key) for name, rating_key in excluded if name == server}
+        try:
+            with metrics.span('plex'):
+                section = get_plex_server(plex_token, server).library.section(library_name)
+                # Let Plex pick random unwatched items instead of listing the whole section
+                items = sampling.sample_unwatched(section, count, server_exclude)
+                weight = sampling.count_unwatched(section) if federated and items else len(items)
+        except NotFound:
+            return [], 0  # This server has no library by that name
+        return items, weight
+
+    results = federation.fan_out(sample, federation.SERVERS)
+    if not results:
+        raise RuntimeError("No Plex server answered")
+    return federation.sample_merged(
+        {server: items for server, (items, _) in results.items()},
+        count,
+        weights={server: weight for server, (_, weight) in results.items()},
+    )
+
+def get_random_movies_lightweight(library_name=None, plex_token=None, count=1, exclude=None):
+    """Optimized version for match rooms - only gets essential data for up to count items"""
     # Use provided token or fallback to environment variable
     token = plex_token or PLEX_TOKEN
     if not PLEX_URL or not token:
-        return "⚠️ Please set PLEX_URL and PLEX_TOKEN environment variables.", None
+        return "⚠️ Please set PLEX_URL and PLEX_TOKEN environment variables.", []
 
     try:
-        plex = PlexServer(PLEX_URL, token)
-        lib_name = library_name or LIBRARY_NAME
-        section = plex.library.section(lib_name)
-        
-        # Suggest a random unwatched movie or show
-        if section.type == "movie":
-            items = section.search(unwatched=True)
-        elif section.type in ("show", "anime"):
-            # Suggest a random show with unwatched episodes
-            shows = section.search()
-            items = [show for show in shows if any(not ep.isWatched for ep in show.episodes())]
-        else:
-            items = section.search(unwatched=True)
-
-        if not items:
-            return "✅ No unwatched items found!", None
+        with metrics.stage('pick'):
+            picks = sample_servers(token, library_name or LIBRARY_NAME, count, exclude)
 
-        item = random.choice(items)
+        if not picks:
+            return "✅ No unwatched items found!", []
 
-        # Only get essential data - no expensive operations
-        # Poster URL with token or fallback
-        if getattr(item, "thumb", None):
+        items = []
+        for server, item in picks:
+            # Only get essential data - no expensive operations
+            item.server_name = server
             # Use proxy route instead of direct Plex URL
-            item.poster_url = f"/poster{item.thumb}"
-        else:
-            item.poster_url = "https://avatars.githubusercontent.com/u/72304665?v=4"
+            item.poster_url = poster_url(getattr(item, "thumb", None), server)
 
-        # Watch on Plex URL
-        try:
-            item.watch_url = f"{PLEX_URL}/web/index.html#!/server/{plex.machineIdentifier}/details?key=/library/metadata/{item.ratingKey}"
-        except Exception:
-            item.watch_url = None
+            # Watch on Plex URL
+            try:
+                server_id = get_plex_server(token, server).machineIdentifier
+                item.watch_url = f"{plex_server_url(server)}/web/index.html#!/server/{server_id}/details?key=/library/metadata/{item.ratingKey}"
+            except Exception:
+                item.watch_url = None
+            items.append(item)
 
-        return None, item
+        return None, items
 
     except Exception as e:
-        return f"❌ Error getting random movie: {str(e)}", None
+        return f"❌ Error getting random movie: {str(e)}", []
+
+def get_random_movie_lightweight(library_name=None, plex_token=None):
+    """Optimized version for match rooms - only gets essential data"""
+    error, items = get_random_movies_lightweight(library_name, plex_token, count=1)
+    return error, (items[0] if items else None)
+
+def is_unwatched(item):
+    """Whether a movie is unwatched, or a show still has unwatched episodes"""
+    if item.type == 'show':
+        return item.viewedLeafCount < item.leafCount
+    return not item.isWatched
+
+def scan_library(plex_token, library_name):
+    """Snapshot records of a library on every Plex server, each title once (server order decides)"""
+    from plexapi.exceptions import NotFound
+
+    def scan(server):
+        try:
+            section = get_plex_server(plex_token, server).library.section(library_name)
+        except NotFound:
+            return []
+        return [(federation.item_guid(server, item), library_index.item_record(item, server)) for item in section.all()]
+
+    # A snapshot missing a server would hide its titles until the next rebuild, so wait for every one
+    results = federation.fan_out(scan, federation.SERVERS, budget=None)
+    if not results:
+        raise RuntimeError(f"Library {library_name} could not be scanned")
+    seen = set()
+    records = []
+    for scanned in results.values():
+        for guid, record in scanned:
+            if guid not in seen:
+                seen.add(guid)
+                records.append(record)
+    return records
+
+def get_library_snapshot(plex_token, library_name):
+    """The library snapshot of a token, merged across Plex servers"""
+    return library_index.get_snapshot(lambda: scan_library(plex_token, library_name), plex_token, library_name)
+
+# Random unwatched items looked at per server to serve facet filters while a library snapshot is built
+LIVE_FILTER_SAMPLE = int(os.getenv("LIVE_FILTER_SAMPLE", "100"))
+
+def sample_filtered_live(plex_token, library_name, filters, count, exclude=None):
+    """
+    Random unwatched Plex items matching facet filters, straight from Plex:
+    one page of Plex's random sort per server, filtered here. Used until the
+    library snapshot exists; narrow filters may find fewer than count.
+    """
+    from plexapi.exceptions import NotFound
+    excluded = parse_item_ids(exclude)
 
-def get_random_movie(library_name=None, plex_token=None):
+    def sample(server):
+        server_exclude = {str(rating_key) for name, rating_key in excluded if name == server}
+        try:
+            section = get_plex_server(plex_token, server).library.section(library_name)
+        except NotFound:
+            return []
+        items = sampling.sample_unwatched(section, LIVE_FILTER_SAMPLE, server_exclude, mode='random')
+        return [item for item in items if library_index.matches(library_index.item_record(item, server), filters)]
+
+    results = federation.fan_out(sample, federation.SERVERS)
+    picks = federation.sample_merged(results, count, weights={server: len(items) for server, items in results.items()})
+    for server, item in picks:
+        item.server_name = server
+    return [item for _, item in picks]
+
+def sample_filtered_items(plex_token, library_name, filters, count, exclude=None):
+    """Random unwatched Plex items matching facet filters, drawn from the library snapshot"""
+    try:
+        snapshot = get_library_snapshot(plex_token, library_name)
+    except library_index.SnapshotPending:
+        return sample_filtered_live(plex_token, library_name, filters, count, exclude)
+    items = []
+    # The snapshot can be a few minutes old, so skip anything watched since it was built
+    for record in snapshot.sample(snapshot.mask(filters), count + sampling.MAX_EXTRA_ATTEMPTS, parse_item_ids(exclude)):
+        item = get_plex_server(plex_token, record['server']).fetchItem(record['rating_key'])
+        if is_unwatched(item):
+            item.server_name = record['server']
+            items.append(item)
+            if len(items) == count:
+                break
+    return items
+
+def get_random_movie(library_name=None, plex_token=None, filters=None):
     # Use provided token or fallback to environment variable
     token = plex_token or PLEX_TOKEN
     if not PLEX_URL or not token:
         return "⚠️ Please set PLEX_URL and PLEX_TOKEN environment variables.", None
 
     try:
-        plex = PlexServer(PLEX_URL, token)
-        server_id = plex.machineIdentifier
-        lib_name = library_name or LIBRARY_NAME
-        section = plex.library.section(lib_name)
-        # Suggest a random unwatched movie or show
-        if section.type == "movie":
-            items = section.search(unwatched=True)
-        elif section.type in ("show", "anime"):
-            # Suggest a random show with unwatched episodes
-            shows = section.search()
-            items = [show for show in shows if any(not ep.isWatched for ep in show.episodes())]
-        else:
-            items = section.search(unwatched=True)
+        with metrics.stage('pick'):
+            lib_name = library_name or LIBRARY_NAME
+            if filters:
+                with metrics.span('plex'):
+                    items = sample_filtered_items(token, lib_name, filters, 1)
+            else:
+                # Suggest a random unwatched movie or show, sampled on the Plex side
+                items = []
+                for server, item in sample_servers(token, lib_name, 1):
+                    item.server_name = server
+                    items.append(item)
 
         if not items:
+            if filters:
+                return "✅ No unwatched items match those filters!", None
             return "✅ No unwatched items found!", None
 
-        item = random.choice(items)
+        item = items[0]
+        server = item.server_name
+        server_url = plex_server_url(server)
 
-        # Poster URL with token or fallback
-        if getattr(item, "thumb", None):
-            # Use proxy route instead of direct Plex URL
-            item.poster_url = f"/poster{item.thumb}"
-        else:
-            item.poster_url = "https://avatars.githubusercontent.com/u/72304665?v=4"
+        # Poster URL with token or fallback (via the proxy route instead of direct Plex URL)
+        item.poster_url = poster_url(getattr(item, "thumb", None), server)
 
         # Top 5 cast with images (Plex thumb, then IMDB, then Wikipedia, else always placeholder)
         cast = []
-        for actor in getattr(item, "roles", [])[:5]:
-            # 1. Try Plex thumb
-            if getattr(actor, "thumb", None):
-                actor_thumb = f"{PLEX_URL}{actor.thumb}?X-Plex-Token={token}"
-            else:
-                # 2. Try IMDB (via DuckDuckGo image search)
-                actor_thumb = get_imdb_actor_image(actor.tag)
-                # 3. Try AniList (for anime/voice actors)
-                if not actor_thumb:
-                    actor_thumb = get_anilist_actor_image(actor.tag)
-                # 4. Try Wikipedia
-                if not actor_thumb:
-                    actor_thumb = get_wikipedia_actor_image(actor.tag)
-                # 5. Fallback to placeholder if all else fails
-                if not actor_thumb:
-                    actor_thumb = "https://avatars.githubusercontent.com/u/72304665?v=4"
-            cast.append({
-                "name": actor.tag,
-                "thumb": actor_thumb
-            })
+        with metrics.stage('cast'):
+            actors = getattr(item, "roles", [])[:5]
+            # Scraped photos are shared by all replicas, looked up for the whole cast at once
+            scraped = actor_image_cache.get_many([actor.tag for actor in actors if not getattr(actor, "thumb", None)])
+            for actor in actors:
+                # 1. Try Plex thumb
+                if getattr(actor, "thumb", None):
+                    actor_thumb = f"{server_url}{actor.thumb}?X-Plex-Token={token}"
+                elif actor.tag in scraped:
+                    actor_thumb = scraped[actor.tag]
+                else:
+                    # 2. Try IMDB (via DuckDuckGo image search)
+                    actor_thumb = get_imdb_actor_image(actor.tag)
+                    # 3. Try AniList (for anime/voice actors)
+                    if not actor_thumb:
+                        actor_thumb = get_anilist_actor_image(actor.tag)
+                    # 4. Try Wikipedia
+                    if not actor_thumb:
+                        actor_thumb = get_wikipedia_actor_image(actor.tag)
+                    # 5. Fallback to placeholder if all else fails (not cached, so a degraded provider is retried later)
+                    if actor_thumb:
+                        actor_image_cache.set(actor.tag, actor_thumb)
+                    else:
+                        actor_thumb = "https://avatars.githubusercontent.com/u/72304665?v=4"
+                cast.append({
+                    "name": actor.tag,
+                    "thumb": actor_thumb
+                })
         item.cast = cast
 
         # External Trailer URL (YouTube/TMDB)
         try:
-            item.external_trailer_url = get_external_trailer_url(item.title, getattr(item, 'year', None))
+            with metrics.stage('trailer'):
+                item.external_trailer_url = get_external_trailer_url(item.title, getattr(item, 'year', None))
         except Exception:
             item.external_trailer_url = None
 
         # Plex Trailer URL (if available) - keeping for compatibility
         try:
-            trailer = next((e for e in getattr(item, "extras", lambda: [])() if 'trailer' in e.type.lower()), None)
+            with metrics.stage('extras'), metrics.span('plex'):
+                trailer = next((e for e in getattr(item, "extras", lambda: [])() if 'trailer' in e.type.lower()), None)
             item.trailer_url = trailer.url if trailer else None
         except Exception:
             item.trailer_url = None
 
         # Watch on Plex URL
-        item.watch_url = f"{PLEX_URL}/web/index.html#!/server/{server_id}/details?key={item.key}"
+        with metrics.span('plex'):
+            server_id = get_plex_server(token, server).machineIdentifier
+        item.watch_url = f"{server_url}/web/index.html#!/server/{server_id}/details?key={item.key}"
 
         # Add summary fallback
         if not getattr(item, "summary", None):
@@ -367,6 +617,11 @@ def get_external_trailer_url(title, year=None):
     Try to fetch external trailer URL from YouTube or TMDB.
     Returns trailer URL or None.
     """
+    cache_key = f"{title}|{year or ''}"
+    cached = trailer_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # Clean title for search
         search_title = title.replace(":", "").replace("-", " ")
@@ -377,22 +632,26 @@ def get_external_trailer_url(title, year=None):
         
         # Try YouTube search via DuckDuckGo (simple approach)
         query = urllib.parse.quote_plus(search_query + " site:youtube.com")
-        search_url = f"https://duckduckgo.com/html/?q={query}"
+        search_url = f"{DUCKDUCKGO_URL}/html/?q={query}"
         
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         
-        response = requests.get(search_url, headers=headers, timeout=5)
-        html = response.text
-        
-        # Look for YouTube URLs in the response
-        youtube_pattern = r'https://www\.youtube\.com/watch\?v=([a-zA-Z0-9_-]+)'
-        matches = re.findall(youtube_pattern, html)
+        with metrics.span('duckduckgo') as span, resilience.guard('duckduckgo', timeout=5) as call:
+            response = call.check(requests.get(search_url, headers=headers, timeout=call.timeout))
+            html = response.text
+            
+            # Look for YouTube URLs in the response
+            youtube_pattern = r'https://www\.youtube\.com/watch\?v=([a-zA-Z0-9_-]+)'
+            matches = re.findall(youtube_pattern, html)
+            span.outcome = 'ok' if matches else 'miss'
         
         if matches:
-            # Return the first YouTube URL found
-            return f"https://www.youtube.com/watch?v={matches[0]}"
+            # Return the first YouTube URL found (search fallbacks below are not cached)
+            trailer_url = f"https://www.youtube.com/watch?v={matches[0]}"
+            trailer_cache.set(cache_key, trailer_url)
+            return trailer_url
             
     except Exception:
         pass
@@ -411,6 +670,56 @@ def get_external_trailer_url(title, year=None):
     
     return None
 
+def movie_to_suggestion_data(movie):
+    """Convert an enriched movie object to a dictionary for JSON responses and templates"""
+    return {
+        'key': getattr(movie, 'key', ''),
+        'title': getattr(movie, 'title', ''),
+        'year': getattr(movie, 'year', ''),
+        'summary': getattr(movie, 'summary', ''),
+        'poster_url': getattr(movie, 'poster_url', ''),
+        'watch_url': getattr(movie, 'watch_url', ''),
+        'trailer_url': getattr(movie, 'trailer_url', ''),
+        'external_trailer_url': getattr(movie, 'external_trailer_url', ''),
+        'cast': getattr(movie, 'cast', [])
+    }
+
+def build_pooled_suggestion(plex_token, library_name):
+    """Enrich a random suggestion in the background for the suggestion pool"""
+    error, movie = get_random_movie(library_name, plex_token)
+    if error:
+        return None
+    return federation.item_id(movie.server_name, movie.ratingKey), movie_to_suggestion_data(movie)
+
+def is_still_unwatched(plex_token, movie_id):
+    """Check a pooled suggestion has not been watched since it was enriched"""
+    try:
+        server, rating_key = federation.parse_item_id(movie_id)
+        with metrics.span('plex'):
+            item = get_plex_server(plex_token, server).fetchItem(rating_key)
+        return is_unwatched(item)
+    except Exception:
+        return False
+
+suggestion_pool = SuggestionPool(build_pooled_suggestion, is_still_unwatched)
+atexit.register(suggestion_pool.shutdown)
+
+def get_suggestion(library_name=None, plex_token=None, filters=None):
+    """Return (error, movie_data), served from the suggestion pool when one is ready"""
+    library_name = library_name or LIBRARY_NAME
+    token = plex_token or PLEX_TOKEN
+    # Pooled suggestions are unfiltered, so faceted requests always pick fresh
+    if token and not filters:
+        movie_data = suggestion_pool.take(token, library_name)
+        metrics.cache_event('suggestion_pool', movie_data is not None)
+        if movie_data is not None:
+            return None, movie_data
+
+    error, movie = get_random_movie(library_name, token, filters)
+    if error:
+        return error, None
+    return None, movie_to_suggestion_data(movie)
+
 
 @app.route("/auth/plex", methods=["POST"])
 def plex_auth():
@@ -421,9 +730,26 @@ def plex_auth():
             return jsonify({'error': 'Plex token is required'}), 400
         
         plex_token = data['plex_token']
-        
+        if not isinstance(plex_token, str):
+            return jsonify({'error': 'Plex token must be a string'}), 400
+
+        # Clients that keep sending bad tokens are refused before Plex is asked again,
+        # unless the token is one Plex already accepted. Behind a proxy this is only the
+        # client's own address when TRUSTED_PROXY_HOPS is set.
+        client = request.remote_addr or 'unknown'
+        if not token_verifier.is_known_valid(plex_token, PLEX_URL):
+            retry_after = auth_throttle.retry_after(client)
+            if retry_after:
+                response = jsonify({'error': 'Too many invalid Plex tokens, try again later'})
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+
         # Verify the Plex token
-        if not verify_plex_token(plex_token):
+        valid = verify_plex_token(plex_token)
+        if valid is None:
+            return jsonify({'error': 'Could not reach Plex to verify the token'}), 503
+        if not valid:
+            auth_throttle.record_failure(client)
             return jsonify({'error': 'Invalid Plex token'}), 401
         
         # Generate JWT token
@@ -453,29 +779,295 @@ def api_suggest():
     """Get random movie suggestion for authenticated user"""
     try:
         library_name = request.args.get("library")
-        error, movie = get_random_movie(library_name, request.plex_token)
+        try:
+            filters = library_index.parse_filters(request.args)
+        except library_index.FacetError as e:
+            return jsonify({'error': str(e)}), 400
+
+        error, movie_data = get_suggestion(library_name, request.plex_token, filters)
         
         if error:
             return jsonify({'error': error}), 400
         
-        # Convert movie object to dictionary for JSON response
-        movie_data = {
-            'title': getattr(movie, 'title', ''),
-            'year': getattr(movie, 'year', ''),
-            'summary': getattr(movie, 'summary', ''),
-            'poster_url': getattr(movie, 'poster_url', ''),
-            'watch_url': getattr(movie, 'watch_url', ''),
-            'trailer_url': getattr(movie, 'trailer_url', ''),
-            'external_trailer_url': getattr(movie, 'external_trailer_url', ''),
-            'cast': getattr(movie, 'cast', [])
-        }
-        
         return jsonify({'movie': movie_data})
     except Exception as e:
         return jsonify({'error': f'Failed to get suggestion: {str(e)}'}), 500
 
+def find_record_live(plex_token, library_name, server, rating_key):
+    """Snapshot-style record of an item in a library, fetched from Plex; None if it is not there"""
+    from plexapi.exceptions import NotFound
+    try:
+        with metrics.span('plex'):
+            item = get_plex_server(plex_token, server).fetchItem(rating_key)
+    except NotFound:
+        return None
+    # Read from the XML: a missing attribute on a plexapi object reloads the item
+    section_title = item._data.attrib.get('librarySectionTitle')
+    if section_title and section_title != library_name:
+        return None
+    return library_index.item_record(item, server)
+
+# Seconds clients are told to wait for facet counts while a library snapshot is built
+SNAPSHOT_RETRY_AFTER = 30
+
+def search_live(plex_token, library_name, query, limit, unwatched_only):
+    """
+    Title search straight from Plex (substring matches, unranked), used
+    until the library snapshot and its title index exist
+    """
+    from plexapi.exceptions import NotFound
+    if not query.strip():
+        return []
+
+    def search(server):
+        try:
+            section = get_plex_server(plex_token, server).library.section(library_name)
+        except NotFound:
+            return []
+        filters = {'title': query}
+        if unwatched_only:
+            filters['unwatched'] = True
+        return section.search(maxresults=limit, **filters)
+
+    with metrics.span('plex'):
+        results = federation.fan_out(search, federation.SERVERS)
+    movies = []
+    for server, item in federation.merge_unique(results)[:limit]:
+        record = library_index.item_record(item, server)
+        movies.append({
+            **record_to_match_data(record),
+            'original_title': record['original_title'],
+            'unwatched': record['unwatched'],
+            'score': None,
+        })
+    return movies
+
+@app.route("/api/facets", methods=["GET"])
+@token_required
+def api_facets():
+    """Get unwatched item counts per genre, decade, content rating and runtime bucket"""
+    try:
+        library_name = request.args.get("library") or LIBRARY_NAME
+        try:
+            filters = library_index.parse_filters(request.args)
+        except library_index.FacetError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            with metrics.span('plex'):
+                snapshot = get_library_snapshot(request.plex_token, library_name)
+        except library_index.SnapshotPending as e:
+            # Counting facets live would mean listing the whole library, which is what the build is doing
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = str(SNAPSHOT_RETRY_AFTER)
+            return response, 503
+        return jsonify({
+            'library': library_name,
+            'total': snapshot.mask(filters).bit_count(),
+            'facets': snapshot.facet_counts(filters),
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to get facets: {str(e)}'}), 500
+
+@app.route("/api/search", methods=["GET"])
+@token_required
+def api_search():
+    """Typeahead search over the titles, original titles and years of a library"""
+    try:
+        library_name = request.args.get("library") or LIBRARY_NAME
+        query = request.args.get("q", "")
+        limit = min(max(request.args.get('limit', 10, type=int), 1), title_search.MAX_SEARCH_RESULTS)
+        unwatched_only = request.args.get('unwatched', '').lower() in ('1', 'true', 'yes')
+
+        try:
+            with metrics.span('plex'):
+                snapshot = get_library_snapshot(request.plex_token, library_name)
+        except library_index.SnapshotPending:
+            movies = search_live(request.plex_token, library_name, query, limit, unwatched_only)
+            return jsonify({'library': library_name, 'query': query, 'movies': movies})
+        results = title_search.get_index(snapshot).search(
+            query, limit, mask=snapshot.unwatched if unwatched_only else None)
+
+        unwatched = snapshot.unwatched
+        movies = []
+        for i, score in results:
+            record = snapshot.record(i)
+            movies.append({
+                **record_to_match_data(record),
+                'original_title': record['original_title'],
+                'unwatched': bool(unwatched >> i & 1),
+                'score': score,
+            })
+        return jsonify({'library': library_name, 'query': query, 'movies': movies})
+    except Exception as e:
+        return jsonify({'error': f'Failed to search: {str(e)}'}), 500
+
 # ==================== MOVIE MATCH API ENDPOINTS ====================
 
+# A participant's swipes in a room, shared by all replicas (refreshed every 30 seconds)
+room_swipe_cache = cache.namespace('room_swipes', ttl=30, max_local=512)
+
+def room_swipe_key(room_id, plex_token):
+    return f"{room_id}:{get_user_key(plex_token)}"
+
+def get_room_swipe_state(room_id, backend_token):
+    """Return (swiped_movies, library_name) for the current user in a room, cached for all replicas"""
+    cache_key = room_swipe_key(room_id, request.plex_token)
+    cached_data = room_swipe_cache.get(cache_key)
+    if cached_data is not None:
+        return set(cached_data['swiped_movies']), cached_data['library_name']
+
+    # Fetch both room info and user swipes
+    import concurrent.futures
+
+    def get_swipes():
+        response = make_backend_request(
+            'GET',
+            f'/match/rooms/{room_id}/user-swipes',
+            headers={'Authorization': f'Bearer {backend_token}'}
+        )
+        if response and response.status_code == 200:
+            return set(response.json().get('swiped_movies', []))
+        return set()
+
+    def get_room():
+        response = make_backend_request(
+            'GET',
+            f'/match/rooms/{room_id}',
+            headers={'Authorization': f'Bearer {backend_token}'}
+        )
+        if response and response.status_code == 200:
+            return response.json().get('library_filter', 'Movies')
+        return 'Movies'
+
+    # Execute both requests in parallel
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        swipes_future = executor.submit(get_swipes)
+        room_future = executor.submit(get_room)
+
+        swiped_movies = swipes_future.result()
+        library_name = room_future.result()
+
+    # Cache the results
+    room_swipe_cache.set(cache_key, {
+        'swiped_movies': list(swiped_movies),
+        'library_name': library_name,
+    })
+    return swiped_movies, library_name
+
+def get_user_key(plex_token):
+    """Stable, non-reversible identifier for a Plex token"""
+    return hashlib.sha256(plex_token.encode('utf-8')).hexdigest()[:16]
+
+def movie_to_match_data(movie):
+    """Minimal movie data for match rooms"""
+    return {
+        'id': federation.item_id(getattr(movie, 'server_name', None), movie.ratingKey),
+        'title': getattr(movie, 'title', ''),
+        'year': getattr(movie, 'year', ''),
+        'summary': getattr(movie, 'summary', ''),
+        'poster_url': getattr(movie, 'poster_url', ''),
+    }
+
+def record_to_match_data(record):
+    """Minimal movie data for match rooms from a library snapshot record"""
+    return {
+        'id': federation.item_id(record['server'], record['rating_key']),
+        'title': record['title'],
+        'year': record['year'] or '',
+        'summary': record['summary'],
+        'poster_url': poster_url(record['thumb'], record['server']),
+    }
+
+def schedule_match_movies(room_id, library_name, plex_token, swiped_movies, count, filters=None):
+    """
+    Pick movies for a participant, interleaving titles other participants
+    already liked (ranked by partial agreement) with random exploration picks.
+    With facet filters both kinds of pick are restricted to matching titles.
+    swiped_movies is updated with everything returned.
+    """
+    try:
+        room_swipes = database.get_room_swipes(room_id)
+    except Exception as e:
+        print(f"Failed to load room swipes: {e}")
+        room_swipes = []
+
+    exploit = matching.rank_candidates(room_swipes, get_user_key(plex_token), exclude=swiped_movies)
+
+    snapshot = mask = None
+    if filters:
+        try:
+            with metrics.span('plex'):
+                snapshot = get_library_snapshot(plex_token, library_name)
+        except library_index.SnapshotPending:
+            pass  # Picks are checked against the filters as they are fetched from Plex
+        else:
+            mask = snapshot.mask(filters)
+            exploit = [candidate for candidate in exploit
+                       if any(snapshot.contains(rating_key, mask, server)
+                              for server, rating_key in parse_item_ids([candidate['id']]))]
+
+    # Titles participants searched for and added come first, in the order they were added
+    try:
+        pooled = [movie for movie in database.get_room_pool(room_id) if movie['id'] not in swiped_movies]
+    except Exception as e:
+        print(f"Failed to load room pool: {e}")
+        pooled = []
+    pooled = pooled[:count]
+    movies = []
+    for movie in pooled:
+        swiped_movies.add(movie['id'])
+        movies.append(movie)
+    count -= len(movies)
+    if not count:
+        return movies
+
+    exploit_ids = {candidate['id'] for candidate in exploit}
+    explore_pool = None
+
+    def explore():
+        nonlocal explore_pool
+        if explore_pool is None:
+            # Sample the whole batch in one go, skipping swiped and agreement titles on the way
+            if snapshot is not None:
+                exclude = parse_item_ids(swiped_movies | exploit_ids)
+                explore_pool = [record_to_match_data(record)
+                                for record in snapshot.sample(mask, count, exclude=exclude)]
+            elif filters:
+                with metrics.span('plex'):
+                    items = sample_filtered_live(plex_token, library_name, filters, count,
+                                                 exclude=swiped_movies | exploit_ids)
+                for item in items:
+                    item.poster_url = poster_url(getattr(item, 'thumb', None), item.server_name)
+                explore_pool = [movie_to_match_data(item) for item in items]
+            else:
+                error, movies = get_random_movies_lightweight(library_name, plex_token, count,
+                                                              exclude=swiped_movies | exploit_ids)
+                explore_pool = [movie_to_match_data(movie) for movie in movies]
+        while explore_pool:
+            movie = explore_pool.pop(0)
+            if movie['id'] not in swiped_movies and movie['id'] not in exploit_ids:
+                return movie
+        return None
+
+    for source, pick in matching.interleave_candidates(exploit, explore, count):
+        if source == 'exploit':
+            # Fetch the summary and poster of a title someone else liked, from the server it came from
+            try:
+                server, rating_key = federation.parse_item_id(pick['id'])
+                with metrics.span('plex'):
+                    movie = get_plex_server(plex_token, server).fetchItem(rating_key)
+            except Exception:
+                continue
+            if filters and snapshot is None and not library_index.matches(library_index.item_record(movie, server), filters):
+                continue
+            movie.server_name = server
+            movie.poster_url = poster_url(getattr(movie, 'thumb', None), server)
+            pick = movie_to_match_data(movie)
+        swiped_movies.add(pick['id'])  # Prevent duplicates in same batch
+        movies.append(pick)
+    return movies
+
 @app.route("/api/match/rooms", methods=["POST"])
 @token_required
 def create_match_room():
@@ -611,78 +1203,17 @@ def get_next_movie_for_match(room_id):
         if not backend_token:
             return jsonify({'error': 'Failed to authenticate with backend'}), 401
         
-        # Use session-based caching for user swipes to reduce API calls
-        from flask import session
-        cache_key = f"swipes_{room_id}_{hash(request.plex_token)}"
-        
-        # Check if we have cached swipes (refresh every 30 seconds)
-        import time
-        current_time = time.time()
-        cached_data = session.get(cache_key)
-        cache_valid = (cached_data and 
-                      isinstance(cached_data, dict) and 
-                      'timestamp' in cached_data and 
-                      current_time - cached_data['timestamp'] < 30)
-        
-        if cache_valid:
-            swiped_movies = set(cached_data['swiped_movies'])
-            library_name = cached_data['library_name']
-        else:
-            # Fetch both room info and user swipes
-            import concurrent.futures
-            
-            def get_swipes():
-                response = make_backend_request(
-                    'GET',
-                    f'/match/rooms/{room_id}/user-swipes',
-                    headers={'Authorization': f'Bearer {backend_token}'}
-                )
-                if response and response.status_code == 200:
-                    return set(response.json().get('swiped_movies', []))
-                return set()
-            
-            def get_room():
-                response = make_backend_request(
-                    'GET',
-                    f'/match/rooms/{room_id}',
-                    headers={'Authorization': f'Bearer {backend_token}'}
-                )
-                if response and response.status_code == 200:
-                    return response.json().get('library_filter', 'Movies')
-                return 'Movies'
-            
-            # Execute both requests in parallel
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                swipes_future = executor.submit(get_swipes)
-                room_future = executor.submit(get_room)
-                
-                swiped_movies = swipes_future.result()
-                library_name = room_future.result()
-            
-            # Cache the results
-            session[cache_key] = {
-                'swiped_movies': list(swiped_movies),
-                'library_name': library_name,
-                'timestamp': current_time
-            }
+        try:
+            filters = library_index.parse_filters(request.args)
+        except library_index.FacetError as e:
+            return jsonify({'error': str(e)}), 400
+
+        swiped_movies, library_name = get_room_swipe_state(room_id, backend_token)
         
-        # Try up to 3 times to find an unswiped movie (reduced from 5)
-        for _ in range(3):
-            error, movie = get_random_movie_lightweight(library_name, request.plex_token)
-            if error:
-                continue
-            
-            movie_id = str(movie.ratingKey)
-            if movie_id not in swiped_movies:
-                # Convert movie object to dictionary with minimal data
-                movie_data = {
-                    'id': movie_id,
-                    'title': getattr(movie, 'title', ''),
-                    'year': getattr(movie, 'year', ''),
-                    'summary': getattr(movie, 'summary', ''),
-                    'poster_url': getattr(movie, 'poster_url', ''),
-                }
-                return jsonify({'movie': movie_data})
+        # Titles others already liked are favoured over a random unwatched pick
+        movies = schedule_match_movies(room_id, library_name, request.plex_token, swiped_movies, 1, filters)
+        if movies:
+            return jsonify({'movie': movies[0]})
         
         # No more movies found
         return jsonify({'message': 'No more movies to swipe'}), 204
@@ -727,11 +1258,14 @@ def swipe_movie_in_room(room_id):
         )
         
         if response and response.status_code == 200:
-            # Invalidate the cache for this user/room since they swiped
-            from flask import session
-            cache_key = f"swipes_{room_id}_{hash(request.plex_token)}"
-            if cache_key in session:
-                del session[cache_key]
+            # Invalidate the cache for this user/room (on every replica) since they swiped
+            room_swipe_cache.delete(room_swipe_key(room_id, request.plex_token))
+            
+            # Mirror the swipe locally so the room scheduler can rank titles others liked
+            try:
+                database.record_swipe(room_id, get_user_key(request.plex_token), movie_id, movie_title, movie_year, direction)
+            except Exception as e:
+                print(f"Failed to record swipe locally: {e}")
             
             return jsonify(response.json())
         else:
@@ -741,6 +1275,136 @@ def swipe_movie_in_room(room_id):
     except Exception as e:
         return jsonify({'error': f'Failed to record swipe: {str(e)}'}), 500
 
+# Most swipes accepted in one bulk request
+MAX_SWIPE_BATCH = 50
+
+def apply_batched_swipe(http, backend_token, room_id, user_key, key, swipe, receipts, applied):
+    """
+    Send one swipe of a batch, whose idempotency key is claimed, to the
+    backend and store its receipt. Returns its entry of the batch results.
+    """
+    swipe_data = {
+        'movie_id': swipe['movie_id'],
+        'movie_title': swipe.get('movie_title', ''),
+        'movie_year': swipe.get('movie_year'),
+        'direction': swipe['direction']
+    }
+    try:
+        response = make_backend_request(
+            'POST',
+            f'/match/rooms/{room_id}/swipe',
+            headers={'Authorization': f'Bearer {backend_token}'},
+            json_data=swipe_data,
+            session=http
+        )
+        if not (response and response.status_code == 200):
+            error_msg = response.json().get('detail', 'Failed to record swipe') if response else 'Backend unavailable'
+            raise RuntimeError(error_msg)
+        result = {'movie_id': str(swipe['movie_id']), 'match': bool(response.json().get('match'))}
+    except Exception as e:
+        # Nothing was applied, so the key can be sent again
+        swipe_receipts.release(room_id, user_key, [key])
+        return {'idempotency_key': key, 'status': 'failed', 'error': str(e)}
+
+    receipts[key] = result  # Repeated keys inside one batch count once
+    applied.append(swipe_data)
+    try:
+        swipe_receipts.complete(room_id, user_key, key, swipe['movie_id'], result)
+    except Exception as e:
+        # The swipe is applied but a resend could not tell. Stop the batch; the key stays
+        # claimed, so resends report it in_progress rather than applying it again
+        print(f"Failed to store swipe receipt: {e}")
+        return {'idempotency_key': key, 'status': 'failed', 'error': 'Swipe recorded, but its receipt could not be stored', **result}
+    return {'idempotency_key': key, 'status': 'recorded', **result}
+
+@app.route("/api/match/rooms/<room_id>/swipes", methods=["POST"])
+@token_required
+def bulk_swipe_in_room(room_id):
+    """
+    Record an ordered batch of swipes. Every swipe carries a client-side
+    idempotency_key, so a batch can be resent after a dropped connection
+    without applying anything twice. Swipes are applied in order and
+    processing stops at the first backend failure; the remaining swipes
+    are reported as skipped for the client to retry, as are swipes another
+    copy of the batch is still applying (in_progress).
+    """
+    try:
+        data = request.get_json() or {}
+        swipes = data.get('swipes')
+        if not isinstance(swipes, list) or not swipes:
+            return jsonify({'error': 'swipes must be a non-empty list'}), 400
+        if len(swipes) > MAX_SWIPE_BATCH:
+            return jsonify({'error': f'At most {MAX_SWIPE_BATCH} swipes per batch'}), 400
+
+        for swipe in swipes:
+            if not isinstance(swipe, dict) or not all([swipe.get('idempotency_key'), swipe.get('movie_id'), swipe.get('direction')]):
+                return jsonify({'error': 'Every swipe needs idempotency_key, movie_id and direction'}), 400
+            if swipe['direction'] not in ['left', 'right', 'super']:
+                return jsonify({'error': 'direction must be left, right, or super'}), 400
+
+        user_key = get_user_key(request.plex_token)
+        receipts = swipe_receipts.lookup(room_id, user_key, [str(swipe['idempotency_key']) for swipe in swipes])
+
+        results = []
+        applied = []
+        matches = []
+        failed = False
+        backend_token = None
+        # One token exchange and one keep-alive connection for the whole batch
+        with requests.Session() as http:
+            for swipe in swipes:
+                key = str(swipe['idempotency_key'])
+                if receipts.get(key) is None and not failed:
+                    if backend_token is None:
+                        backend_token = get_backend_jwt_token(request.plex_token)
+                        if not backend_token:
+                            return jsonify({'error': 'Failed to authenticate with backend'}), 401
+
+                    # Claim the key right before applying it: of two copies of a batch in flight, only one does
+                    try:
+                        claimed = swipe_receipts.claim(room_id, user_key, key)
+                    except Exception as e:
+                        # Without the shared receipts no replica could tell the swipe was applied already
+                        print(f"Failed to claim swipe receipt: {e}")
+                        failed = True
+                        results.append({'idempotency_key': key, 'status': 'failed', 'error': 'Swipe receipts are unavailable'})
+                        continue
+                    if claimed:
+                        results.append(apply_batched_swipe(http, backend_token, room_id, user_key, key, swipe, receipts, applied))
+                        failed = results[-1]['status'] == 'failed'
+                        if results[-1].get('match'):
+                            matches.append(results[-1]['movie_id'])
+                        continue
+                    receipts[key] = swipe_receipts.lookup(room_id, user_key, [key]).get(key)
+
+                if receipts.get(key) is not None:
+                    results.append({'idempotency_key': key, 'status': 'duplicate', **receipts[key]})
+                elif key in receipts:
+                    # Another request holds the claim; the client retries once it has finished
+                    results.append({'idempotency_key': key, 'status': 'in_progress'})
+                else:
+                    results.append({'idempotency_key': key, 'status': 'skipped'})
+
+        if applied:
+            # Invalidate the cache for this user/room (on every replica) since they swiped
+            room_swipe_cache.delete(room_swipe_key(room_id, request.plex_token))
+
+            # Mirror the swipes locally in one transaction
+            try:
+                database.record_swipe_batch(room_id, user_key, applied)
+            except Exception as e:
+                print(f"Failed to record swipe batch locally: {e}")
+
+        return jsonify({
+            'results': results,
+            'matches': matches,
+            'recorded': len(applied),
+            'complete': not failed
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to record swipes: {str(e)}'}), 500
+
 @app.route("/api/match/rooms/<room_id>/matches", methods=["GET"])
 @token_required
 def get_room_matches(room_id):
@@ -782,88 +1446,103 @@ def get_multiple_movies_for_match(room_id, count):
         if not backend_token:
             return jsonify({'error': 'Failed to authenticate with backend'}), 401
         
-        # Use session-based caching for batch requests too
-        from flask import session
-        import time
-        cache_key = f"swipes_{room_id}_{hash(request.plex_token)}"
-        current_time = time.time()
-        cached_data = session.get(cache_key)
-        cache_valid = (cached_data and 
-                      isinstance(cached_data, dict) and 
-                      'timestamp' in cached_data and 
-                      current_time - cached_data['timestamp'] < 30)
-        
-        if cache_valid:
-            swiped_movies = set(cached_data['swiped_movies'])
-            library_name = cached_data['library_name']
-        else:
-            # Fetch user swipes and room info in parallel
-            import concurrent.futures
-            
-            def get_swiped_movies():
-                response = make_backend_request(
-                    'GET',
-                    f'/match/rooms/{room_id}/user-swipes',
-                    headers={'Authorization': f'Bearer {backend_token}'}
-                )
-                if response and response.status_code == 200:
-                    return set(response.json().get('swiped_movies', []))
-                return set()
-            
-            def get_room_info():
-                response = make_backend_request(
-                    'GET',
-                    f'/match/rooms/{room_id}',
-                    headers={'Authorization': f'Bearer {backend_token}'}
-                )
-                if response and response.status_code == 200:
-                    return response.json().get('library_filter', 'Movies')
-                return 'Movies'
-            
-            # Execute both requests concurrently
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                swiped_future = executor.submit(get_swiped_movies)
-                room_future = executor.submit(get_room_info)
-                
-                swiped_movies = swiped_future.result()
-                library_name = room_future.result()
-            
-            # Cache the results
-            session[cache_key] = {
-                'swiped_movies': list(swiped_movies),
-                'library_name': library_name,
-                'timestamp': current_time
-            }
+        try:
+            filters = library_index.parse_filters(request.args)
+        except library_index.FacetError as e:
+            return jsonify({'error': str(e)}), 400
+
+        swiped_movies, library_name = get_room_swipe_state(room_id, backend_token)
         
         # Generate movies quickly
-        movies = []
-        attempts = 0
-        max_attempts = count * 2  # Reduced attempts for speed
-        
-        while len(movies) < count and attempts < max_attempts:
-            attempts += 1
-            error, movie = get_random_movie_lightweight(library_name, request.plex_token)
-            if error:
-                continue
-            
-            movie_id = str(movie.ratingKey)
-            if movie_id not in swiped_movies:
-                # Minimal movie data for speed
-                movie_data = {
-                    'id': movie_id,
-                    'title': getattr(movie, 'title', ''),
-                    'year': getattr(movie, 'year', ''),
-                    'summary': getattr(movie, 'summary', ''),
-                    'poster_url': getattr(movie, 'poster_url', ''),
-                }
-                movies.append(movie_data)
-                swiped_movies.add(movie_id)  # Prevent duplicates in same batch
+        movies = schedule_match_movies(room_id, library_name, request.plex_token, swiped_movies, count, filters)
         
         return jsonify({'movies': movies})
-            
+
     except Exception as e:
         return jsonify({'error': f'Failed to get movies: {str(e)}'}), 500
 
+@app.route("/api/match/rooms/<room_id>/similar/<movie_id>", methods=["GET"])
+@token_required
+def get_similar_movies_for_match(room_id, movie_id):
+    """Get movies similar to a matched movie from the precomputed similarity index"""
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), similarity.SIMILARITY_TOP_K)
+        try:
+            server, rating_key = federation.parse_item_id(movie_id)
+        except ValueError:
+            return jsonify({'error': f'Invalid movie id: {movie_id}'}), 400
+        if server != federation.PRIMARY:
+            # The similarity index only covers the primary server
+            return jsonify({'movies': []})
+
+        # Get backend JWT token
+        backend_token = get_backend_jwt_token(request.plex_token)
+        if not backend_token:
+            return jsonify({'error': 'Failed to authenticate with backend'}), 401
+
+        swiped_movies, library_name = get_room_swipe_state(room_id, backend_token)
+
+        index = similarity.get_index(library_name)
+        if index is None:
+            return jsonify({'error': f'No similarity index built for library {library_name}'}), 404
+
+        # Skip everything the room has already seen, not only this participant's swipes
+        seen = set(swiped_movies)
+        try:
+            seen.update(swipe['movie_id'] for swipe in database.get_room_swipes(room_id))
+        except Exception as e:
+            print(f"Failed to load room swipes: {e}")
+
+        movies = index.neighbours(rating_key, exclude=seen, limit=limit)
+        return jsonify({'movies': movies})
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to get similar movies: {str(e)}'}), 500
+
+@app.route("/api/match/rooms/<room_id>/pool", methods=["POST"])
+@token_required
+def add_to_room_pool(room_id):
+    """Add a title found with /api/search to the room, so every participant gets it next"""
+    try:
+        data = request.get_json() or {}
+        movie_id = data.get('movie_id')
+        if not movie_id:
+            return jsonify({'error': 'movie_id is required'}), 400
+        try:
+            server, rating_key = federation.parse_item_id(str(movie_id))
+        except ValueError:
+            return jsonify({'error': f'Invalid movie_id: {movie_id}'}), 400
+
+        backend_token = get_backend_jwt_token(request.plex_token)
+        if not backend_token:
+            return jsonify({'error': 'Failed to authenticate with backend'}), 401
+
+        swiped_movies, library_name = get_room_swipe_state(room_id, backend_token)
+
+        try:
+            with metrics.span('plex'):
+                record = get_library_snapshot(request.plex_token, library_name).find(rating_key, server)
+        except library_index.SnapshotPending:
+            record = find_record_live(request.plex_token, library_name, server, rating_key)
+        if record is None:
+            return jsonify({'error': f'Movie not found in library {library_name}'}), 404
+
+        movie = record_to_match_data(record)
+        added = database.add_to_room_pool(room_id, movie['id'], get_user_key(request.plex_token), movie)
+        return jsonify({'movie': movie, 'added': added}), 201 if added else 200
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to add movie to room: {str(e)}'}), 500
+
+@app.route("/api/match/rooms/<room_id>/pool", methods=["GET"])
+@token_required
+def get_room_pool(room_id):
+    """Get the titles participants added to the room, oldest first"""
+    try:
+        return jsonify({'movies': database.get_room_pool(room_id)})
+    except Exception as e:
+        return jsonify({'error': f'Failed to get room pool: {str(e)}'}), 500
+
 # ==================== END MOVIE MATCH API ENDPOINTS ====================
 
 # ==================== WATCHLIST & WATCH TRACKING API ENDPOINTS ====================
@@ -888,20 +1567,23 @@ def add_to_watchlist():
         jwt_token = auth_header.split(' ')[1]
         
         # Forward to backend API
-        response = requests.post(
-            f"{BACKEND_API_URL}/api/watchlist/add",
-            json={
-                'movie_id': movie_id,
-                'movie_title': movie_title
-            },
-            headers={
-                'Authorization': f'Bearer {jwt_token}',
-                'Content-Type': 'application/json'
-            },
-            timeout=10
-        )
+        with metrics.span('backend') as span:
+            response = requests.post(
+                f"{BACKEND_API_URL}/api/watchlist/add",
+                json={
+                    'movie_id': movie_id,
+                    'movie_title': movie_title
+                },
+                headers={
+                    'Authorization': f'Bearer {jwt_token}',
+                    'Content-Type': 'application/json'
+                },
+                timeout=10
+            )
+            span.outcome = metrics.http_outcome(response)
         
         if response.status_code == 200:
+            user_list_cache.invalidate(user_lists.user_key(jwt_token), '/api/watchlist')
             return response.json()
         else:
             return jsonify({'error': 'Backend API error'}), response.status_code
@@ -929,20 +1611,23 @@ def mark_as_watched():
         jwt_token = auth_header.split(' ')[1]
         
         # Forward to backend API
-        response = requests.post(
-            f"{BACKEND_API_URL}/api/watch/mark",
-            json={
-                'movie_id': movie_id,
-                'movie_title': movie_title
-            },
-            headers={
-                'Authorization': f'Bearer {jwt_token}',
-                'Content-Type': 'application/json'
-            },
-            timeout=10
-        )
+        with metrics.span('backend') as span:
+            response = requests.post(
+                f"{BACKEND_API_URL}/api/watch/mark",
+                json={
+                    'movie_id': movie_id,
+                    'movie_title': movie_title
+                },
+                headers={
+                    'Authorization': f'Bearer {jwt_token}',
+                    'Content-Type': 'application/json'
+                },
+                timeout=10
+            )
+            span.outcome = metrics.http_outcome(response)
         
         if response.status_code == 200:
+            user_list_cache.invalidate(user_lists.user_key(jwt_token), '/api/watch/history', '/api/watchlist')
             return response.json()
         else:
             return jsonify({'error': 'Backend API error'}), response.status_code
@@ -950,65 +1635,227 @@ def mark_as_watched():
     except Exception as e:
         return jsonify({'error': f'Failed to mark as watched: {str(e)}'}), 500
 
+user_list_cache = user_lists.UserListCache()
+
+def proxy_user_list(path):
+    """
+    Proxy a per-user list from the backend.
+
+    Without paging parameters the upstream body is passed through as is:
+    bodies up to USER_LIST_BUFFER_MAX get an ETag (and a matching
+    If-None-Match gets a 304, without asking the backend while the ETag is
+    fresh), larger ones are streamed through in chunks. With ?limit= (and
+    the next_cursor of the previous page as ?cursor=) one page of the list
+    is returned. Lists up to USER_LIST_BUFFER_MAX are kept as a short-lived
+    parsed copy; larger ones are streamed again for every page, keeping only
+    that page. A cursor minted before the list changed gets a 410.
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return jsonify({'error': 'Authorization header required'}), 401
+    jwt_token = auth_header.split(' ')[1]
+    cache_key = (user_lists.user_key(jwt_token), path)
+    if_none_match = request.headers.get('If-None-Match')
+
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+    paged = cursor is not None or limit is not None
+    offset = 0
+    version = None
+    if paged:
+        limit = min(max(limit or 50, 1), user_lists.MAX_PAGE_SIZE)
+        if cursor:
+            try:
+                offset, version = user_lists.decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+    entry = user_list_cache.get(cache_key)
+    metrics.cache_event('user_list', entry is not None and (not paged or entry['items'] is not None))
+    if not paged and entry and user_lists.etag_matches(if_none_match, entry['etag']):
+        return Response(status=304, headers={'ETag': entry['etag'], 'Cache-Control': 'private, no-cache'})
+
+    if paged and entry is not None and entry['items'] is not None:
+        items = entry['items']
+        page = {'etag': entry['etag'], 'items_key': entry['items_key'],
+                'page': items[offset:offset + limit], 'total': len(items)}
+    else:
+        with metrics.span('backend') as span:
+            upstream = requests.get(
+                f"{BACKEND_API_URL}{path}",
+                headers={'Authorization': f'Bearer {jwt_token}'},
+                timeout=10,
+                stream=True
+            )
+            span.outcome = metrics.http_outcome(upstream)
+        if upstream.status_code != 200:
+            upstream.close()
+            return jsonify({'error': 'Backend API error'}), upstream.status_code
+
+        chunks = upstream.iter_content(chunk_size=64 * 1024)
+        if not paged:
+            return passthrough_user_list(upstream, chunks, cache_key, if_none_match)
+
+        # Decode the list item by item; only this page (and small lists whole) stay in memory
+        try:
+            page = user_lists.read_page(chunks, offset, limit)
+        except ValueError:
+            return jsonify({'error': 'Backend API returned an invalid list'}), 502
+        finally:
+            upstream.close()
+        user_list_cache.put(cache_key, page['etag'], page['items_key'], page['items'])
+
+    if version is not None and version != user_lists.list_version(page['etag']):
+        # Offsets into a list that changed would skip or repeat items
+        return jsonify({'error': 'The list changed since this cursor was issued; request the first page again'}), 410
+
+    page_etag = user_lists.make_etag(f"{page['etag']}:{offset}:{limit}")
+    if user_lists.etag_matches(if_none_match, page_etag):
+        return Response(status=304, headers={'ETag': page_etag, 'Cache-Control': 'private, no-cache'})
+
+    next_offset = offset + limit
+    response = jsonify({
+        page['items_key']: page['page'],
+        'total': page['total'],
+        'next_cursor': user_lists.encode_cursor(next_offset, page['etag']) if next_offset < page['total'] else None
+    })
+    response.headers['ETag'] = page_etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def passthrough_user_list(upstream, chunks, cache_key, if_none_match):
+    """
+    Send an upstream list body as it is: tagged with an ETag when it fits in
+    USER_LIST_BUFFER_MAX, streamed through in chunks otherwise.
+    """
+    content_type = upstream.headers.get('Content-Type', 'application/json')
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size > user_lists.USER_LIST_BUFFER_MAX:
+            # Too large to tag without holding it all in memory: stream the rest straight through
+            def passthrough():
+                try:
+                    yield from buffered
+                    yield from chunks
+                finally:
+                    upstream.close()
+            return Response(passthrough(), content_type=content_type)
+    upstream.close()
+    body = b''.join(buffered)
+    etag = user_lists.make_etag(body)
+
+    user_list_cache.put(cache_key, etag)
+    if user_lists.etag_matches(if_none_match, etag):
+        return Response(status=304, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+    return Response(body, content_type=content_type,
+                    headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
 @app.route("/api/watchlist", methods=["GET"])
 @require_jwt_auth
 def get_watchlist():
-    """Get user's watchlist via backend API"""
+    """Get user's watchlist via backend API (?limit=&cursor= for pages)"""
     try:
-        # Get JWT token from request headers
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Authorization header required'}), 401
-        
-        jwt_token = auth_header.split(' ')[1]
-        
-        # Forward to backend API
-        response = requests.get(
-            f"{BACKEND_API_URL}/api/watchlist",
-            headers={
-                'Authorization': f'Bearer {jwt_token}'
-            },
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return jsonify({'error': 'Backend API error'}), response.status_code
-            
+        return proxy_user_list('/api/watchlist')
     except Exception as e:
         return jsonify({'error': f'Failed to get watchlist: {str(e)}'}), 500
 
 @app.route("/api/watch/history", methods=["GET"])
 @require_jwt_auth
 def get_watch_history():
-    """Get user's watch history via backend API"""
+    """Get user's watch history via backend API (?limit=&cursor= for pages)"""
     try:
-        # Get JWT token from request headers
+        return proxy_user_list('/api/watch/history')
+    except Exception as e:
+        return jsonify({'error': f'Failed to get watch history: {str(e)}'}), 500
+
+# ==================== END WATCHLIST & WATCH TRACKING ====================
+
+# ==================== LIKE/DISLIKE/WATCH COUNTERS ====================
+
+# Backend endpoints serving one counter for one movie
+COUNTER_ENDPOINTS = {'likes': 'like-count', 'dislikes': 'dislike-count', 'watches': 'watch-count'}
+# Write endpoints and the counter each one moves
+COUNTER_WRITES = {'like': 'likes', 'dislike': 'dislikes', 'watch': 'watches'}
+MAX_COUNTER_IDS = 50
+
+def fetch_counters(movie_ids):
+    """Read every counter of every movie from the backend in parallel"""
+    import concurrent.futures
+
+    def fetch_one(http, movie_id, kind):
+        response = make_backend_request(
+            'GET', f"/{COUNTER_ENDPOINTS[kind]}/{urllib.parse.quote(movie_id, safe='')}", session=http
+        )
+        if response is not None and response.status_code == 200:
+            return response.json().get('count') or 0
+        return None
+
+    jobs = [(movie_id, kind) for movie_id in movie_ids for kind in counters.KINDS]
+    with requests.Session() as http, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(jobs))) as executor:
+        values = list(executor.map(lambda job: fetch_one(http, *job), jobs))
+
+    results = {}
+    for (movie_id, kind), value in zip(jobs, values):
+        results.setdefault(movie_id, {})[kind] = value
+    # Only cache movies whose counters could all be read
+    return {movie_id: counts for movie_id, counts in results.items() if None not in counts.values()}
+
+counter_cache = counters.CounterCache(fetch_counters)
+
+@app.route("/api/counters", methods=["GET"])
+def get_counters():
+    """Get like, dislike and watch counts for several movies: /api/counters?ids=1,2,3"""
+    try:
+        movie_ids = [movie_id.strip() for movie_id in request.args.get('ids', '').split(',') if movie_id.strip()]
+        if not movie_ids:
+            return jsonify({'error': 'ids is required'}), 400
+        if len(movie_ids) > MAX_COUNTER_IDS:
+            return jsonify({'error': f'At most {MAX_COUNTER_IDS} ids per request'}), 400
+
+        results = counter_cache.get_many(movie_ids)
+        return jsonify({
+            'counters': results,
+            'missing': [movie_id for movie_id in movie_ids if movie_id not in results]
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to get counters: {str(e)}'}), 500
+
+@app.route("/api/counters/<movie_id>/<action>", methods=["POST", "DELETE"])
+def write_counter(movie_id, action):
+    """
+    Like, dislike or track a watch (DELETE undoes a like or dislike) through
+    the backend, using the caller's backend JWT, and reflect it in the cached
+    counts straight away.
+    """
+    try:
+        kind = COUNTER_WRITES.get(action)
+        if kind is None or (request.method == 'DELETE' and action == 'watch'):
+            return jsonify({'error': 'Unsupported counter action'}), 400
+
         auth_header = request.headers.get('Authorization', '')
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Authorization header required'}), 401
-        
-        jwt_token = auth_header.split(' ')[1]
-        
-        # Forward to backend API
-        response = requests.get(
-            f"{BACKEND_API_URL}/api/watch/history",
-            headers={
-                'Authorization': f'Bearer {jwt_token}'
-            },
-            timeout=10
+
+        response = make_backend_request(
+            request.method,
+            f"/{action}/{urllib.parse.quote(movie_id, safe='')}",
+            headers={'Authorization': auth_header}
         )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return jsonify({'error': 'Backend API error'}), response.status_code
-            
+        if response is None:
+            return jsonify({'error': 'Backend unavailable'}), 503
+        if response.status_code >= 400:
+            return jsonify({'error': f'Backend rejected {action}'}), response.status_code
+
+        counter_cache.apply_write(movie_id, kind, -1 if request.method == 'DELETE' else 1)
+        return jsonify({'success': True, 'counters': counter_cache.get_many([movie_id]).get(movie_id)})
     except Exception as e:
-        return jsonify({'error': f'Failed to get watch history: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to update counter: {str(e)}'}), 500
 
-# ==================== END WATCHLIST & WATCH TRACKING ====================
+# ==================== END LIKE/DISLIKE/WATCH COUNTERS ====================
 
 @app.route("/", methods=["GET"])
 def home():
@@ -1016,7 +1863,7 @@ def home():
     # Use environment token if available for backward compatibility
     token = PLEX_TOKEN
     libraries = get_plex_libraries(token)
-    error, movie = get_random_movie(selected_library, token)
+    error, movie = get_suggestion(selected_library, token)
     return render_template("index.html", error=error, movie=movie, libraries=libraries, selected_library=selected_library, has_env_token=bool(PLEX_TOKEN), plex_token=PLEX_TOKEN if PLEX_TOKEN else "")
 
 @app.route("/match")
@@ -1029,7 +1876,7 @@ def movie_match():
 
 @app.route("/poster/<path:item_key>")
 def proxy_poster(item_key):
-    # item_key will be like 'library/metadata/12345/thumb'
+    # item_key will be like 'library/metadata/12345/thumb', with ?server=<name> for non-primary servers
     # Use environment token if available, otherwise require authentication
     if PLEX_TOKEN:
         token = PLEX_TOKEN
@@ -1047,11 +1894,17 @@ def proxy_poster(item_key):
         except (IndexError, KeyError):
             return "Unauthorized", 401
     
-    plex_url = f"{PLEX_URL}/{item_key}?X-Plex-Token={token}"
+    server = request.args.get('server')
+    try:
+        plex_url = f"{plex_server_url(server)}/{item_key}?X-Plex-Token={token}"
+    except KeyError:
+        return "Unknown Plex server", 404
     try:
         # Use session for connection pooling and faster requests
         session = requests.Session()
-        resp = session.get(plex_url, timeout=3, stream=True)  # Reduced timeout, use streaming
+        with metrics.span('plex') as span:
+            resp = session.get(plex_url, timeout=3, stream=True)  # Reduced timeout, use streaming
+            span.outcome = metrics.http_outcome(resp)
         resp.raise_for_status()
         
         # Create response with caching headers for better performance
@@ -1064,10 +1917,12 @@ def proxy_poster(item_key):
         
         # Add aggressive caching headers
         response.headers['Cache-Control'] = 'public, max-age=86400'  # Cache for 24 hours
-        response.headers['ETag'] = f'"{hash(item_key)}"'  # Simple ETag
+        response.headers['ETag'] = f'"{hash((server, item_key))}"'  # Simple ETag
         
         # Check if client has cached version
-        if request.headers.get('If-None-Match') == response.headers['ETag']:
+        client_cached = request.headers.get('If-None-Match') == response.headers['ETag']
+        metrics.cache_event('poster_etag', client_cached)
+        if client_cached:
             return '', 304  # Not Modified
         
         return response
@@ -1084,21 +1939,109 @@ def proxy_poster(item_key):
         return fallback_response
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose Prometheus metrics (only when METRICS_ENABLED is set)"""
+    if not metrics.METRICS_ENABLED:
+        return "Metrics are disabled", 404
+    body, content_type = metrics.render()
+    return Response(body, mimetype=content_type)
+
+
+def warm_up():
+    """
+    Load the deferred integrations, connect to Plex, map the library snapshot
+    and similarity index, build the title search index and start filling the
+    suggestion pool, so the first requests a worker serves do not pay for any
+    of it. Gunicorn runs this before the worker accepts traffic. If it fails
+    (Plex unreachable, say) the worker serves cold and retries in the
+    background, backing off, until it succeeds.
+    """
+    if not _attempt_warm_up():
+        threading.Thread(target=_retry_warm_up, name='warm-up-retry', daemon=True).start()
+
+
+def _retry_warm_up():
+    delay = WARM_UP_RETRY_DELAY
+    while True:
+        time.sleep(delay)
+        if _attempt_warm_up():
+            return
+        delay = min(delay * 2, WARM_UP_RETRY_MAX_DELAY)
+
+
+def _attempt_warm_up():
+    global _warm_up_error, _warm_up_attempts
+    startup.clear_steps()
+    _warm_up_attempts += 1
+    try:
+        with startup.step('imports'):
+            import jwt  # noqa: F401
+            import plexapi.server  # noqa: F401
+
+        token = PLEX_TOKEN
+        if PLEX_URL and token:
+            with startup.step('plex_connect'):
+                connected = federation.fan_out(lambda server: get_plex_server(token, server).machineIdentifier, federation.SERVERS)
+                # Other servers are optional; the snapshot and suggestions below need the primary one
+                if federation.PRIMARY not in connected:
+                    raise RuntimeError(f"Plex server {federation.PRIMARY} did not answer")
+            with startup.step('snapshot'):
+                # Maps an existing file, or starts building one in the background (that can take minutes)
+                try:
+                    snapshot = get_library_snapshot(token, LIBRARY_NAME)
+                except library_index.SnapshotPending:
+                    snapshot = None
+            if snapshot is not None:
+                with startup.step('title_index'):
+                    title_search.get_index(snapshot)
+            with startup.step('similarity'):
+                similarity.get_index(LIBRARY_NAME)
+            with startup.step('suggestion_pool'):
+                suggestion_pool.prime(token, LIBRARY_NAME)
+    except Exception as e:
+        _warm_up_error = str(e)
+        print(f"Warm-up attempt {_warm_up_attempts} failed, serving cold: {e}")
+        return False
+    _warm_up_error = None
+    _ready.set()
+    return True
+
+
+@app.route('/health')
+def health():
+    """
+    Readiness probe of the worker that answers: 200 once it has booted and
+    warmed up, 503 while it is starting or while a failed warm-up is retried
+    """
+    ready = _ready.is_set()
+    body = {
+        'status': 'ready' if ready else 'failed' if _warm_up_error else 'starting',
+        'warm_up': startup.steps(),
+        'providers': resilience.states(),
+    }
+    if _warm_up_error:
+        body['error'] = _warm_up_error
+        body['attempts'] = _warm_up_attempts
+    return jsonify(body), 200 if ready else 503
+
+
 @app.route('/favicon.ico')
 def favicon():
     """Serve the favicon"""
-    return send_from_directory('assets', 'favicon.ico', mimetype='image/x-icon')
+    return send_from_directory('assets', 'favicon.ico', mimetype='image/x-icon', max_age=static_assets.ICON_MAX_AGE)
 
 @app.route('/icon.png')
 def icon():
     """Serve the icon"""
-    return send_from_directory('assets', 'icon.png', mimetype='image/png')
+    return send_from_directory('assets', 'icon.png', mimetype='image/png', max_age=static_assets.ICON_MAX_AGE)
 
 @app.route('/logo.png')
 def logo():
     """Serve the logo"""
-    return send_from_directory('assets', 'logo.png', mimetype='image/png')
+    return send_from_directory('assets', 'logo.png', mimetype='image/png', max_age=static_assets.ICON_MAX_AGE)
 
 
 if __name__ == "__main__":
+    warm_up()
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,72 @@
+"""Shared helpers for the benchmark scripts"""
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+REPO_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def load_app(env):
+    """Import app.py with the given environment overrides, isolated from local state"""
+    scratch = tempfile.mkdtemp(prefix='plex-suggester-bench-')
+    os.environ.setdefault('MATCH_DB_PATH', os.path.join(scratch, 'movie_match.db'))
+    os.environ.setdefault('INDEX_DIR', os.path.join(scratch, 'indexes'))
+    os.environ.pop('PLEX_TOKEN', None)
+    os.environ.update(env)
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    return importlib.import_module('app')
+
+
+def check_response(route, response, expected=200):
+    """Fail the benchmark on an unexpected status instead of timing errors"""
+    if response.status_code != expected:
+        body = response.get_data(as_text=True)[:300]
+        raise RuntimeError(f"{route} answered HTTP {response.status_code} (expected {expected}): {body}")
+    return response
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples):
+    """p50/p95/p99/max in milliseconds for a list of durations in seconds"""
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2) if samples else None,
+        'p95_ms': round(percentile(samples, 95) * 1000, 2) if samples else None,
+        'p99_ms': round(percentile(samples, 99) * 1000, 2) if samples else None,
+        'max_ms': round(max(samples) * 1000, 2) if samples else None,
+    }
+
+
+class LatencyRecorder:
+    """Thread-safe collection of durations keyed by label"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds):
+        with self._lock:
+            self.samples[label].append(seconds)
+
+    def timed(self, label, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.record(label, time.perf_counter() - start)
+
+    def summary(self):
+        return {label: latency_summary(values) for label, values in sorted(self.samples.items())}
@@ -0,0 +1,189 @@
+"""
+Benchmark the /api/match/* hot path against a fake Plex server and a fake
+plex-backend.
+
+Simulates N rooms x M participants swiping concurrently through the Flask
+test client and reports per-route latency percentiles, outbound requests to
+Plex and the backend per swipe, and swipes until each room's first match.
+
+    python benchmarks/match_rooms.py --rooms 4 --participants 3 --library 5000 \\
+        --plex-latency 0.02 --backend-latency 0.01 --json > match_rooms.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from harness import LatencyRecorder, check_response, load_app
+from stubs import FakeBackend, FakePlex
+
+
+def authenticate(client, plex_token):
+    response = check_response('POST /auth/plex', client.post('/auth/plex', json={'plex_token': plex_token}))
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def set_up_rooms(app_module, args):
+    """Create the rooms and join every participant, returning per-participant state"""
+    participants = []
+    for r in range(args.rooms):
+        room_id = None
+        for p in range(args.participants):
+            client = app_module.app.test_client()
+            headers = authenticate(client, f"bench-token-{r}-{p}")
+            if room_id is None:
+                room = check_response('POST /api/match/rooms', client.post('/api/match/rooms', headers=headers, json={
+                    'name': f"Benchmark room {r}",
+                    'library': 'Movies',
+                    'min_participants': args.min_participants or args.participants,
+                })).get_json()
+                room_id = room['id']
+            check_response('POST /api/match/rooms/<id>/join', client.post(
+                f'/api/match/rooms/{room_id}/join', headers=headers, json={'username': f"user{p}"}))
+            participants.append({'client': client, 'headers': headers, 'room_id': room_id,
+                                 'rng': random.Random(args.seed * 1000 + r * 100 + p)})
+    return participants
+
+
+def swipe_session(participant, backend, recorder, args, totals, lock):
+    """One participant preloading batches and swiping through them"""
+    client = participant['client']
+    headers = participant['headers']
+    room_id = participant['room_id']
+    rng = participant['rng']
+    queue = []
+    swipes = 0
+
+    while swipes < args.swipes:
+        if args.stop_on_match and room_id in backend.first_match:
+            break
+        if not queue:
+            route = 'GET /api/match/rooms/<id>/movies/<n>'
+            response = recorder.timed(route, client.get, f'/api/match/rooms/{room_id}/movies/{args.batch}',
+                                      headers=headers)
+            queue = check_response(route, response).get_json()['movies']
+            if not queue:
+                break
+
+        movie = queue.pop(0)
+        direction = 'right' if rng.random() < args.like_rate else 'left'
+        route = 'POST /api/match/rooms/<id>/swipe'
+        check_response(route, recorder.timed(route, client.post, f'/api/match/rooms/{room_id}/swipe',
+                                             headers=headers, json={
+                                                 'movie_id': movie['id'],
+                                                 'movie_title': movie['title'],
+                                                 'movie_year': movie['year'],
+                                                 'direction': direction,
+                                             }))
+        swipes += 1
+
+        if swipes % args.matches_every == 0:
+            route = 'GET /api/match/rooms/<id>/matches'
+            check_response(route, recorder.timed(route, client.get, f'/api/match/rooms/{room_id}/matches',
+                                                 headers=headers))
+
+    with lock:
+        totals['swipes'] += swipes
+
+
+def run_session(participant, backend, recorder, args, totals, lock):
+    try:
+        swipe_session(participant, backend, recorder, args, totals, lock)
+    except Exception as e:
+        with lock:
+            totals['errors'].append(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=2)
+    parser.add_argument('--participants', type=int, default=3)
+    parser.add_argument('--min-participants', type=int, default=None,
+                        help='Likes needed for a match (default: every participant)')
+    parser.add_argument('--swipes', type=int, default=30, help='Swipes per participant')
+    parser.add_argument('--batch', type=int, default=3, help='Movies per preload request')
+    parser.add_argument('--matches-every', type=int, default=5, help='Poll matches every N swipes')
+    parser.add_argument('--like-rate', type=float, default=0.3)
+    parser.add_argument('--library', type=int, default=2000, help='Titles in the fake Plex library')
+    parser.add_argument('--plex-latency', type=float, default=0.0, help='Seconds added to every Plex response')
+    parser.add_argument('--backend-latency', type=float, default=0.0, help='Seconds added to every backend response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra latency (seconds, uniform)')
+    parser.add_argument('--stop-on-match', action='store_true', help='Stop a room once it has a match')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+    args = parser.parse_args()
+
+    plex = FakePlex(library_size=args.library, latency=args.plex_latency, jitter=args.jitter, seed=args.seed).start()
+    backend = FakeBackend(latency=args.backend_latency, jitter=args.jitter, seed=args.seed).start()
+    try:
+        app_module = load_app({'PLEX_URL': plex.url, 'BACKEND_API_URL': backend.url, 'PLEX_LIBRARY': 'Movies'})
+        participants = set_up_rooms(app_module, args)
+
+        plex.reset_counts()
+        backend.reset_counts()
+        recorder = LatencyRecorder()
+        totals = {'swipes': 0, 'errors': []}
+        lock = threading.Lock()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run_session, args=(p, backend, recorder, args, totals, lock))
+                   for p in participants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if totals['errors']:
+            # The timings would only measure failures
+            raise SystemExit(f"Benchmark failed: {totals['errors'][0]}")
+    finally:
+        plex.stop()
+        backend.stop()
+
+    swipes = max(totals['swipes'], 1)
+    first_matches = list(backend.first_match.values())
+    results = {
+        'config': vars(args),
+        'elapsed_s': round(elapsed, 3),
+        'swipes': totals['swipes'],
+        'routes': recorder.summary(),
+        'per_swipe': {
+            'plex_requests': round(plex.total_requests / swipes, 2),
+            'plex_bytes': round(plex.bytes_sent / swipes),
+            'backend_requests': round(backend.total_requests / swipes, 2),
+        },
+        'plex_requests': dict(plex.counts),
+        'backend_requests': dict(backend.counts),
+        'swipes_to_first_match': {
+            'rooms_matched': len(first_matches),
+            'rooms': args.rooms,
+            'median': statistics.median(first_matches) if first_matches else None,
+            'max': max(first_matches) if first_matches else None,
+        },
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.rooms} rooms x {args.participants} participants, library {args.library}, "
+          f"{totals['swipes']} swipes in {elapsed:.2f}s")
+    print(f"{'route':<42} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in results['routes'].items():
+        print(f"{route:<42} {stats['count']:>6} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+    per_swipe = results['per_swipe']
+    print(f"Per swipe: {per_swipe['plex_requests']} Plex requests ({per_swipe['plex_bytes']} bytes), "
+          f"{per_swipe['backend_requests']} backend requests")
+    match_stats = results['swipes_to_first_match']
+    print(f"Rooms matched: {match_stats['rooms_matched']}/{args.rooms}, "
+          f"median swipes to first match: {match_stats['median']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Simulate match rooms and compare swipes-to-first-match for the random
+picker and the room-aware scheduler in matching.py.
+
+    python benchmarks/match_scheduler_sim.py --library 5000 --participants 3
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import matching
+
+
+def make_tastes(rng, library_size, participants, taste_correlation, like_threshold):
+    """Return one set of liked item ids per participant"""
+    appeal = [rng.gauss(0, 1) for _ in range(library_size)]
+    tastes = []
+    for _ in range(participants):
+        liked = {
+            str(item) for item in range(library_size)
+            if taste_correlation * appeal[item] + (1 - taste_correlation) * rng.gauss(0, 1) > like_threshold
+        }
+        tastes.append(liked)
+    return tastes
+
+
+def simulate_room(rng, policy, args):
+    """Run one room until the first match, returning the number of swipes it took"""
+    tastes = make_tastes(rng, args.library, args.participants, args.taste_correlation, args.like_threshold)
+    users = [f"user{u}" for u in range(args.participants)]
+    seen = {user: set() for user in users}
+    queues = {user: [] for user in users}
+    room_swipes = []
+    likes = {}
+
+    def explore_for(user):
+        def explore():
+            for _ in range(50):
+                movie_id = str(rng.randrange(args.library))
+                if movie_id not in seen[user] and movie_id not in queues[user]:
+                    return movie_id
+            return None
+        return explore
+
+    swipes = 0
+    while swipes < args.max_swipes:
+        for u, user in enumerate(users):
+            if not queues[user]:
+                if policy == 'scheduler':
+                    exploit = matching.rank_candidates(room_swipes, user, exclude=seen[user])
+                    picks = matching.interleave_candidates(exploit, explore_for(user), args.batch,
+                                                           args.exploit_ratio, rng)
+                    queues[user] = [pick['id'] if source == 'exploit' else pick for source, pick in picks]
+                else:
+                    explore = explore_for(user)
+                    queues[user] = [m for m in (explore() for _ in range(args.batch)) if m is not None]
+                if not queues[user]:
+                    continue
+
+            movie_id = queues[user].pop(0)
+            seen[user].add(movie_id)
+            swipes += 1
+
+            if movie_id in tastes[u]:
+                direction = 'super' if rng.random() < 0.1 else 'right'
+                likes[movie_id] = likes.get(movie_id, 0) + 1
+            else:
+                direction = 'left'
+            room_swipes.append({
+                'user_id': user,
+                'movie_id': movie_id,
+                'movie_title': '',
+                'movie_year': '',
+                'swipe_direction': direction,
+            })
+
+            if likes.get(movie_id, 0) >= args.min_participants:
+                return swipes
+    return swipes
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        'mean': round(statistics.mean(ordered), 1),
+        'p50': ordered[len(ordered) // 2],
+        'p90': ordered[int(len(ordered) * 0.9) - 1 if len(ordered) > 1 else 0],
+        'max': ordered[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--library', type=int, default=2000, help='Number of unwatched titles')
+    parser.add_argument('--participants', type=int, default=3)
+    parser.add_argument('--min-participants', type=int, default=None,
+                        help='Likes needed for a match (default: every participant)')
+    parser.add_argument('--batch', type=int, default=3, help='Titles fetched per preload')
+    parser.add_argument('--exploit-ratio', type=float, default=matching.MATCH_EXPLOIT_RATIO)
+    parser.add_argument('--taste-correlation', type=float, default=0.5)
+    parser.add_argument('--like-threshold', type=float, default=0.6)
+    parser.add_argument('--trials', type=int, default=200)
+    parser.add_argument('--max-swipes', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+    args = parser.parse_args()
+    args.min_participants = args.min_participants or args.participants
+
+    results = {}
+    for policy in ('random', 'scheduler'):
+        rng = random.Random(args.seed)
+        results[policy] = summarize([simulate_room(rng, policy, args) for _ in range(args.trials)])
+
+    if args.json:
+        print(json.dumps({'config': vars(args), 'swipes_to_first_match': results}, indent=2))
+        return
+
+    print(f"Library {args.library}, {args.participants} participants, "
+          f"{args.min_participants} likes to match, {args.trials} trials")
+    print(f"{'policy':<10} {'mean':>8} {'p50':>6} {'p90':>6} {'max':>6}")
+    for policy, stats in results.items():
+        print(f"{policy:<10} {stats['mean']:>8} {stats['p50']:>6} {stats['p90']:>6} {stats['max']:>6}")
+
+
+if __name__ == "__main__":
+    main()
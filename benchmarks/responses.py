@@ -0,0 +1,138 @@
+"""
+Benchmark response encoding: bytes sent and encode time per JSON route.
+
+Fetches each route once through the Flask test client against local stubs
+for Plex, plex-backend and the scrapers, then re-encodes its payload with
+the stdlib JSON provider and with orjson, and compresses the body with
+every supported content coding.
+
+    python benchmarks/responses.py --library 2000 --list-size 200 --repeat 50
+    python benchmarks/responses.py --json > responses.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from harness import latency_summary, load_app
+from stubs import FakeAniList, FakeBackend, FakeDuckDuckGo, FakePlex, FakeWikipedia
+
+
+def time_calls(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, latency_summary(samples)['p50_ms']
+
+
+def measure_route(app_module, encoding, payload, repeat):
+    """Encoded sizes and p50 encode/compress times for one route's payload"""
+    from flask.json.provider import DefaultJSONProvider
+
+    providers = {'stdlib': DefaultJSONProvider(app_module.app)}
+    try:
+        providers['orjson'] = encoding._orjson_provider_class()(app_module.app)
+    except ImportError:
+        pass
+
+    result = {}
+    body = None
+    for name, provider in providers.items():
+        text, ms = time_calls(lambda: provider.dumps(payload), repeat)
+        body = text.encode('utf-8')
+        result[f"json_{name}"] = {'bytes': len(body), 'encode_ms': ms}
+
+    for coding in ('gzip', 'br'):
+        try:
+            compressed, ms = time_calls(lambda: encoding.compress(body, coding), repeat)
+        except ImportError:
+            continue
+        result[coding] = {'bytes': len(compressed), 'compress_ms': ms,
+                          'ratio': round(len(compressed) / max(len(body), 1), 3)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--library', type=int, default=2000, help='Titles in the fake Plex library')
+    parser.add_argument('--list-size', type=int, default=200, help='Entries in the fake watchlist and history')
+    parser.add_argument('--matches', type=int, default=10, help='Liked titles that become room matches (up to 10)')
+    parser.add_argument('--repeat', type=int, default=50, help='Encodes per payload and serializer')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+    args = parser.parse_args()
+
+    stubs = {
+        'plex': FakePlex(library_size=args.library, seed=args.seed),
+        'backend': FakeBackend(list_size=args.list_size, seed=args.seed),
+        'duckduckgo': FakeDuckDuckGo(seed=args.seed),
+        'anilist': FakeAniList(seed=args.seed),
+        'wikipedia': FakeWikipedia(seed=args.seed),
+    }
+    for stub in stubs.values():
+        stub.start()
+    try:
+        app_module = load_app({
+            'PLEX_URL': stubs['plex'].url,
+            'BACKEND_API_URL': stubs['backend'].url,
+            'PLEX_LIBRARY': 'Movies',
+            'SUGGESTION_POOL_SIZE': '0',
+            'DUCKDUCKGO_URL': stubs['duckduckgo'].url,
+            'ANILIST_API_URL': stubs['anilist'].url,
+            'WIKIPEDIA_API_URL': f"{stubs['wikipedia'].url}/w/api.php",
+        })
+        import encoding
+
+        client = app_module.app.test_client()
+        token = client.post('/auth/plex', json={'plex_token': 'bench-token'}).get_json()['token']
+        headers = {'Authorization': f"Bearer {token}", 'Accept-Encoding': 'identity'}
+        room_id = client.post('/api/match/rooms', headers=headers, json={'name': 'Benchmark', 'min_participants': 1}).get_json()['id']
+        movies = client.get(f'/api/match/rooms/{room_id}/movies/10', headers=headers).get_json()['movies']
+        for movie in movies[:args.matches]:
+            client.post(f'/api/match/rooms/{room_id}/swipe', headers=headers,
+                        json={'movie_id': movie['id'], 'movie_title': movie['title'], 'direction': 'right'})
+
+        routes = {
+            'GET /api/suggest': '/api/suggest?library=Movies',
+            'GET /api/match/rooms/<id>/movies/<n>': f'/api/match/rooms/{room_id}/movies/10',
+            'GET /api/match/rooms/<id>/matches': f'/api/match/rooms/{room_id}/matches',
+            'GET /api/watchlist': '/api/watchlist',
+            'GET /api/watch/history': '/api/watch/history',
+        }
+        results = {'config': vars(args), 'routes': {}}
+        for route, url in routes.items():
+            response = client.get(url, headers=headers)
+            sent = {}
+            for accept in ('identity', 'gzip', 'br, gzip'):
+                sent[accept] = len(client.get(url, headers={**headers, 'Accept-Encoding': accept}).get_data())
+            measured = measure_route(app_module, encoding, response.get_json(), args.repeat)
+            results['routes'][route] = {'status': response.status_code, 'bytes_sent': sent, **measured}
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for route, result in results['routes'].items():
+        print(f"\n{route} (HTTP {result['status']})")
+        sent = ', '.join(f"{accept}: {size} B" for accept, size in result['bytes_sent'].items())
+        print(f"  bytes sent by Accept-Encoding: {sent}")
+        for name in ('json_stdlib', 'json_orjson'):
+            if name in result:
+                print(f"  {name:<12} {result[name]['bytes']:>8} B  encode p50 {result[name]['encode_ms']} ms")
+        for coding in ('gzip', 'br'):
+            if coding in result:
+                stats = result[coding]
+                print(f"  {coding:<12} {stats['bytes']:>8} B  ({stats['ratio']:.1%})  compress p50 {stats['compress_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
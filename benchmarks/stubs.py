@@ -0,0 +1,409 @@
+"""
+Local stand-ins for the services app.py talks to, for benchmarks.
+
+Every stub runs a threaded HTTP server on 127.0.0.1, can inject latency and
+failures, and counts the requests it receives so a benchmark can report
+outbound calls per operation.
+"""
+import json
+import random
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import quoteattr
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama',
+          'Family', 'Fantasy', 'Horror', 'Mystery', 'Romance', 'Science Fiction', 'Thriller']
+CONTENT_RATINGS = ['G', 'PG', 'PG-13', 'R', 'NR']
+
+# Cast members Plex includes per item in section listings
+LISTING_ROLES = 3
+
+# One transparent 1x1 GIF stands in for every poster
+PIXEL_GIF = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+             b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+
+
+class StubServer:
+    """Threaded HTTP stub with latency/failure injection and request counters"""
+
+    name = 'stub'
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.counts = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_requests(self):
+        return sum(self.counts.values())
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+            self.bytes_sent = 0
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, every
+            # kept-alive request would wait ~40 ms for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method):
+                parsed = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, content_type, payload, route = stub.handle(method, parsed.path, query, self.headers, body)
+                stub._count(route, len(payload))
+
+                with stub._lock:
+                    delay = stub.latency + stub.rng.uniform(0, stub.jitter)
+                    failed = stub.rng.random() < stub.failure_rate
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    status, content_type, payload = 503, 'text/plain', b'injected failure'
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def _count(self, route, size):
+        with self._lock:
+            self.counts[route] += 1
+            self.bytes_sent += size
+
+    def handle(self, method, path, query, headers, body):
+        """Return (status, content type, payload bytes, route label)"""
+        raise NotImplementedError
+
+    @staticmethod
+    def json_response(data, route, status=200):
+        return status, 'application/json', json.dumps(data).encode('utf-8'), route
+
+
+class FakePlex(StubServer):
+    """Minimal Plex Media Server with one movie section of generated titles"""
+
+    name = 'plex'
+
+    def __init__(self, library_size=1000, watched_ratio=0.3, section_title='Movies', **kwargs):
+        super().__init__(**kwargs)
+        self.section_title = section_title
+        self.machine_identifier = 'benchmark-plex-server'
+        rng = random.Random(kwargs.get('seed', 0))
+        self.items = []
+        for i in range(1, library_size + 1):
+            self.items.append({
+                'ratingKey': i,
+                'title': f"Benchmark Movie {i}",
+                'year': rng.randint(1950, 2024),
+                'summary': ' '.join(['A generated synopsis for benchmarking.'] * rng.randint(2, 8)),
+                'duration': rng.randint(75, 180) * 60000,
+                'contentRating': rng.choice(CONTENT_RATINGS),
+                'genres': rng.sample(GENRES, rng.randint(1, 3)),
+                'cast': [f"Actor {rng.randint(1, library_size)}" for _ in range(rng.randint(3, 8))],
+                'directors': [f"Director {rng.randint(1, max(1, library_size // 10))}"],
+                'watched': rng.random() < watched_ratio,
+            })
+        self.by_key = {item['ratingKey']: item for item in self.items}
+
+    def _video(self, item, full=True):
+        """Video element of an item; like Plex, listings (full=False) carry only the first few cast members"""
+        key = item['ratingKey']
+        attrs = {
+            'ratingKey': key,
+            'key': f"/library/metadata/{key}",
+            'guid': f"plex://movie/benchmark{key}",
+            'type': 'movie',
+            'title': item['title'],
+            'year': item['year'],
+            'summary': item['summary'],
+            'duration': item['duration'],
+            'contentRating': item['contentRating'],
+            'thumb': f"/library/metadata/{key}/thumb/1700000000",
+            'librarySectionID': 1,
+            'librarySectionKey': '/library/sections/1',
+        }
+        if item['watched']:
+            attrs['viewCount'] = 1
+        children = ''.join(f"<Genre tag={quoteattr(g)}/>" for g in item['genres'])
+        children += ''.join(f"<Director tag={quoteattr(d)}/>" for d in item['directors'])
+        # Only the first cast member has a Plex thumb, the rest fall through to the scrapers
+        for i, actor in enumerate(item['cast'] if full else item['cast'][:LISTING_ROLES]):
+            thumb = f' thumb="/library/metadata/{key}/actor/{i}"' if i == 0 else ''
+            children += f"<Role tag={quoteattr(actor)}{thumb}/>"
+        attr_text = ' '.join(f"{k}={quoteattr(str(v))}" for k, v in attrs.items())
+        return f"<Video {attr_text}>{children}</Video>"
+
+    def _container(self, inner, **attrs):
+        attr_text = ' '.join(f"{k}={quoteattr(str(v))}" for k, v in attrs.items())
+        xml = f'<?xml version="1.0" encoding="UTF-8"?><MediaContainer {attr_text}>{inner}</MediaContainer>'
+        return xml.encode('utf-8')
+
+    def _filter_meta(self):
+        """includeMeta response plexapi uses to validate search filters"""
+        fields = ''.join(
+            f'<Field key="{key}" title="{key}" type="{kind}"/>'
+            for key, kind in (('title', 'string'), ('year', 'integer'), ('genre', 'tag'),
+                              ('contentRating', 'string'), ('unwatched', 'boolean'))
+        )
+        filters = ('<Filter filter="genre" filterType="string" key="/library/sections/1/genre" title="Genre" type="filter"/>'
+                   '<Filter filter="unwatched" filterType="boolean" key="/library/sections/1/unwatched" title="Unwatched" type="filter"/>')
+        sorts = ''.join(
+            f'<Sort defaultDirection="asc" descKey="{key}:desc" key="{key}" title="{key}"/>'
+            for key in ('titleSort', 'year', 'addedAt', 'random')
+        )
+        meta = (f'<Meta><Type key="/library/sections/1/all?type=1" type="movie" title="Movies" active="1">'
+                f'{filters}{sorts}{fields}</Type>'
+                '<FieldType type="string"><Operator key="=" title="is"/></FieldType>'
+                '<FieldType type="integer"><Operator key="=" title="is"/></FieldType>'
+                '<FieldType type="tag"><Operator key="=" title="is"/></FieldType>'
+                '<FieldType type="boolean"><Operator key="=" title="is"/></FieldType></Meta>')
+        return meta
+
+    def handle(self, method, path, query, headers, body):
+        if path in ('/', ''):
+            return 200, 'text/xml', self._container(
+                '', machineIdentifier=self.machine_identifier, friendlyName='Benchmark Plex',
+                version='1.40.0.0', platform='Linux', size=0), 'identity'
+        if path in ('/library', '/library/'):
+            return 200, 'text/xml', self._container(
+                '<Directory key="sections" title="Library Sections"/>', size=1), 'library'
+        if path == '/library/sections':
+            section = (f'<Directory allowSync="1" key="1" type="movie" title={quoteattr(self.section_title)} '
+                       f'agent="tv.plex.agents.movie" scanner="Plex Movie" language="en-US" '
+                       f'uuid="benchmark-section"><Location id="1" path="/movies"/></Directory>')
+            return 200, 'text/xml', self._container(section, size=1), 'sections'
+        if path == '/library/sections/1/collections':
+            # plexapi's section.search() lists collections to validate its filters
+            return 200, 'text/xml', self._container('', size=0, totalSize=0), 'collections'
+        if path == '/library/sections/1/all':
+            if query.get('includeMeta') == '1':
+                total = len(self.items)
+                return 200, 'text/xml', self._container(self._filter_meta(), size=0, totalSize=total), 'section_meta'
+            items = self.items
+            if query.get('unwatched') == '1':
+                items = [item for item in items if not item['watched']]
+            if 'genre' in query:
+                items = [item for item in items if query['genre'] in item['genres']]
+            if 'title' in query:
+                items = [item for item in items if query['title'].lower() in item['title'].lower()]
+            if query.get('sort', '').startswith('random'):
+                items = self.rng.sample(items, len(items))
+            start = int(headers.get('X-Plex-Container-Start') or query.get('X-Plex-Container-Start') or 0)
+            size = headers.get('X-Plex-Container-Size') or query.get('X-Plex-Container-Size')
+            page = items[start:start + int(size)] if size is not None else items[start:]
+            inner = ''.join(self._video(item, full=False) for item in page)
+            return 200, 'text/xml', self._container(
+                inner, size=len(page), totalSize=len(items), offset=start), 'section_search'
+        if path.startswith('/library/metadata/'):
+            parts = path.strip('/').split('/')
+            if path.endswith('/extras'):
+                return 200, 'text/xml', self._container('', size=0), 'extras'
+            if len(parts) > 3:
+                return 200, 'image/gif', PIXEL_GIF, 'image'
+            # Several items can be asked for at once: /library/metadata/1,2,3
+            keys = parts[2].split(',')
+            items = [self.by_key.get(int(key)) for key in keys if key.isdigit()]
+            items = [item for item in items if item is not None]
+            if not items:
+                return 404, 'text/plain', b'not found', 'metadata'
+            inner = ''.join(self._video(item) for item in items)
+            return 200, 'text/xml', self._container(inner, size=len(items)), 'metadata'
+        if path.startswith('/photo/') or path.endswith('/thumb'):
+            return 200, 'image/gif', PIXEL_GIF, 'image'
+        return 404, 'text/plain', b'not found', 'unknown'
+
+
+class FakeBackend(StubServer):
+    """In-memory stand-in for plex-backend's auth and match room API"""
+
+    name = 'backend'
+
+    def __init__(self, min_participants=2, list_size=100, **kwargs):
+        super().__init__(**kwargs)
+        self.min_participants = min_participants
+        self.list_size = list_size  # Entries in every user's watchlist and watch history
+        self.rooms = {}
+        self.swipes = {}  # room_id -> {user: {movie_id: direction}}
+        self.first_match = {}  # room_id -> swipe count when the first match happened
+        self.swipe_counts = Counter()
+
+    def _user(self, headers):
+        auth = headers.get('Authorization', '')
+        return auth.split(' ', 1)[1] if ' ' in auth else 'anonymous'
+
+    def _matches(self, room_id):
+        likes = Counter()
+        for movies in self.swipes.get(room_id, {}).values():
+            for movie_id, direction in movies.items():
+                if direction in ('right', 'super'):
+                    likes[movie_id] += 1
+        needed = self.rooms[room_id]['min_participants']
+        return [movie_id for movie_id, count in likes.items() if count >= needed]
+
+    def handle(self, method, path, query, headers, body):
+        data = json.loads(body) if body else {}
+        parts = path.strip('/').split('/')
+
+        if path == '/auth/plex':
+            return self.json_response({'token': f"backend-{data.get('plex_token', '')}"}, 'auth')
+
+        if path in ('/api/watchlist', '/api/watch/history'):
+            items = [{
+                'movie_id': str(1000 + i),
+                'title': f"Movie {i}",
+                'year': 1970 + i % 55,
+                'summary': ' '.join(f"Word{(i * 7 + j) % 97}" for j in range(40)),
+                'added_at': f"2024-01-{1 + i % 28:02d}T12:00:00Z",
+            } for i in range(self.list_size)]
+            key = 'watchlist' if path == '/api/watchlist' else 'history'
+            return self.json_response({key: items}, key)
+
+        if parts[:2] != ['match', 'rooms']:
+            return self.json_response({'detail': 'Not found'}, 'unknown', 404)
+
+        if len(parts) == 2:
+            if method == 'POST':
+                with self._lock:
+                    room_id = f"room{len(self.rooms) + 1}"
+                    self.rooms[room_id] = {
+                        'id': room_id,
+                        'name': data.get('name', 'Movie Night'),
+                        'library_filter': data.get('library_filter', 'Movies'),
+                        'min_participants': data.get('min_participants', self.min_participants),
+                        'users': [],
+                    }
+                    self.swipes[room_id] = {}
+                return self.json_response(self.rooms[room_id], 'create_room')
+            return self.json_response({'rooms': list(self.rooms.values())}, 'list_rooms')
+
+        room_id = parts[2]
+        room = self.rooms.get(room_id)
+        if room is None:
+            return self.json_response({'detail': 'Room not found'}, 'room', 404)
+        user = self._user(headers)
+        action = parts[3] if len(parts) > 3 else None
+
+        if action is None:
+            return self.json_response(room, 'room')
+        if action == 'join':
+            with self._lock:
+                room['users'].append({'username': data.get('username', 'Anonymous')})
+                self.swipes[room_id].setdefault(user, {})
+            return self.json_response({'success': True, 'room': room}, 'join')
+        if action == 'user-swipes':
+            swiped = list(self.swipes[room_id].get(user, {}))
+            return self.json_response({'swiped_movies': swiped}, 'user_swipes')
+        if action == 'swipe':
+            with self._lock:
+                self.swipes[room_id].setdefault(user, {})[str(data['movie_id'])] = data['direction']
+                self.swipe_counts[room_id] += 1
+                is_match = str(data['movie_id']) in self._matches(room_id)
+                if is_match and room_id not in self.first_match:
+                    self.first_match[room_id] = self.swipe_counts[room_id]
+            return self.json_response({'success': True, 'message': 'Swipe recorded', 'match': is_match}, 'swipe')
+        if action == 'matches':
+            matches = [{'movie_id': movie_id} for movie_id in self._matches(room_id)]
+            return self.json_response({'matches': matches}, 'matches')
+        return self.json_response({'detail': 'Not found'}, 'unknown', 404)
+
+
+class FakeDuckDuckGo(StubServer):
+    """DuckDuckGo image search (actor photos) and HTML search (trailers)"""
+
+    name = 'duckduckgo'
+
+    def __init__(self, hit_rate=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.hit_rate = hit_rate
+
+    def handle(self, method, path, query, headers, body):
+        with self._lock:
+            hit = self.rng.random() < self.hit_rate
+        if path.startswith('/html'):
+            links = '<a href="https://www.youtube.com/watch?v=dQw4w9WgXcQ">Trailer</a>' if hit else ''
+            page = f"<html><body>{'<div>result</div>' * 50}{links}</body></html>"
+            return 200, 'text/html', page.encode('utf-8'), 'trailer_search'
+        image = '"image":"https:\\/\\/images.example\\/actor.jpg"' if hit else ''
+        page = f"<html><script>var results = {{{image}}};</script>{'<div>noise</div>' * 200}</html>"
+        return 200, 'text/html', page.encode('utf-8'), 'image_search'
+
+
+class FakeAniList(StubServer):
+    """AniList GraphQL Staff lookup"""
+
+    name = 'anilist'
+
+    def __init__(self, hit_rate=0.2, **kwargs):
+        super().__init__(**kwargs)
+        self.hit_rate = hit_rate
+
+    def handle(self, method, path, query, headers, body):
+        with self._lock:
+            hit = self.rng.random() < self.hit_rate
+        if not hit:
+            return self.json_response({'data': {'Staff': None}, 'errors': [{'message': 'Not Found.'}]}, 'staff', 404)
+        image = {'large': 'https://images.example/anilist-large.jpg', 'medium': 'https://images.example/anilist.jpg'}
+        return self.json_response({'data': {'Staff': {'image': image}}}, 'staff')
+
+
+class FakeWikipedia(StubServer):
+    """MediaWiki pageimages query"""
+
+    name = 'wikipedia'
+
+    def __init__(self, hit_rate=0.7, **kwargs):
+        super().__init__(**kwargs)
+        self.hit_rate = hit_rate
+
+    def handle(self, method, path, query, headers, body):
+        with self._lock:
+            hit = self.rng.random() < self.hit_rate
+        page = {'pageid': 1, 'title': query.get('titles', '')}
+        if hit:
+            page['thumbnail'] = {'source': 'https://images.example/wiki.jpg', 'width': 200, 'height': 300}
+        return self.json_response({'query': {'pages': {'1': page}}}, 'pageimages')
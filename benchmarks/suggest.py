@@ -0,0 +1,192 @@
+"""
+Benchmark the single-suggestion enrichment pipeline (/api/suggest and /).
+
+Runs the routes against local stubs for Plex, DuckDuckGo, AniList and
+Wikipedia, and reports per-route latency, a stage-by-stage breakdown of
+get_random_movie and outbound calls per request for each library size.
+
+    python benchmarks/suggest.py --libraries 500,5000 --requests 20 \\
+        --scraper-latency 0.05 --scraper-failure-rate 0.1 --json > run.json
+    python benchmarks/suggest.py --libraries 500,5000 --compare run.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from harness import LatencyRecorder, check_response, latency_summary, load_app
+from stubs import FakeAniList, FakeDuckDuckGo, FakePlex, FakeWikipedia
+
+
+class StageTimer:
+    """Temporarily wraps functions so each call is timed under a stage label"""
+
+    def __init__(self):
+        self.calls = []  # (label, seconds) for the current request
+        self._patched = []
+
+    def wrap(self, owner, attr, label):
+        original = getattr(owner, attr)
+        timer = self
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer.calls.append((label, time.perf_counter() - start))
+
+        setattr(owner, attr, timed)
+        self._patched.append((owner, attr, original))
+
+    def restore(self):
+        for owner, attr, original in reversed(self._patched):
+            setattr(owner, attr, original)
+        self._patched = []
+
+    def take(self):
+        """Return {stage: total seconds} for the calls since the last take"""
+        totals = {}
+        for label, seconds in self.calls:
+            totals[label] = totals.get(label, 0.0) + seconds
+        self.calls = []
+        return totals
+
+
+def instrument(app_module):
+    """Wrap every stage of get_random_movie"""
+    from plexapi.server import PlexServer
+    from plexapi.video import Movie
+
+    timer = StageTimer()
+    # Wrap the constructor, not the class: plexapi calls super(PlexServer, self), which needs a real type
+    timer.wrap(PlexServer, '__init__', 'plex_connect')
+    timer.wrap(app_module.sampling, 'sample_unwatched', 'plex_sample')
+    timer.wrap(Movie, 'extras', 'plex_extras')
+    timer.wrap(app_module, 'get_imdb_actor_image', 'cast_duckduckgo')
+    timer.wrap(app_module, 'get_anilist_actor_image', 'cast_anilist')
+    timer.wrap(app_module, 'get_wikipedia_actor_image', 'cast_wikipedia')
+    timer.wrap(app_module, 'get_external_trailer_url', 'trailer')
+    return timer
+
+
+def run_size(app_module, stubs, library_size, args):
+    """Benchmark both routes against one library size"""
+    plex = FakePlex(library_size=library_size, latency=args.plex_latency, seed=args.seed).start()
+    app_module.PLEX_URL = plex.url
+    app_module._plex_connections.clear()  # Cached connections point at the previous stub
+    all_stubs = dict(stubs, plex=plex)
+    timer = instrument(app_module)
+    recorder = LatencyRecorder()
+    stages = {}
+    calls = {}
+
+    try:
+        client = app_module.app.test_client()
+        response = check_response('POST /auth/plex', client.post('/auth/plex', json={'plex_token': 'bench-token'}))
+        token = response.get_json()['token']
+        headers = {'Authorization': f"Bearer {token}"}
+
+        routes = [
+            ('GET /api/suggest', lambda: client.get('/api/suggest?library=Movies', headers=headers)),
+            ('GET /', lambda: client.get('/?library=Movies')),
+        ]
+        for route, call in routes:
+            # The home page uses the server token from the environment
+            app_module.PLEX_TOKEN = 'bench-token' if route == 'GET /' else None
+            for stub in all_stubs.values():
+                stub.reset_counts()
+            timer.take()
+
+            for _ in range(args.requests):
+                check_response(route, recorder.timed(route, call))
+                for stage, seconds in timer.take().items():
+                    stages.setdefault(route, {}).setdefault(stage, []).append(seconds)
+
+            calls[route] = {name: round(stub.total_requests / args.requests, 2) for name, stub in all_stubs.items()}
+    finally:
+        timer.restore()
+        app_module.PLEX_TOKEN = None
+        plex.stop()
+
+    return {
+        'routes': recorder.summary(),
+        'stages': {route: {stage: latency_summary(values) for stage, values in sorted(by_stage.items())}
+                   for route, by_stage in stages.items()},
+        'outbound_calls_per_request': calls,
+    }
+
+
+def print_results(results, baseline=None):
+    for size, result in results['library_sizes'].items():
+        old = (baseline or {}).get('library_sizes', {}).get(size, {})
+        print(f"\nLibrary size {size}")
+        for route, stats in result['routes'].items():
+            delta = ''
+            old_stats = old.get('routes', {}).get(route)
+            if old_stats and old_stats['p50_ms']:
+                delta = f" ({(stats['p50_ms'] - old_stats['p50_ms']) / old_stats['p50_ms'] * 100:+.1f}% p50)"
+            print(f"  {route:<18} p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms{delta}")
+            for stage, stage_stats in result['stages'].get(route, {}).items():
+                print(f"    {stage:<16} p50 {stage_stats['p50_ms']:>8} ms  p95 {stage_stats['p95_ms']:>8} ms")
+            calls = ', '.join(f"{name} {count}" for name, count in result['outbound_calls_per_request'][route].items())
+            print(f"    outbound calls per request: {calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--libraries', default='200,2000', help='Comma-separated library sizes')
+    parser.add_argument('--requests', type=int, default=10, help='Requests per route and library size')
+    parser.add_argument('--plex-latency', type=float, default=0.0)
+    parser.add_argument('--scraper-latency', type=float, default=0.0)
+    parser.add_argument('--scraper-failure-rate', type=float, default=0.0,
+                        help='Share of scraper responses replaced by HTTP 503')
+    parser.add_argument('--pool-size', type=int, default=0,
+                        help='Suggestion pool size (0 measures the full pipeline on every request)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable results')
+    parser.add_argument('--compare', help='Previous --json output to compare p50 latencies against')
+    args = parser.parse_args()
+
+    scraper_options = {'latency': args.scraper_latency, 'failure_rate': args.scraper_failure_rate, 'seed': args.seed}
+    stubs = {
+        'duckduckgo': FakeDuckDuckGo(**scraper_options).start(),
+        'anilist': FakeAniList(**scraper_options).start(),
+        'wikipedia': FakeWikipedia(**scraper_options).start(),
+    }
+    try:
+        app_module = load_app({
+            'PLEX_URL': 'http://127.0.0.1:9',  # Replaced per library size
+            'PLEX_LIBRARY': 'Movies',
+            'SUGGESTION_POOL_SIZE': str(args.pool_size),
+            'DUCKDUCKGO_URL': stubs['duckduckgo'].url,
+            'ANILIST_API_URL': stubs['anilist'].url,
+            'WIKIPEDIA_API_URL': f"{stubs['wikipedia'].url}/w/api.php",
+        })
+        results = {
+            'config': vars(args),
+            'library_sizes': {
+                size: run_size(app_module, stubs, int(size), args)
+                for size in args.libraries.split(',')
+            },
+        }
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+import resilience
+
+# Shared cache tier on a Redis-protocol server, e.g. "redis://cache:6379/0".
+# Without it every cache stays per-process, as with a single replica.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+# Keys of all replicas sharing a server start with this prefix
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "plex-suggester")
+
+# Seconds a call to the shared tier may take before it counts as a miss
+CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", "0.25"))
+
+# Local copies of shared entries are trusted for at most this long, in case an invalidation was missed
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "30"))
+
+INVALIDATION_CHANNEL = f"{CACHE_PREFIX}:invalidate"
+
+
+class LocalTier:
+    """Bounded in-process LRU with a per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+        return found
+
+    def set_many(self, items, ttl):
+        expires_at = time.time() + ttl
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class SharedTier:
+    """
+    Cache tier on a Redis-protocol server, shared by every replica. Values
+    are stored as JSON. Any client with redis-py's set, mget, pipeline,
+    delete, publish and pubsub methods works, so tests can hand a stand-in
+    to use().
+    Calls go through a circuit breaker: while the server is down or slow
+    they cost nothing and every lookup is a miss.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def get_many(self, keys):
+        try:
+            with resilience.guard('cache', timeout=CACHE_TIMEOUT):
+                values = self.client.mget(keys)
+        except resilience.Unavailable:
+            return {}
+        except Exception as e:
+            print(f"Shared cache read failed: {e}")
+            return {}
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items, ttl):
+        try:
+            with resilience.guard('cache', timeout=CACHE_TIMEOUT):
+                pipeline = self.client.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipeline.setex(key, max(1, int(ttl)), json.dumps(value, separators=(',', ':')))
+                pipeline.execute()
+        except resilience.Unavailable:
+            return
+        except Exception as e:
+            print(f"Shared cache write failed: {e}")
+
+    def add(self, key, value, ttl):
+        """
+        Set a key unless it exists (SET NX) and return whether it was set.
+        Unlike the cache methods, failures raise: a claim that may not have
+        been made must not look like one that was.
+        """
+        with resilience.guard('cache', timeout=CACHE_TIMEOUT):
+            return bool(self.client.set(key, json.dumps(value, separators=(',', ':')), nx=True, ex=max(1, int(ttl))))
+
+    def put(self, key, value, ttl):
+        """Set a key, raising on failure"""
+        with resilience.guard('cache', timeout=CACHE_TIMEOUT):
+            self.client.set(key, json.dumps(value, separators=(',', ':')), ex=max(1, int(ttl)))
+
+    def delete(self, keys):
+        """Delete keys and tell every replica to drop its local copies"""
+        try:
+            with resilience.guard('cache', timeout=CACHE_TIMEOUT):
+                self.client.delete(*keys)
+                self.client.publish(INVALIDATION_CHANNEL, json.dumps(list(keys)))
+        except resilience.Unavailable:
+            return
+        except Exception as e:
+            print(f"Shared cache invalidation failed: {e}")
+
+    def listen(self, on_invalidate):
+        """Start a daemon thread passing broadcast invalidations to on_invalidate(keys)"""
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, args=(on_invalidate,),
+                                              name='cache-invalidations', daemon=True)
+            self._listener.start()
+
+    def _listen(self, on_invalidate):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        on_invalidate(json.loads(message['data']))
+            except Exception as e:
+                print(f"Cache invalidation listener failed, reconnecting: {e}")
+            # Messages sent while disconnected are lost; CACHE_LOCAL_TTL bounds the staleness
+            time.sleep(1)
+
+
+_shared = None
+_shared_configured = False
+_shared_lock = threading.Lock()
+_namespaces = {}
+
+
+def _configure(client):
+    global _shared, _shared_configured
+    _shared = SharedTier(client) if client is not None else None
+    _shared_configured = True
+    if _shared is not None:
+        _shared.listen(_drop_local)
+    return _shared
+
+
+def use(client):
+    """Use a Redis-protocol client (or a stand-in) as the shared tier; None makes caches per-process"""
+    with _shared_lock:
+        return _configure(client)
+
+
+def shared_tier():
+    """The shared tier, connected on first use so that each Gunicorn worker gets its own connections"""
+    if _shared_configured:
+        return _shared
+    with _shared_lock:
+        if _shared_configured:
+            return _shared
+        client = None
+        if CACHE_REDIS_URL:
+            import redis  # Only needed with CACHE_REDIS_URL
+            client = redis.Redis.from_url(CACHE_REDIS_URL, socket_timeout=CACHE_TIMEOUT,
+                                          socket_connect_timeout=CACHE_TIMEOUT)
+        return _configure(client)
+
+
+def _drop_local(keys):
+    for ns in list(_namespaces.values()):
+        ns.local.delete(keys)
+
+
+class Namespace:
+    """
+    A named cache with its own TTL and local size bound. Lookups hit the
+    in-process LRU first and then the shared tier (if any), whose hits are
+    copied into the LRU. Keys are strings; values must be JSON-serializable.
+    """
+
+    def __init__(self, name, ttl, max_local=1024):
+        self.name = name
+        self.ttl = ttl
+        self.local = LocalTier(max_local)
+
+    def _key(self, key):
+        return f"{CACHE_PREFIX}:{self.name}:{key}"
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys found in either tier"""
+        keys = list(dict.fromkeys(keys))
+        full_keys = {self._key(key): key for key in keys}
+        found = self.local.get_many(full_keys)
+
+        shared = shared_tier()
+        missing = [full_key for full_key in full_keys if full_key not in found]
+        if shared is not None and missing:
+            fetched = shared.get_many(missing)
+            if fetched:
+                self.local.set_many(fetched, min(self.ttl, CACHE_LOCAL_TTL))
+                found.update(fetched)
+
+        for full_key in full_keys:
+            metrics.cache_event(self.name, full_key in found)
+        return {full_keys[full_key]: value for full_key, value in found.items()}
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        ttl = ttl or self.ttl
+        items = {self._key(key): value for key, value in items.items()}
+        shared = shared_tier()
+        self.local.set_many(items, min(ttl, CACHE_LOCAL_TTL) if shared is not None else ttl)
+        if shared is not None:
+            shared.set_many(items, ttl)
+
+    def delete(self, *keys):
+        """Drop keys here, in the shared tier and in every other replica's local tier"""
+        full_keys = [self._key(key) for key in keys]
+        self.local.delete(full_keys)
+        shared = shared_tier()
+        if shared is not None:
+            shared.delete(full_keys)
+
+
+def namespace(name, ttl, max_local=1024):
+    """Return the cache namespace called name, creating it on first use"""
+    with _shared_lock:
+        if name not in _namespaces:
+            _namespaces[name] = Namespace(name, ttl, max_local)
+        return _namespaces[name]
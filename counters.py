@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import cache
+
+# Like/dislike/watch counts are served from the cache for this many seconds
+COUNTERS_TTL = float(os.getenv("COUNTERS_TTL", "15"))
+
+# Movies whose counts each process keeps locally; least recently read ones are dropped first
+MAX_COUNTER_ENTRIES = int(os.getenv("MAX_COUNTER_ENTRIES", "5000"))
+
+# Local writes older than this are assumed to show up in the backend's counts
+PENDING_WRITE_TTL = max(COUNTERS_TTL * 2, 60)
+
+KINDS = ('likes', 'dislikes', 'watches')
+
+
+class CounterCache:
+    """
+    Short-lived cache of per-movie counters, shared by all replicas through
+    the 'counters' cache namespace.
+
+    fetch(movie_ids) returns {movie_id: {kind: count}} and is only called
+    for movies that are neither cached nor already being fetched by another
+    request in this process, which then waits for that fetch instead of
+    repeating it. Writes made through apply_write() are added on top of the
+    cached counts until a fetch started after the write replaces them.
+    """
+
+    def __init__(self, fetch, ttl=COUNTERS_TTL, max_entries=MAX_COUNTER_ENTRIES):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self._entries = cache.namespace('counters', ttl=ttl, max_local=max_entries)  # movie_id -> {counts, fetched_at}
+        self._pending = {}  # movie_id -> [(kind, delta, written at)]
+        self._inflight = {}  # movie_id -> threading.Event
+        self._lock = threading.Lock()
+
+    def _with_pending(self, movie_id, entry):
+        counts = dict(entry['counts'])
+        # Writes made before the fetch started are already part of its counts
+        for kind, delta, written_at in self._pending.get(movie_id, ()):
+            if written_at >= entry['fetched_at']:
+                counts[kind] = max(0, counts.get(kind, 0) + delta)
+        return counts
+
+    def get_many(self, movie_ids):
+        """Return {movie_id: counts} for every movie whose counts could be read"""
+        results = {}
+        to_fetch = []
+        waiting = []
+        movie_ids = list(dict.fromkeys(movie_ids))
+        cached = self._entries.get_many(movie_ids)
+        with self._lock:
+            for movie_id in movie_ids:
+                if movie_id in cached:
+                    results[movie_id] = self._with_pending(movie_id, cached[movie_id])
+                elif movie_id in self._inflight:
+                    waiting.append((movie_id, self._inflight[movie_id]))
+                else:
+                    self._inflight[movie_id] = threading.Event()
+                    to_fetch.append(movie_id)
+
+        if to_fetch:
+            started = time.time()
+            try:
+                fetched = self.fetch(to_fetch)
+            except Exception as e:
+                print(f"Failed to fetch counters: {e}")
+                fetched = {}
+            entries = {movie_id: {'counts': counts, 'fetched_at': started}
+                       for movie_id, counts in fetched.items() if movie_id in to_fetch}
+            self._entries.set_many(entries)
+            with self._lock:
+                for movie_id in to_fetch:
+                    if movie_id in entries:
+                        self._prune(movie_id, started)
+                        results[movie_id] = self._with_pending(movie_id, entries[movie_id])
+                    self._inflight.pop(movie_id).set()
+
+        for movie_id, done in waiting:
+            done.wait(timeout=10)
+            entry = self._entries.get(movie_id)
+            if entry is not None:
+                with self._lock:
+                    results[movie_id] = self._with_pending(movie_id, entry)
+        return results
+
+    def _prune(self, movie_id, started):
+        pending = [write for write in self._pending.get(movie_id, ()) if write[2] >= started]
+        if pending:
+            self._pending[movie_id] = pending
+        else:
+            self._pending.pop(movie_id, None)
+
+    def apply_write(self, movie_id, kind, delta):
+        """Reflect a successful write in the counts served before the next fetch"""
+        now = time.time()
+        with self._lock:
+            pending = [write for write in self._pending.get(movie_id, ()) if now - write[2] < PENDING_WRITE_TTL]
+            pending.append((kind, delta, now))
+            self._pending[movie_id] = pending
+            if len(self._pending) > self.max_entries:
+                # Movies written to but not read since; their writes are long part of the backend's counts
+                for stale in [key for key, writes in self._pending.items() if now - writes[-1][2] >= PENDING_WRITE_TTL]:
+                    del self._pending[stale]
@@ -1,11 +1,12 @@
 import sqlite3
 import os
+import json
+
+DB_PATH = os.getenv("MATCH_DB_PATH", os.path.join(os.path.dirname(__file__), 'movie_match.db'))
 
 def init_db():
     """Initialize the SQLite database for movie matching functionality"""
-    db_path = os.path.join(os.path.dirname(__file__), 'movie_match.db')
-    
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # Create match rooms table
@@ -47,6 +48,31 @@ def init_db():
         )
     ''')
     
+    # Create swipe receipts table (idempotency keys of swipes sent in batches)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS swipe_receipts (
+            room_id TEXT,
+            user_id TEXT,
+            idempotency_key TEXT,
+            movie_id TEXT,
+            result TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (room_id, user_id, idempotency_key)
+        )
+    ''')
+    
+    # Create room pool table (titles participants searched for and added to a room)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room_pool (
+            room_id TEXT,
+            movie_id TEXT,
+            added_by TEXT,
+            movie_data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (room_id, movie_id)
+        )
+    ''')
+    
     # Create index for faster queries
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_room_swipes ON movie_swipes(room_id, movie_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_swipes ON movie_swipes(room_id, user_id)')
@@ -54,14 +80,152 @@ def init_db():
     conn.commit()
     conn.close()
     
-    print(f"Database initialized at: {db_path}")
+    print(f"Database initialized at: {DB_PATH}")
 
 def get_db_connection():
     """Get a database connection"""
-    db_path = os.path.join(os.path.dirname(__file__), 'movie_match.db')
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
     return conn
 
+def record_swipe(room_id, user_id, movie_id, movie_title, movie_year, direction):
+    """Mirror a swipe into the local movie_swipes table (last swipe wins)"""
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO movie_swipes
+                (room_id, user_id, movie_id, movie_title, movie_year, swipe_direction)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (room_id, user_id, str(movie_id), movie_title, movie_year, direction))
+        conn.commit()
+    finally:
+        conn.close()
+
+# Seconds a claimed idempotency key stays reserved for the request applying it
+SWIPE_CLAIM_TIMEOUT = int(os.getenv("SWIPE_CLAIM_TIMEOUT", "60"))
+
+def get_swipe_receipts(room_id, user_id, keys):
+    """Get {key: result} of idempotency keys already claimed; result is None while a swipe is being applied"""
+    if not keys:
+        return {}
+    conn = get_db_connection()
+    try:
+        placeholders = ','.join('?' * len(keys))
+        rows = conn.execute(f'''
+            SELECT idempotency_key, result
+            FROM swipe_receipts
+            WHERE room_id = ? AND user_id = ? AND idempotency_key IN ({placeholders})
+        ''', (room_id, user_id, *keys)).fetchall()
+        return {row['idempotency_key']: json.loads(row['result']) if row['result'] else None for row in rows}
+    finally:
+        conn.close()
+
+def claim_swipe_receipt(room_id, user_id, key):
+    """
+    Claim an idempotency key right before its swipe is applied, so that
+    concurrent copies of a batch apply it once. Returns False if another
+    request holds the key or has applied it already. A claim left behind
+    by a crashed request can be taken over once it is SWIPE_CLAIM_TIMEOUT
+    seconds old.
+    """
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.execute('''
+                INSERT INTO swipe_receipts (room_id, user_id, idempotency_key)
+                VALUES (?, ?, ?)
+                ON CONFLICT (room_id, user_id, idempotency_key) DO UPDATE
+                    SET created_at = CURRENT_TIMESTAMP
+                    WHERE result IS NULL AND created_at < datetime('now', ?)
+            ''', (room_id, user_id, key, f'-{SWIPE_CLAIM_TIMEOUT} seconds'))
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+def complete_swipe_receipt(room_id, user_id, key, movie_id, result):
+    """Store the result of a claimed key's swipe, so resent copies report it instead of applying it again"""
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute('''
+                UPDATE swipe_receipts SET movie_id = ?, result = ?
+                WHERE room_id = ? AND user_id = ? AND idempotency_key = ?
+            ''', (str(movie_id), json.dumps(result), room_id, user_id, key))
+    finally:
+        conn.close()
+
+def release_swipe_receipts(room_id, user_id, keys):
+    """Drop claims on idempotency keys whose swipes were not applied, so they can be retried"""
+    if not keys:
+        return
+    conn = get_db_connection()
+    try:
+        with conn:
+            placeholders = ','.join('?' * len(keys))
+            conn.execute(f'''
+                DELETE FROM swipe_receipts
+                WHERE room_id = ? AND user_id = ? AND result IS NULL AND idempotency_key IN ({placeholders})
+            ''', (room_id, user_id, *keys))
+    finally:
+        conn.close()
+
+def record_swipe_batch(room_id, user_id, swipes):
+    """
+    Mirror a batch of swipes in one transaction. Each swipe is a dict with
+    movie_id, movie_title, movie_year and direction.
+    """
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO movie_swipes
+                    (room_id, user_id, movie_id, movie_title, movie_year, swipe_direction)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(room_id, user_id, str(swipe['movie_id']), swipe['movie_title'], swipe['movie_year'], swipe['direction'])
+                  for swipe in swipes])
+    finally:
+        conn.close()
+
+def get_room_swipes(room_id):
+    """Get every swipe recorded in a room, oldest first"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT user_id, movie_id, movie_title, movie_year, swipe_direction
+            FROM movie_swipes
+            WHERE room_id = ?
+            ORDER BY created_at, rowid
+        ''', (room_id,)).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def add_to_room_pool(room_id, movie_id, added_by, movie_data):
+    """Add a title to a room's pool; returns False if it was already there"""
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO room_pool (room_id, movie_id, added_by, movie_data)
+                VALUES (?, ?, ?, ?)
+            ''', (room_id, str(movie_id), added_by, json.dumps(movie_data)))
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+def get_room_pool(room_id):
+    """Get the titles added to a room's pool, oldest first, as match data dicts"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT movie_id, added_by, movie_data
+            FROM room_pool
+            WHERE room_id = ?
+            ORDER BY created_at, rowid
+        ''', (room_id,)).fetchall()
+        return [{**json.loads(row['movie_data']), 'added_by': row['added_by']} for row in rows]
+    finally:
+        conn.close()
+
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,129 @@
+import gzip
+import os
+
+# JSON serializer for jsonify() and request.get_json(): "orjson" (faster, compact) or "flask" (the stdlib json module)
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson").lower()
+
+# Content codings offered to clients that accept them, most preferred first; empty disables compression
+COMPRESSION_ENCODINGS = [name.strip() for name in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(',') if name.strip()]
+
+# Bodies smaller than this many bytes are sent as they are; compressing them saves less than it costs
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Fast settings: responses are compressed per request, unlike prebuilt static files
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+
+def _orjson_provider_class():
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+
+    options = orjson.OPT_NON_STR_KEYS
+
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider backed by orjson; calls with extra json.dumps arguments use the stdlib"""
+
+        def dumps(self, obj, **kwargs):
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=self.default, option=options).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(orjson.dumps(obj, default=self.default, option=options),
+                                            mimetype=self.mimetype)
+
+    return OrjsonProvider
+
+
+def parse_accept_encoding(header):
+    """Return {coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, offered=None):
+    """The coding to use for a client, or None to send the body as it is"""
+    accepted = parse_accept_encoding(header)
+    best = None
+    for coding in (COMPRESSION_ENCODINGS if offered is None else offered):
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        # Ties go to the server's order of preference
+        if q > 0 and (best is None or q > best[1]):
+            best = (coding, q)
+    return best[0] if best else None
+
+
+def compress(data, coding):
+    if coding == 'br':
+        import brotli  # Only needed when "br" is offered
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if coding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding: {coding}")
+
+
+def is_compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def compress_response(response, accept_encoding):
+    """Compress a buffered response for a client if it is worth it"""
+    if (not COMPRESSION_ENCODINGS or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers or not is_compressible(response)):
+        # Streamed bodies (posters, large watchlists, send_file) are passed through untouched
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+    coding = negotiate(accept_encoding)
+    if coding is None:
+        return response
+
+    response.set_data(compress(data, coding))
+    response.headers['Content-Encoding'] = coding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # The compressed bytes differ, but the representation is the same, so If-None-Match keeps working
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Install the JSON provider and compress responses after each request"""
+    if JSON_PROVIDER == 'orjson':
+        app.json = _orjson_provider_class()(app)
+
+    if not COMPRESSION_ENCODINGS:
+        return
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, request.headers.get('Accept-Encoding'))
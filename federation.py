@@ -0,0 +1,132 @@
+import os
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Plex servers as "name=url" pairs, e.g. "main=http://10.0.0.2:32400,4k=http://10.0.0.3:32400".
+# The first one is the primary server; without PLEX_SERVERS it is PLEX_URL, named "main".
+PRIMARY_SERVER_NAME = 'main'
+
+# Servers that have not answered a fan-out query within this many seconds are skipped
+PLEX_FANOUT_BUDGET = float(os.getenv("PLEX_FANOUT_BUDGET", "2.0"))
+PLEX_FANOUT_WORKERS = int(os.getenv("PLEX_FANOUT_WORKERS", "8"))
+
+
+def _parse_servers(value, fallback_url):
+    servers = OrderedDict()
+    for part in (value or '').split(','):
+        name, sep, url = part.strip().partition('=')
+        if not sep:
+            continue
+        name = name.strip()
+        if not name or ':' in name:
+            raise ValueError(f"Invalid Plex server name in PLEX_SERVERS: {name!r}")
+        servers[name] = url.strip().rstrip('/')
+    if not servers and fallback_url:
+        servers[PRIMARY_SERVER_NAME] = fallback_url.rstrip('/')
+    return servers
+
+
+SERVERS = _parse_servers(os.getenv("PLEX_SERVERS"), os.getenv("PLEX_URL"))
+PRIMARY = next(iter(SERVERS), PRIMARY_SERVER_NAME)
+
+_executor = ThreadPoolExecutor(max_workers=PLEX_FANOUT_WORKERS, thread_name_prefix='plex-fanout')
+
+
+def is_federated():
+    return len(SERVERS) > 1
+
+
+def server_url(name):
+    return SERVERS.get(name)
+
+
+def item_id(server, rating_key):
+    """
+    Id of an item across servers. Items on the primary server keep their
+    plain rating key, so ids stored before federation stay valid.
+    """
+    if server in (None, PRIMARY):
+        return str(rating_key)
+    return f"{server}:{rating_key}"
+
+
+def parse_item_id(value):
+    """Return (server, rating_key) for an id made by item_id()"""
+    server, sep, rating_key = str(value).rpartition(':')
+    return (server if sep else PRIMARY), int(rating_key)
+
+
+def item_guid(server, item):
+    """Identity used to spot the same title on several servers"""
+    guid = getattr(item, 'guid', None)
+    # Agent GUIDs (plex://, imdb://, ...) are shared across servers; local ones are not
+    if guid and not guid.startswith(('local://', 'com.plexapp.agents.none')):
+        return guid
+    return f"{server}:{item.ratingKey}"
+
+
+def fan_out(fn, names, budget=PLEX_FANOUT_BUDGET):
+    """
+    Call fn(name) for every server concurrently and return {name: result}
+    in server order. Servers that fail or take longer than the budget are
+    left out; a None budget waits for all of them.
+    """
+    names = list(names)
+    if len(names) == 1:
+        # Nothing to overlap with, so skip the thread hop
+        try:
+            return {names[0]: fn(names[0])}
+        except Exception as e:
+            print(f"Plex server {names[0]} failed: {e}")
+            return {}
+
+    futures = {name: _executor.submit(fn, name) for name in names}
+    done, _ = wait(futures.values(), timeout=budget)
+    results = OrderedDict()
+    for name, future in futures.items():
+        if future not in done:
+            # Left running in the background; its result is simply ignored
+            print(f"Plex server {name} skipped: no answer within {budget}s")
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"Plex server {name} failed: {e}")
+    return results
+
+
+def merge_unique(results):
+    """
+    Merge {server: [items]} into one list of (server, item), keeping the
+    first copy of titles found on several servers (server order decides).
+    """
+    seen = set()
+    merged = []
+    for server, items in results.items():
+        for item in items:
+            guid = item_guid(server, item)
+            if guid not in seen:
+                seen.add(guid)
+                merged.append((server, item))
+    return merged
+
+
+def sample_merged(results, k, weights=None):
+    """
+    Up to k random distinct titles from per-server samples. With weights
+    ({server: unwatched count}) each pick lands on a server in proportion
+    to its library size, so a small server is not over-represented.
+    """
+    remaining = OrderedDict()
+    for server, item in merge_unique(results):
+        remaining.setdefault(server, []).append(item)
+    picks = []
+    while remaining and len(picks) < k:
+        servers = list(remaining)
+        server = random.choices(servers, [max((weights or {}).get(name, 1), 1) for name in servers])[0]
+        items = remaining[server]
+        picks.append((server, items.pop(random.randrange(len(items)))))
+        if not items:
+            del remaining[server]
+    return picks
@@ -0,0 +1,40 @@
+import os
+import shutil
+import sys
+
+
+def on_starting(server):
+    """Start every boot with an empty Prometheus multiprocess directory"""
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    """Time the app imports in each worker when STARTUP_PROFILE is on"""
+    import startup
+    if startup.STARTUP_PROFILE:
+        startup.profile_imports()
+
+
+def post_worker_init(worker):
+    """Warm up before the worker accepts traffic"""
+    import startup
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.warm_up()
+    startup.report(f"worker {worker.pid}")
+
+
+def child_exit(server, worker):
+    """Let the metrics module drop the dead worker's live series"""
+    import metrics
+    metrics.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    """Stop background suggestion refills before the worker goes away"""
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.suggestion_pool.shutdown()
@@ -0,0 +1,486 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Snapshot files sit next to the similarity indexes and are shared by every worker
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(os.path.dirname(__file__), 'indexes'))
+
+# Rebuild a library snapshot in the background once it is older than this
+LIBRARY_SNAPSHOT_TTL = int(os.getenv("LIBRARY_SNAPSHOT_TTL", "900"))
+
+# Runtime buckets are 15 minutes wide; everything past the last one shares a bucket
+RUNTIME_BUCKET_MINUTES = 15
+RUNTIME_BUCKET_MAX = 180
+
+# Snapshots are per user (watched state differs) and library; this bounds how
+# many of them one process keeps mapped, least recently used first out
+MAX_LIBRARY_SNAPSHOTS = int(os.getenv("MAX_LIBRARY_SNAPSHOTS", "8"))
+
+FACETS = ('genre', 'decade', 'rating', 'runtime')
+
+_MAGIC = b'PLIB'
+_VERSION = 3
+_HEADER = struct.Struct('<4sIIIdI4x')  # magic, version, item count, bitset words, built at, directory length
+_STRING_COLUMNS = ('title', 'summary', 'thumb', 'original_title')
+
+_loaded = OrderedDict()
+_building = set()
+_lock = threading.Lock()
+
+
+class FacetError(ValueError):
+    """Raised for facet filter values that cannot be parsed"""
+
+
+class SnapshotPending(RuntimeError):
+    """Raised while the first snapshot of a library is built in the background"""
+
+
+def runtime_bucket(minutes):
+    """Lower bound (in minutes) of the runtime bucket holding a duration"""
+    return min(int(minutes) // RUNTIME_BUCKET_MINUTES * RUNTIME_BUCKET_MINUTES, RUNTIME_BUCKET_MAX)
+
+
+def parse_decade(value):
+    """Accept '1990', '1990s' or '90s' and return '1990'"""
+    text = value.strip().lower().rstrip('s')
+    if not text.isdigit():
+        raise FacetError(f"Invalid decade: {value}")
+    year = int(text)
+    if len(text) <= 2:
+        year += 2000 if year < 30 else 1900
+    return str(year // 10 * 10)
+
+
+def parse_filters(args):
+    """
+    Build facet filters from request arguments.
+
+    Multiple values of one facet (comma separated) are ORed together and
+    different facets are ANDed, e.g. ?genre=Comedy,Romance&decade=1990s&max_runtime=120.
+    Returns {facet: set of index values}, empty if no filters were given.
+    """
+    filters = {}
+
+    def values(name):
+        raw = ','.join(args.getlist(name)) if hasattr(args, 'getlist') else args.get(name, '')
+        return [v.strip() for v in raw.split(',') if v.strip()]
+
+    if values('genre'):
+        filters['genre'] = {v.lower() for v in values('genre')}
+    if values('decade'):
+        filters['decade'] = {parse_decade(v) for v in values('decade')}
+    if values('rating'):
+        filters['rating'] = {v.lower() for v in values('rating')}
+
+    min_runtime = args.get('min_runtime')
+    max_runtime = args.get('max_runtime')
+    if min_runtime or max_runtime:
+        try:
+            low = int(min_runtime or 0)
+            high = int(max_runtime) if max_runtime else RUNTIME_BUCKET_MAX + RUNTIME_BUCKET_MINUTES
+        except ValueError:
+            raise FacetError("min_runtime and max_runtime must be minutes")
+        # Buckets overlapping the requested range, so bounds round out to 15 minutes
+        filters['runtime'] = {
+            str(bucket) for bucket in range(0, RUNTIME_BUCKET_MAX + 1, RUNTIME_BUCKET_MINUTES)
+            if bucket < high and (bucket == RUNTIME_BUCKET_MAX or bucket + RUNTIME_BUCKET_MINUTES > low)
+        }
+    return filters
+
+
+def _listed(item, attr, default=None):
+    """
+    Attribute as parsed from the section listing. Plain getattr() makes plexapi
+    fetch the full item whenever a value is missing (no original title, no
+    genres, ...), which is one request per title.
+    """
+    value = item.__dict__.get(attr)
+    return default if value is None else value
+
+
+def item_record(item, server):
+    """Snapshot record for a Plex item from a section listing on a named server"""
+    if item.type == 'show':
+        unwatched = _listed(item, 'viewedLeafCount', 0) < _listed(item, 'leafCount', 0)
+    else:
+        unwatched = not _listed(item, 'viewCount', 0)
+    return {
+        'rating_key': int(item.ratingKey),
+        'title': _listed(item, 'title', ''),
+        'original_title': _listed(item, 'originalTitle', ''),
+        'year': _listed(item, 'year', 0),
+        'summary': _listed(item, 'summary', ''),
+        'thumb': _listed(item, 'thumb', ''),
+        'duration': _listed(item, 'duration', 0) // 60000,
+        'content_rating': _listed(item, 'contentRating', ''),
+        # Tags are parsed lazily by newer plexapi versions, so read them from the listing XML
+        'genres': [tag.attrib.get('tag', '') for tag in item._data.findall('Genre')],
+        'unwatched': unwatched,
+        'server': server,
+    }
+
+
+def _record_facets(record):
+    """(facet, value) pairs a record is indexed under"""
+    pairs = [('genre', genre.lower()) for genre in record['genres']]
+    if record['year']:
+        pairs.append(('decade', str(record['year'] // 10 * 10)))
+    if record['content_rating']:
+        pairs.append(('rating', record['content_rating'].lower()))
+    if record['duration']:
+        pairs.append(('runtime', str(runtime_bucket(record['duration']))))
+    return pairs
+
+
+def matches(record, filters):
+    """Whether a record built outside a snapshot passes facet filters, as LibrarySnapshot.mask would"""
+    pairs = set(_record_facets(record))
+    return all(any((facet, value) in pairs for value in values) for facet, values in filters.items())
+
+
+def snapshot_path(library_name, plex_token):
+    """Path of the snapshot file for a library as seen by one token"""
+    safe_name = "".join(c if c.isalnum() else '_' for c in library_name.lower())
+    user = hashlib.sha256(plex_token.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f"library_{safe_name}_{user}.snap")
+
+
+def _aligned(size, alignment=8):
+    return b'\0' * (-size % alignment)
+
+
+def write_snapshot(path, records, built_at=None):
+    """
+    Serialize records and their facet bitsets to a columnar binary file.
+
+    Layout (little-endian): header, rating keys sorted (u32) with their
+    positions (u32), rating keys in listing order (u32), years (u16),
+    durations in minutes (u16), server numbers (u8), padding, bitsets of
+    `words` u64 each (the unwatched bitset first, then one per facet
+    value), string offsets (u32 * 4n+1), the title, summary, thumb and
+    original title strings column after column, and finally a JSON
+    directory with the server names and the bitset number of every facet
+    value.
+    The file is written next to the target and swapped in atomically.
+    """
+    n = len(records)
+    words = (n + 63) // 64
+    order = sorted(range(n), key=lambda i: records[i]['rating_key'])
+    servers = list(dict.fromkeys(record['server'] for record in records))
+
+    bitsets = [bytearray(words * 8)]
+    directory = {facet: {} for facet in FACETS}
+    for i, record in enumerate(records):
+        byte, bit = i >> 3, 1 << (i & 7)
+        if record['unwatched']:
+            bitsets[0][byte] |= bit
+        for facet, value in _record_facets(record):
+            slot = directory[facet].get(value)
+            if slot is None:
+                slot = directory[facet][value] = len(bitsets)
+                bitsets.append(bytearray(words * 8))
+            bitsets[slot][byte] |= bit
+
+    strings = [record[column].encode('utf-8') for column in _STRING_COLUMNS for record in records]
+    offsets = array('I', [0])
+    for blob in strings:
+        offsets.append(offsets[-1] + len(blob))
+    directory_blob = json.dumps({'servers': servers, 'facets': directory}, separators=(',', ':')).encode('utf-8')
+
+    columns = b''.join((
+        array('I', [records[i]['rating_key'] for i in order]).tobytes(),
+        array('I', order).tobytes(),
+        array('I', [record['rating_key'] for record in records]).tobytes(),
+        array('H', [min(record['year'], 0xFFFF) for record in records]).tobytes(),
+        array('H', [min(record['duration'], 0xFFFF) for record in records]).tobytes(),
+        bytes(servers.index(record['server']) for record in records),
+    ))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, n, words, built_at or time.time(), len(directory_blob)))
+        f.write(columns)
+        f.write(_aligned(len(columns)))
+        for bitset in bitsets:
+            f.write(bitset)
+        f.write(offsets.tobytes())
+        for blob in strings:
+            f.write(blob)
+        f.write(directory_blob)
+    os.replace(tmp_path, path)
+
+
+class LibrarySnapshot:
+    """
+    Read-only, memory-mapped view over a snapshot file. Facet bitsets are
+    read into Python ints on demand, so every worker shares the same pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, words, built_at, directory_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"Unsupported library snapshot: {path}")
+        self.count = count
+        self.built_at = built_at
+        self._bitset_size = words * 8
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._sorted_keys = view[offset:offset + 4 * count].cast('I')
+        offset += 4 * count
+        self._sorted_positions = view[offset:offset + 4 * count].cast('I')
+        offset += 4 * count
+        self._keys = view[offset:offset + 4 * count].cast('I')
+        offset += 4 * count
+        self._years = view[offset:offset + 2 * count].cast('H')
+        offset += 2 * count
+        self._durations = view[offset:offset + 2 * count].cast('H')
+        offset += 2 * count
+        self._server_numbers = view[offset:offset + count]
+        offset += count
+        offset += -(offset - _HEADER.size) % 8
+
+        directory = json.loads(self._mmap[len(self._mmap) - directory_length:])
+        self.servers = directory['servers']
+        self.facets = directory['facets']
+        bitset_count = 1 + sum(len(values) for values in self.facets.values())
+        self._bitsets = view[offset:offset + bitset_count * self._bitset_size]
+        offset += bitset_count * self._bitset_size
+        self._offsets = view[offset:offset + 4 * (len(_STRING_COLUMNS) * count + 1)].cast('I')
+        offset += 4 * (len(_STRING_COLUMNS) * count + 1)
+        self._blob_start = offset
+
+    def _bitset(self, slot):
+        start = slot * self._bitset_size
+        return int.from_bytes(self._bitsets[start:start + self._bitset_size], 'little')
+
+    @property
+    def unwatched(self):
+        return self._bitset(0)
+
+    def _string(self, column, i):
+        j = column * self.count + i
+        start = self._blob_start + self._offsets[j]
+        return self._mmap[start:self._blob_start + self._offsets[j + 1]].decode('utf-8')
+
+    def record(self, i):
+        """Record at a listing position"""
+        return {
+            'rating_key': self._keys[i],
+            'title': self._string(0, i),
+            'year': self._years[i],
+            'summary': self._string(1, i),
+            'thumb': self._string(2, i),
+            'original_title': self._string(3, i),
+            'duration': self._durations[i],
+            'server': self.servers[self._server_numbers[i]],
+        }
+
+    def mask(self, filters):
+        """Bitset of unwatched items matching every facet filter"""
+        mask = self.unwatched
+        for facet, values in filters.items():
+            index = self.facets.get(facet, {})
+            facet_mask = 0
+            for value in values:
+                if value in index:
+                    facet_mask |= self._bitset(index[value])
+            mask &= facet_mask
+            if not mask:
+                break
+        return mask
+
+    def _server(self, i):
+        return self.servers[self._server_numbers[i]]
+
+    def _position(self, rating_key, server):
+        # Rating keys only repeat across servers, so equal keys sit next to each other
+        i = bisect_left(self._sorted_keys, rating_key)
+        while i < self.count and self._sorted_keys[i] == rating_key:
+            position = self._sorted_positions[i]
+            if server is None or self._server(position) == server:
+                return position
+            i += 1
+        return None
+
+    def find(self, rating_key, server=None):
+        """Record of an item (on a server, or on any of them), or None"""
+        i = self._position(int(rating_key), server)
+        return None if i is None else self.record(i)
+
+    def titles(self):
+        """(title, original title, year) of every item, in listing order"""
+        for i in range(self.count):
+            yield self._string(0, i), self._string(3, i), self._years[i]
+
+    def contains(self, rating_key, mask, server=None):
+        """Whether an item (on a server, or on any of them) is part of a mask"""
+        i = self._position(int(rating_key), server)
+        return i is not None and bool(mask >> i & 1)
+
+    def sample(self, mask, k, exclude=None):
+        """Up to k random records from a mask, skipping (server, rating_key) pairs in exclude"""
+        exclude = exclude or set()
+        total = mask.bit_count()
+        if not total:
+            return []
+        # Draw a few extra ranks so excluded items can be skipped in the same pass
+        ranks = random.sample(range(total), min(total, k + len(exclude)))
+        positions = [i for i in _positions_at_ranks(mask, ranks) if (self._server(i), self._keys[i]) not in exclude]
+        random.shuffle(positions)
+        return [self.record(i) for i in positions[:k]]
+
+    def facet_counts(self, filters=None):
+        """Unwatched items per facet value, optionally within a filtered set"""
+        mask = self.mask(filters or {})
+        counts = {}
+        for facet, index in self.facets.items():
+            counts[facet] = {}
+            for value, slot in sorted(index.items()):
+                matching = (self._bitset(slot) & mask).bit_count()
+                if matching:
+                    counts[facet][value] = matching
+        return counts
+
+
+def _positions_at_ranks(mask, ranks):
+    """Bit positions of the set bits with the given ranks (0 = lowest set bit)"""
+    wanted = sorted(ranks)
+    positions = []
+    seen = 0
+    w = 0
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    # One pass over 64-bit words, skipping whole words by their popcount
+    for offset in range(0, len(data), 8):
+        if w == len(wanted):
+            break
+        word = int.from_bytes(data[offset:offset + 8], 'little')
+        bits = word.bit_count()
+        while w < len(wanted) and wanted[w] < seen + bits:
+            remaining = word
+            for _ in range(wanted[w] - seen):
+                remaining &= remaining - 1
+            positions.append(offset * 8 + (remaining & -remaining).bit_length() - 1)
+            w += 1
+        seen += bits
+    return positions
+
+
+def build_snapshot(scan, path):
+    """Write the records returned by scan() (see item_record) to a snapshot file"""
+    write_snapshot(path, scan())
+
+
+def _build(scan, path, wait):
+    """
+    Build a snapshot under an exclusive file lock so only one worker scans
+    Plex at a time. Without wait, give up if another worker holds the lock.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return
+        # Another worker may have written it while this one waited for the lock
+        if wait and load_snapshot(path) is not None:
+            return
+        build_snapshot(scan, path)
+
+
+def _refresh(scan, library_name, path, wait):
+    try:
+        _build(scan, path, wait)
+    except Exception as e:
+        print(f"Failed to build library snapshot for {library_name}: {e}")
+    finally:
+        with _lock:
+            _building.discard(path)
+
+
+def _start_build(scan, library_name, path, wait):
+    """Build or refresh a snapshot on a background thread, unless one is already on it"""
+    with _lock:
+        if path in _building:
+            return
+        _building.add(path)
+    threading.Thread(target=_refresh, args=(scan, library_name, path, wait), daemon=True).start()
+
+
+def load_snapshot(path):
+    """Return the mapped snapshot at path, remapping it if the file was swapped"""
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    with _lock:
+        snapshot = _loaded.get(path)
+        if snapshot is not None and snapshot.mtime == mtime:
+            _loaded.move_to_end(path)
+            return snapshot
+
+    try:
+        snapshot = LibrarySnapshot(path)
+    except (OSError, ValueError) as e:
+        print(f"Failed to load library snapshot {path}: {e}")
+        return None
+    with _lock:
+        _loaded[path] = snapshot
+        _loaded.move_to_end(path)
+        # Dropped views are unmapped once no request is using them any more
+        while len(_loaded) > MAX_LIBRARY_SNAPSHOTS:
+            _loaded.popitem(last=False)
+    return snapshot
+
+
+def get_snapshot(scan, plex_token, library_name):
+    """
+    Return the snapshot of a library as seen by a token. The first one is
+    built from scan() on a background thread, which can take minutes on a
+    large library; until it is written this raises SnapshotPending, so
+    callers answer from Plex directly. Stale snapshots keep being served
+    while a background thread refreshes them.
+    """
+    path = snapshot_path(library_name, plex_token)
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        # Wait for the file lock: another worker may be building it already
+        _start_build(scan, library_name, path, wait=True)
+        raise SnapshotPending(f"The index of library {library_name} is still being built")
+
+    if time.time() - snapshot.built_at > LIBRARY_SNAPSHOT_TTL:
+        _start_build(scan, library_name, path, wait=False)
+    return snapshot
+
+
+if __name__ == "__main__":
+    import sys
+    # The app merges every server listed in PLEX_SERVERS into one snapshot
+    from app import PLEX_URL, scan_library
+
+    plex_token = os.getenv("PLEX_TOKEN")
+    if not PLEX_URL or not plex_token:
+        sys.exit("PLEX_URL (or PLEX_SERVERS) and PLEX_TOKEN must be set to build library snapshots")
+
+    libraries = sys.argv[1:] or [os.getenv("PLEX_LIBRARY", "Movies")]
+    for name in libraries:
+        path = snapshot_path(name, plex_token)
+        build_snapshot(lambda: scan_library(plex_token, name), path)
+        print(f"Library snapshot for '{name}' ({load_snapshot(path).count} items) written to: {path}")
@@ -0,0 +1,73 @@
+import os
+import random
+
+# Share of each batch drawn from titles other participants already liked
+MATCH_EXPLOIT_RATIO = float(os.getenv("MATCH_EXPLOIT_RATIO", "0.7"))
+
+# How much a swipe contributes to a title's partial-agreement score
+SWIPE_WEIGHTS = {
+    'super': 2.0,
+    'right': 1.0,
+    'left': -0.5,
+}
+
+
+def rank_candidates(room_swipes, user_id, exclude=None):
+    """
+    Rank titles other participants swiped on by partial-agreement score.
+
+    room_swipes is a list of dicts with user_id, movie_id, movie_title,
+    movie_year and swipe_direction (as stored in movie_swipes). Titles the
+    user already swiped, titles in exclude and titles nobody liked are
+    skipped. Returns a list of candidate dicts, best first.
+    """
+    exclude = exclude or set()
+    seen_by_user = {s['movie_id'] for s in room_swipes if s['user_id'] == user_id}
+
+    candidates = {}
+    for order, swipe in enumerate(room_swipes):
+        movie_id = str(swipe['movie_id'])
+        if movie_id in seen_by_user or movie_id in exclude:
+            continue
+        candidate = candidates.setdefault(movie_id, {
+            'id': movie_id,
+            'title': swipe.get('movie_title') or '',
+            'year': swipe.get('movie_year') or '',
+            'score': 0.0,
+            'likes': 0,
+            'first_seen': order,
+        })
+        direction = swipe['swipe_direction']
+        candidate['score'] += SWIPE_WEIGHTS.get(direction, 0.0)
+        if direction in ('right', 'super'):
+            candidate['likes'] += 1
+
+    ranked = [c for c in candidates.values() if c['likes'] and c['score'] > 0]
+    # Highest agreement first, then the title that has been waiting longest
+    ranked.sort(key=lambda c: (-c['score'], c['first_seen']))
+    return ranked
+
+
+def interleave_candidates(exploit, explore, count, exploit_ratio=MATCH_EXPLOIT_RATIO, rng=random):
+    """
+    Merge ranked agreement candidates with exploration picks.
+
+    exploit is a list of ranked candidates and explore is a callable that
+    returns the next exploration pick (or None when the library is exhausted).
+    Each slot takes the best remaining agreement candidate with probability
+    exploit_ratio, so participants keep discovering new titles as well.
+    """
+    exploit = list(exploit)
+    picks = []
+    while len(picks) < count:
+        if exploit and rng.random() < exploit_ratio:
+            picks.append(('exploit', exploit.pop(0)))
+            continue
+        pick = explore()
+        if pick is not None:
+            picks.append(('explore', pick))
+        elif exploit:
+            picks.append(('exploit', exploit.pop(0)))
+        else:
+            break
+    return picks
@@ -0,0 +1,155 @@
+import os
+import time
+
+# Prometheus metrics are opt-in; when disabled every helper below is a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Under gunicorn, point this at an empty directory shared by all workers
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Upstream calls range from sub-millisecond cache-warm Plex hits to multi-second scrapes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if METRICS_ENABLED:
+    from prometheus_client import Counter, Histogram
+
+    UPSTREAM_SECONDS = Histogram(
+        'plex_suggester_upstream_request_seconds',
+        'Time spent in outbound calls',
+        ['upstream', 'route', 'outcome'],
+        buckets=LATENCY_BUCKETS,
+    )
+    STAGE_SECONDS = Histogram(
+        'plex_suggester_stage_seconds',
+        'Time spent in suggestion enrichment stages',
+        ['stage', 'route'],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUEST_SECONDS = Histogram(
+        'plex_suggester_request_seconds',
+        'Time spent handling requests',
+        ['route', 'method', 'status'],
+        buckets=LATENCY_BUCKETS,
+    )
+    CACHE_REQUESTS = Counter(
+        'plex_suggester_cache_requests_total',
+        'Cache lookups',
+        ['cache', 'result'],
+    )
+
+
+def _current_route():
+    """Route template of the request being handled, for low-cardinality labels"""
+    from flask import has_request_context, request
+    if not has_request_context():
+        return 'background'
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+class _Span:
+    """Times a block; upstream spans also record an outcome ('error' if the block raised)"""
+
+    __slots__ = ('_histogram', '_label', '_with_outcome', 'outcome', '_start')
+
+    def __init__(self, histogram, label, with_outcome):
+        self._histogram = histogram
+        self._label = label
+        self._with_outcome = with_outcome
+        self.outcome = 'ok'
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        labels = [self._label, _current_route()]
+        if self._with_outcome:
+            # Exceptions may name their own outcome (e.g. an open circuit)
+            labels.append(getattr(exc, 'outcome', 'error') if exc_type else self.outcome)
+        self._histogram.labels(*labels).observe(elapsed)
+        return False
+
+
+class _NullSpan:
+    """Shared stand-in used when metrics are disabled"""
+
+    outcome = 'ok'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(upstream):
+    """Time an outbound call: `with metrics.span('plex') as s: ...; s.outcome = 'miss'`"""
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(UPSTREAM_SECONDS, upstream, True)
+
+
+def stage(name):
+    """Time an enrichment stage"""
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return _Span(STAGE_SECONDS, name, False)
+
+
+def http_outcome(response):
+    """Outcome label for a requests response (None means the call failed)"""
+    if response is None:
+        return 'error'
+    if response.status_code >= 500:
+        return 'http_5xx'
+    if response.status_code >= 400:
+        return 'http_4xx'
+    return 'ok'
+
+
+def cache_event(cache, hit):
+    """Count a cache hit or miss"""
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def init_app(app):
+    """Register request timing hooks when metrics are enabled"""
+    if not METRICS_ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None and request.path != '/metrics':
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(time.perf_counter() - start)
+        return response
+
+
+def render():
+    """Return (body, content type) in the Prometheus text format, merging all workers if multiprocess"""
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drop a dead gunicorn worker's live gauges from the multiprocess directory"""
+    if METRICS_ENABLED and PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
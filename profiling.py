@@ -0,0 +1,280 @@
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+# Requests sending this value in X-Profile-Token are profiled, and the same
+# header unlocks /admin/profiles. Without it (and a sample rate) profiling is off.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+
+# Share of all other requests profiled at random, e.g. 0.01 for one in a hundred
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Seconds between stack samples of a profiled request
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+# Profiles kept on disk (shared by all Gunicorn workers); the oldest are deleted first
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "plex-suggester-profiles"))
+MAX_PROFILES = int(os.getenv("MAX_PROFILES", "50"))
+
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+# Never worth profiling, and the profile endpoints would only profile themselves
+SKIPPED_PREFIXES = ('/admin/profiles', '/metrics', '/health', '/static/', '/dist/')
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    if filename.startswith(_BASE_DIR):
+        filename = os.path.relpath(filename, _BASE_DIR)
+    elif '/site-packages/' in filename:
+        # Library frames: keep the path from the package directory on
+        filename = filename.split('/site-packages/')[-1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    Statistical profiler for one thread: a helper thread records the
+    thread's call stack every interval and counts identical stacks.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # (root frame, ..., leaf frame) -> samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = _frame_name(code)
+                stack.append(name)
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+        return self
+
+
+def collapsed(profile):
+    """Profile as collapsed stacks ("root;...;leaf count" lines), as read by flamegraph.pl and speedscope"""
+    return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in profile['stacks'])
+
+
+def speedscope(profile):
+    """Profile in speedscope's JSON file format"""
+    frames = []
+    indexes = {}
+    samples = []
+    weights = []
+    for stack, count in profile['stacks']:
+        sample = []
+        for name in stack:
+            if name not in indexes:
+                indexes[name] = len(frames)
+                frames.append({'name': name})
+            sample.append(indexes[name])
+        samples.append(sample)
+        weights.append(count * profile['interval'])
+    title = f"{profile['method']} {profile['path']} ({profile['id']})"
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': title,
+        'exporter': 'plex-suggester',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': title,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+    }
+
+
+class ProfileStore:
+    """The last MAX_PROFILES profiles, one JSON file each"""
+
+    def __init__(self, directory=PROFILE_DIR, max_profiles=MAX_PROFILES):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id):
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile['id'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(profile, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        with self._lock:
+            for stale in self._files()[self.max_profiles:]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass  # Another worker got there first
+
+    def _files(self):
+        """Profile files, newest first"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return []
+        paths = [os.path.join(self.directory, name) for name in names]
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                continue
+        return sorted(mtimes, key=mtimes.get, reverse=True)
+
+    def get(self, profile_id):
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        """Summaries of the stored profiles, newest first"""
+        summaries = []
+        for path in self._files():
+            try:
+                with open(path) as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summaries.append({key: value for key, value in profile.items() if key != 'stacks'})
+        return summaries
+
+
+store = ProfileStore()
+
+
+def is_admin(token):
+    return bool(PROFILE_ADMIN_TOKEN and token) and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+def should_profile(path, admin_token):
+    if path.startswith(SKIPPED_PREFIXES):
+        return False
+    if is_admin(admin_token):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def init_app(app):
+    """Register the profiling hooks and admin endpoints when profiling is enabled"""
+    if not PROFILING_ENABLED:
+        return
+    from flask import Response, g, jsonify, request
+
+    def finish(status):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is None:
+            return None
+        sampler.stop()
+        profile = {
+            'id': g.pop('profile_id'),
+            'method': request.method,
+            'path': request.path,  # Without the query string, which may carry tokens
+            'route': request.url_rule.rule if request.url_rule else 'unmatched',
+            'status': status,
+            'started_at': sampler.started_at,
+            'duration_ms': round(sampler.duration * 1000, 1),
+            'interval': sampler.interval,
+            'samples': sum(sampler.stacks.values()),
+            'stacks': sorted(([list(stack), count] for stack, count in sampler.stacks.items()),
+                             key=lambda item: item[1], reverse=True),
+        }
+        try:
+            store.save(profile)
+        except OSError as e:
+            print(f"Failed to store profile: {e}")
+        return profile['id']
+
+    @app.before_request
+    def _start_profile():
+        if should_profile(request.path, request.headers.get('X-Profile-Token')):
+            g.profile_id = uuid.uuid4().hex
+            g.profile_sampler = Sampler(threading.get_ident()).start()
+
+    @app.after_request
+    def _store_profile(response):
+        profile_id = finish(response.status_code)
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _store_failed_profile(exc):
+        # Only still running when the view raised past the error handlers
+        finish(500)
+
+    def admin_only():
+        if not is_admin(request.headers.get('X-Profile-Token')):
+            return jsonify({'error': 'Profile admin token required'}), 403
+        return None
+
+    @app.route('/admin/profiles')
+    def list_profiles():
+        """Stored request profiles, newest first"""
+        denied = admin_only()
+        if denied:
+            return denied
+        return jsonify({'profiles': store.list()})
+
+    @app.route('/admin/profiles/<profile_id>')
+    def get_profile(profile_id):
+        """One profile as collapsed stacks (default) or ?format=speedscope"""
+        denied = admin_only()
+        if denied:
+            return denied
+        profile = store.get(profile_id)
+        if profile is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        if request.args.get('format') == 'speedscope':
+            response = jsonify(speedscope(profile))
+            filename = f"{profile_id}.speedscope.json"
+        else:
+            response = Response(collapsed(profile), mimetype='text/plain')
+            filename = f"{profile_id}.collapsed.txt"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
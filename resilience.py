@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# A provider's circuit opens when at least this share of its recent calls failed
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+
+# Seconds an open circuit rejects calls before letting a single probe through
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "30"))
+
+# Timeouts track the observed p95 latency times this factor, between the floor and each call's static timeout
+ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv("ADAPTIVE_TIMEOUT_FACTOR", "3"))
+ADAPTIVE_TIMEOUT_FLOOR = float(os.getenv("ADAPTIVE_TIMEOUT_FLOOR", "0.25"))
+LATENCY_SAMPLES = 50
+MIN_LATENCY_SAMPLES = 10
+
+# Requests per second (and burst) allowed to each provider, e.g. "duckduckgo=4,anilist=2".
+# A cold suggestion makes up to six DuckDuckGo calls (five cast photos and a trailer),
+# so the burst covers two of them back to back.
+DEFAULT_RATE_LIMITS = {'duckduckgo': 4.0, 'anilist': 2.0, 'wikipedia': 10.0}
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "12"))
+
+# Share of each provider's burst kept for requests a user is waiting on. Background
+# work (suggestion pool prefill) only spends tokens above it, waiting up to
+# BACKGROUND_MAX_WAIT seconds for them instead of failing.
+BACKGROUND_RESERVE = float(os.getenv("BACKGROUND_RESERVE", "0.5"))
+BACKGROUND_MAX_WAIT = float(os.getenv("BACKGROUND_MAX_WAIT", "10"))
+
+
+def _parse_rate_limits(value):
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for part in (value or '').split(','):
+        name, _, rate = part.partition('=')
+        if name.strip() and rate.strip():
+            limits[name.strip()] = float(rate)
+    return limits
+
+
+SCRAPER_RATE_LIMITS = _parse_rate_limits(os.getenv("SCRAPER_RATE_LIMITS"))
+
+
+_context = threading.local()
+
+
+@contextmanager
+def background():
+    """Run provider calls made in this block (on this thread) at background priority"""
+    previous = getattr(_context, 'background', False)
+    _context.background = True
+    try:
+        yield
+    finally:
+        _context.background = previous
+
+
+def is_background():
+    return getattr(_context, 'background', False)
+
+
+class Unavailable(Exception):
+    """Raised instead of calling a provider whose circuit is open or whose rate limit is used up"""
+
+    def __init__(self, provider, outcome):
+        super().__init__(f"{provider} unavailable ({outcome})")
+        self.outcome = outcome  # Picked up as the metrics span outcome
+
+
+class UpstreamError(Exception):
+    """Raised by Guard.check for responses that should count against the circuit"""
+
+    def __init__(self, provider, status_code):
+        super().__init__(f"{provider} answered HTTP {status_code}")
+        self.outcome = 'http_5xx' if status_code >= 500 else 'http_4xx'
+
+
+class Provider:
+    """Circuit breaker, latency tracker and token bucket for one upstream"""
+
+    def __init__(self, name, rate=None, burst=RATE_LIMIT_BURST):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._outcomes = deque(maxlen=CIRCUIT_WINDOW)  # True for failures
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._state = 'closed'
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _take_token(self, now, reserve=0.0):
+        if not self.rate:
+            return True
+        self._refill(now)
+        if self._tokens < 1 + reserve:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _reserve(self):
+        """Tokens the current call must leave in the bucket"""
+        if not self.rate or not is_background():
+            return 0.0
+        return max(0.0, min(self.burst - 1, self.burst * BACKGROUND_RESERVE))
+
+    def _wait_for_tokens(self, reserve):
+        """Sleep until a background call can take a token above the reserve, or the wait is over"""
+        deadline = time.monotonic() + BACKGROUND_MAX_WAIT
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                self._refill(now)
+                wait = (1 + reserve - self._tokens) / self.rate
+            if wait <= 0 or now + wait > deadline:
+                return
+            time.sleep(wait)
+
+    def acquire(self):
+        """Admit a call, or raise Unavailable without touching the network"""
+        reserve = self._reserve()
+        if reserve:
+            self._wait_for_tokens(reserve)
+        now = time.monotonic()
+        with self._lock:
+            if self._state == 'open':
+                if now - self._opened_at < CIRCUIT_COOLDOWN or self._probing:
+                    raise Unavailable(self.name, 'circuit_open')
+                # Cooldown is over: let exactly one probe through
+                self._state = 'half_open'
+                self._probing = True
+            elif self._state == 'half_open':
+                raise Unavailable(self.name, 'circuit_open')
+            if not self._take_token(now, reserve):
+                if self._state == 'half_open':
+                    self._state = 'open'
+                    self._probing = False
+                raise Unavailable(self.name, 'rate_limited')
+
+    def timeout(self, static_timeout):
+        """
+        Timeout for the next call: a multiple of the recent p95, capped by the
+        call's own timeout. A half-open probe gets the static timeout, so a
+        provider that became slower can still close its circuit.
+        """
+        with self._lock:
+            if self._state == 'half_open':
+                return static_timeout
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return static_timeout
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return min(static_timeout, max(ADAPTIVE_TIMEOUT_FLOOR, p95 * ADAPTIVE_TIMEOUT_FACTOR))
+
+    def record(self, failed, latency, timed_out=False):
+        """
+        Record a call's outcome. A call that ran into its timeout still adds
+        its latency, a lower bound of the real one, so p95 (and with it the
+        adaptive timeout) rises when the provider gets slower.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not failed or timed_out:
+                self._latencies.append(latency)
+            if self._state == 'half_open':
+                self._probing = False
+                if failed:
+                    self._state = 'open'
+                    self._opened_at = now
+                else:
+                    self._state = 'closed'
+                    self._outcomes.clear()
+                    # Latencies from before the outage say little about the provider now
+                    self._latencies.clear()
+                    self._latencies.append(latency)
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= CIRCUIT_MIN_CALLS and \
+                    sum(self._outcomes) / len(self._outcomes) >= CIRCUIT_FAILURE_RATE:
+                self._state = 'open'
+                self._opened_at = now
+
+    def state(self):
+        with self._lock:
+            failures = sum(self._outcomes)
+            return {
+                'state': self._state,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': failures,
+            }
+
+
+class Guard:
+    """Context manager around one provider call; exceptions count as failures"""
+
+    __slots__ = ('provider', 'timeout', '_start')
+
+    def __init__(self, provider, static_timeout):
+        self.provider = provider
+        self.timeout = static_timeout
+
+    def __enter__(self):
+        self.provider.acquire()
+        self.timeout = self.provider.timeout(self.timeout)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        self.provider.record(exc_type is not None, elapsed, timed_out=exc_type is not None and elapsed >= self.timeout)
+        return False
+
+    def check(self, response):
+        """Fail the call for rate limiting and server errors; other statuses are the caller's business"""
+        if response.status_code == 429 or response.status_code >= 500:
+            raise UpstreamError(self.provider.name, response.status_code)
+        return response
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def provider(name):
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = Provider(name, rate=SCRAPER_RATE_LIMITS.get(name))
+        return _providers[name]
+
+
+def guard(name, timeout):
+    """
+    Guard a call to an upstream provider:
+
+        with resilience.guard('wikipedia', timeout=2) as call:
+            response = call.check(requests.get(url, timeout=call.timeout))
+
+    Raises Unavailable on entry when the provider's circuit is open or its
+    rate limit is exhausted, so a degraded provider costs no network time.
+    """
+    return Guard(provider(name), timeout)
+
+
+def states():
+    """Circuit state of every provider used so far"""
+    with _providers_lock:
+        providers = list(_providers.values())
+    return {p.name: p.state() for p in providers}
@@ -0,0 +1,125 @@
+import os
+import random
+
+# How random picks are drawn from a Plex section:
+#   offset - ask Plex for the unwatched count, then fetch single items at random offsets
+#   random - one request using Plex's sort=random with a result limit
+#   full   - fetch every unwatched item and pick locally (legacy behaviour)
+PLEX_SAMPLING_MODE = os.getenv("PLEX_SAMPLING_MODE", "offset").lower()
+
+# Extra offsets tried when a pick collides with an excluded (already swiped) item;
+# after that the unwatched listing is paged through instead
+MAX_EXTRA_ATTEMPTS = 5
+
+# Items per request when paging through the unwatched listing
+LISTING_WINDOW = 50
+
+
+def _unwatched_key(section, sort=None):
+    """Section listing key restricted to unwatched items of the section's main type"""
+    from plexapi import utils
+    # section.key is the bare section id ("1"), so build the path the way plexapi does
+    key = f"/library/sections/{section.key}/all?type={utils.searchType(section.TYPE)}&unwatched=1"
+    if sort:
+        key += f"&sort={sort}"
+    return key
+
+
+def count_unwatched(section):
+    """Total unwatched items in a section, without transferring any of them"""
+    data = section._server.query(
+        _unwatched_key(section),
+        headers={'X-Plex-Container-Start': '0', 'X-Plex-Container-Size': '0'}
+    )
+    return int(data.attrib.get('totalSize') or data.attrib.get('size') or 0)
+
+
+def _fetch_at(section, offset):
+    items = section.fetchItems(_unwatched_key(section), container_start=offset, container_size=1, maxresults=1)
+    return items[0] if items else None
+
+
+def _fill_from_listing(section, picks, k, exclude, total=None):
+    """
+    Top picks up by paging through the unwatched listing from a random
+    offset, LISTING_WINDOW items per request. Used once random probing keeps
+    hitting excluded items (e.g. a room that swiped most of the library), so
+    the last unswiped titles are still found. Paging stops as soon as enough
+    are found, so only the excluded items in the way add to the transfer.
+    """
+    if total is None:
+        total = count_unwatched(section)
+    needed = k - len(picks)
+    taken = exclude | {str(item.ratingKey) for item in picks}
+    start = random.randrange(total) if total else 0
+    found = []
+    position = 0
+    while position < total and len(found) < needed:
+        offset = (start + position) % total
+        # Windows stop at the end of the listing and continue from its start
+        size = min(LISTING_WINDOW, total - position, total - offset)
+        items = section.fetchItems(_unwatched_key(section), container_start=offset,
+                                   container_size=size, maxresults=size)
+        found.extend(item for item in items if str(item.ratingKey) not in taken)
+        position += size
+    return picks + random.sample(found, min(needed, len(found)))
+
+
+def _sample_offsets(section, k, exclude):
+    total = count_unwatched(section)
+    if not total:
+        return []
+
+    picks = []
+    tried = set()
+    budget = k + MAX_EXTRA_ATTEMPTS
+    while len(picks) < k and len(tried) < total and budget > 0:
+        budget -= 1
+        offset = random.randrange(total)
+        if offset in tried:
+            continue
+        tried.add(offset)
+        item = _fetch_at(section, offset)
+        if item is not None and str(item.ratingKey) not in exclude:
+            picks.append(item)
+    if len(picks) < k and len(tried) < total:
+        return _fill_from_listing(section, picks, k, exclude, total)
+    return picks
+
+
+def _sample_random_sort(section, k, exclude):
+    # Over-fetch a little so excluded items can be skipped without a second round trip
+    size = k + min(len(exclude), MAX_EXTRA_ATTEMPTS)
+    items = section.fetchItems(_unwatched_key(section, sort='random'), container_start=0,
+                               container_size=size, maxresults=size)
+    picks = [item for item in items if str(item.ratingKey) not in exclude][:k]
+    if len(picks) < k and len(items) == size:
+        # A full page of mostly excluded items: there may be more beyond it
+        return _fill_from_listing(section, picks, k, exclude)
+    return picks
+
+
+def _sample_full(section, k, exclude):
+    if section.type in ("show", "anime"):
+        # Suggest a random show with unwatched episodes
+        shows = section.search()
+        items = [show for show in shows if any(not ep.isWatched for ep in show.episodes())]
+    else:
+        items = section.search(unwatched=True)
+    items = [item for item in items if str(item.ratingKey) not in exclude]
+    return random.sample(items, min(k, len(items)))
+
+
+def sample_unwatched(section, k=1, exclude=None, mode=None):
+    """
+    Return up to k distinct random unwatched items from a Plex library section,
+    skipping rating keys in exclude. In the offset and random modes the bytes
+    transferred depend on k, not on the size of the library.
+    """
+    exclude = exclude or set()
+    mode = mode or PLEX_SAMPLING_MODE
+    if mode == 'full':
+        return _sample_full(section, k, exclude)
+    if mode == 'random':
+        return _sample_random_sort(section, k, exclude)
+    return _sample_offsets(section, k, exclude)
@@ -0,0 +1,278 @@
+import heapq
+import math
+import mmap
+import os
+import json
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+# Index files live next to the app by default, one file per library
+INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(os.path.dirname(__file__), 'indexes'))
+SIMILARITY_TOP_K = int(os.getenv("SIMILARITY_TOP_K", "20"))
+
+# Features present in more than this share of the library carry almost no signal
+# and would turn the neighbour build quadratic, so they are dropped
+MAX_FEATURE_DF = 0.5
+
+# Relative weight of each metadata facet in the item vectors
+FEATURE_WEIGHTS = {
+    'genre': 1.0,
+    'director': 1.5,
+    'cast': 0.8,
+    'collection': 2.0,
+}
+
+# Items fetched per request when reading full tag lists; section listings cut them short
+METADATA_BATCH = 100
+
+_TAG_ELEMENTS = (('genre', 'Genre'), ('director', 'Director'), ('cast', 'Role'), ('collection', 'Collection'))
+
+_MAGIC = b'PSIM'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIII')  # magic, version, item count, k
+_EMPTY = 0xFFFFFFFF
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def index_path(library_name):
+    """Path of the similarity index file for a library"""
+    safe_name = "".join(c if c.isalnum() else '_' for c in library_name.lower())
+    return os.path.join(INDEX_DIR, f"similarity_{safe_name}.idx")
+
+
+def item_features(item):
+    """
+    Extract weighted sparse features from the tag lists of a fully fetched
+    Plex item. Tags are read from its XML: plexapi would reload the item for
+    every empty tag list.
+    """
+    features = {}
+    for facet, element in _TAG_ELEMENTS:
+        tags = [tag.attrib.get('tag') for tag in item._data.findall(element)]
+        if facet == 'cast':
+            tags = tags[:10]  # Only top billed cast is meaningful
+        for name in tags:
+            if name:
+                features[f"{facet}:{name.lower()}"] = FEATURE_WEIGHTS[facet]
+    return features
+
+
+def build_neighbours(items, k=SIMILARITY_TOP_K):
+    """
+    Compute the top-k cosine neighbours for every item.
+    items is a list of (rating_key, features) pairs.
+    Returns {rating_key: [(neighbour_key, score), ...]}.
+    """
+    n = len(items)
+    if not n:
+        return {}
+
+    # Document frequency for IDF weighting
+    df = defaultdict(int)
+    for _, features in items:
+        for feature in features:
+            df[feature] += 1
+    max_df = max(2, int(n * MAX_FEATURE_DF))
+
+    # TF-IDF weighted, L2-normalised sparse vectors
+    vectors = []
+    for _, features in items:
+        vector = {}
+        for feature, weight in features.items():
+            if df[feature] > max_df or df[feature] < 2:
+                continue
+            vector[feature] = weight * math.log(n / df[feature])
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        if norm:
+            vector = {f: w / norm for f, w in vector.items()}
+        vectors.append(vector)
+
+    # Inverted index so only items sharing a feature are compared
+    postings = defaultdict(list)
+    for i, vector in enumerate(vectors):
+        for feature, weight in vector.items():
+            postings[feature].append((i, weight))
+
+    neighbours = {}
+    for i, vector in enumerate(vectors):
+        scores = defaultdict(float)
+        for feature, weight in vector.items():
+            for j, other_weight in postings[feature]:
+                if j != i:
+                    scores[j] += weight * other_weight
+        top = heapq.nlargest(k, scores.items(), key=lambda pair: pair[1])
+        neighbours[items[i][0]] = [(items[j][0], score) for j, score in top]
+    return neighbours
+
+
+def write_index(path, neighbours, metadata, k=SIMILARITY_TOP_K):
+    """
+    Serialize the neighbour table to a flat binary file.
+
+    Layout (little-endian): header, sorted rating keys (u32), neighbour
+    slots as indexes into the key table (u32 * k), neighbour scores
+    (f32 * k), metadata offsets (u32 * n+1), then a UTF-8 JSON blob per item.
+    The file is written next to the target and swapped in atomically.
+    """
+    keys = sorted(int(key) for key in neighbours)
+    position = {key: i for i, key in enumerate(keys)}
+
+    slots = array('I', [_EMPTY]) * (len(keys) * k)
+    scores = array('f', [0.0]) * (len(keys) * k)
+    for i, key in enumerate(keys):
+        for j, (other, score) in enumerate(neighbours[key][:k]):
+            slots[i * k + j] = position[int(other)]
+            scores[i * k + j] = score
+
+    blobs = [json.dumps(metadata.get(key, {}), separators=(',', ':')).encode('utf-8') for key in keys]
+    offsets = array('I', [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(keys), k))
+        f.write(array('I', keys).tobytes())
+        f.write(slots.tobytes())
+        f.write(scores.tobytes())
+        f.write(offsets.tobytes())
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class SimilarityIndex:
+    """Read-only, memory-mapped view over a similarity index file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, k = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"Unsupported similarity index: {path}")
+        self.count = count
+        self.k = k
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._keys = view[offset:offset + 4 * count].cast('I')
+        offset += 4 * count
+        self._slots = view[offset:offset + 4 * count * k].cast('I')
+        offset += 4 * count * k
+        self._scores = view[offset:offset + 4 * count * k].cast('f')
+        offset += 4 * count * k
+        self._offsets = view[offset:offset + 4 * (count + 1)].cast('I')
+        offset += 4 * (count + 1)
+        self._blob_start = offset
+
+    def _position(self, rating_key):
+        i = bisect_left(self._keys, rating_key)
+        if i < self.count and self._keys[i] == rating_key:
+            return i
+        return None
+
+    def _metadata(self, i):
+        start = self._blob_start + self._offsets[i]
+        end = self._blob_start + self._offsets[i + 1]
+        return json.loads(self._mmap[start:end])
+
+    def neighbours(self, rating_key, exclude=None, limit=10):
+        """Return up to limit neighbours of rating_key, skipping excluded ids"""
+        i = self._position(int(rating_key))
+        if i is None:
+            return []
+        exclude = exclude or ()
+
+        results = []
+        base = i * self.k
+        for j in range(self.k):
+            slot = self._slots[base + j]
+            if slot == _EMPTY:
+                break
+            neighbour_id = str(self._keys[slot])
+            if neighbour_id in exclude:
+                continue
+            entry = self._metadata(slot)
+            entry['id'] = neighbour_id
+            entry['score'] = round(self._scores[base + j], 4)
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+
+def get_index(library_name):
+    """Return the loaded index for a library, remapping it if the file changed"""
+    path = index_path(library_name)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    index = _loaded.get(path)
+    if index is not None and index.mtime == mtime:
+        return index
+
+    with _loaded_lock:
+        index = _loaded.get(path)
+        if index is None or index.mtime != mtime:
+            try:
+                index = SimilarityIndex(path)
+            except (OSError, ValueError) as e:
+                print(f"Failed to load similarity index {path}: {e}")
+                return None
+            _loaded[path] = index
+    return index
+
+
+def build_index(plex, library_name, k=SIMILARITY_TOP_K):
+    """
+    Build and write the similarity index for one Plex library section. The
+    section listing only names the items: it carries just the first few
+    cast members (and other tags), so full items are fetched
+    METADATA_BATCH at a time.
+    """
+    section = plex.library.section(library_name)
+    keys = [int(item.ratingKey) for item in section.all()]
+    items = []
+    metadata = {}
+    for start in range(0, len(keys), METADATA_BATCH):
+        for item in plex.fetchItems(keys[start:start + METADATA_BATCH]):
+            rating_key = int(item.ratingKey)
+            attrs = item._data.attrib
+            items.append((rating_key, item_features(item)))
+            metadata[rating_key] = {
+                'title': attrs.get('title', ''),
+                'year': int(attrs['year']) if attrs.get('year') else '',
+                'poster_url': f"/poster{attrs['thumb']}" if attrs.get('thumb') else '',
+            }
+
+    neighbours = build_neighbours(items, k)
+    path = index_path(library_name)
+    write_index(path, neighbours, metadata, k)
+    return path, len(items)
+
+
+if __name__ == "__main__":
+    import sys
+    from plexapi.server import PlexServer
+
+    plex_url = os.getenv("PLEX_URL")
+    plex_token = os.getenv("PLEX_TOKEN")
+    if not plex_url or not plex_token:
+        sys.exit("PLEX_URL and PLEX_TOKEN must be set to build the similarity index")
+
+    libraries = sys.argv[1:] or [os.getenv("PLEX_LIBRARY", "Movies")]
+    server = PlexServer(plex_url, plex_token)
+    for name in libraries:
+        path, count = build_index(server, name)
+        print(f"Similarity index for '{name}' ({count} items) written to: {path}")
@@ -0,0 +1,95 @@
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Print import and warm-up timings when a worker boots
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() in ("1", "true", "yes")
+
+_original_import = None
+_import_times = {}
+_import_depth = 0
+_steps = []
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _import_depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    start = time.perf_counter()
+    _import_depth += 1
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _import_depth -= 1
+        # Only the outermost import is recorded, so nested imports are not counted twice
+        if _import_depth == 0:
+            top = name.partition('.')[0]
+            _import_times[top] = _import_times.get(top, 0.0) + time.perf_counter() - start
+
+
+def profile_imports():
+    """Time every new import from now on, grouped by top-level package"""
+    global _original_import
+    if _original_import is None:
+        _original_import = builtins.__import__
+        builtins.__import__ = _timed_import
+
+
+def stop_profiling():
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+@contextmanager
+def step(name):
+    """Record how long a warm-up step takes"""
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        _steps.append({'step': name, 'ms': round((time.perf_counter() - start) * 1000, 1), 'outcome': outcome})
+
+
+def steps():
+    """Warm-up steps recorded so far"""
+    return list(_steps)
+
+
+def clear_steps():
+    """Forget the steps of an earlier warm-up attempt"""
+    _steps.clear()
+
+
+def report(label, limit=15):
+    """Print the slowest imports and the warm-up steps if STARTUP_PROFILE is on"""
+    stop_profiling()
+    if not STARTUP_PROFILE:
+        return
+    print(f"Startup profile ({label}):")
+    total = sum(_import_times.values())
+    print(f"  imports: {total * 1000:.1f} ms")
+    for name, seconds in sorted(_import_times.items(), key=lambda pair: pair[1], reverse=True)[:limit]:
+        print(f"    {name:<24} {seconds * 1000:8.1f} ms")
+    for entry in _steps:
+        print(f"  warm-up {entry['step']:<16} {entry['ms']:8.1f} ms  {entry['outcome']}")
+
+
+if __name__ == "__main__":
+    # Profile a cold import and warm-up of the app outside gunicorn. The app
+    # imports this file as `startup`, so record through that module.
+    import startup
+    startup.STARTUP_PROFILE = True
+    startup.profile_imports()
+    started = time.perf_counter()
+    import app
+    app.warm_up()
+    startup.report(f"total {(time.perf_counter() - started) * 1000:.1f} ms")
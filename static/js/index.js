@@ -0,0 +1,367 @@
+// Global variables
+let JWT_TOKEN = localStorage.getItem('separate_backend_jwt_token');
+
+// Get Plex token from localStorage or prompt user
+function getPlexToken() {
+  let plexToken = localStorage.getItem('plex_token');
+  if (!plexToken) {
+    plexToken = prompt('Please enter your Plex token:');
+    if (plexToken) {
+      localStorage.setItem('plex_token', plexToken);
+    }
+  }
+  return plexToken;
+}
+
+// Authenticate with the separate like/dislike/watch backend
+async function authenticateWithSeparateBackend(plexToken) {
+  try {
+    const response = await fetch(`${API_BASE}/auth/plex`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({ plex_token: plexToken })
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      JWT_TOKEN = data.token;
+      localStorage.setItem('separate_backend_jwt_token', JWT_TOKEN);
+      return true;
+    } else {
+      console.error('Authentication with separate backend failed:', data.error);
+      return false;
+    }
+  } catch (error) {
+    console.error('Authentication error with separate backend:', error);
+    return false;
+  }
+}
+
+// Authenticate with Plex token and get JWT
+async function authenticateWithPlex(plexToken) {
+  try {
+    const response = await fetch('/auth/plex', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({ plex_token: plexToken })
+    });
+
+    const data = await response.json();
+
+    if (response.ok) {
+      JWT_TOKEN = data.token;
+      localStorage.setItem('jwt_token', JWT_TOKEN);
+      return true;
+    } else {
+      console.error('Authentication failed:', data.error);
+      // Clear invalid token (not when Plex was unreachable or the client is throttled)
+      if (response.status === 401) {
+        localStorage.removeItem('plex_token');
+        localStorage.removeItem('jwt_token');
+      }
+      return false;
+    }
+  } catch (error) {
+    console.error('Authentication error:', error);
+    return false;
+  }
+}
+
+// Make authenticated API request
+async function makeAuthenticatedRequest(url, options = {}) {
+  if (!JWT_TOKEN) {
+    throw new Error('No authentication token available');
+  }
+
+  const headers = {
+    'Authorization': `Bearer ${JWT_TOKEN}`,
+    'Content-Type': 'application/json',
+    ...options.headers
+  };
+
+  return fetch(url, {
+    ...options,
+    headers
+  });
+}
+
+// Initialize authentication
+async function initializeAuth() {
+  // Try to use stored JWT token first
+  JWT_TOKEN = localStorage.getItem('jwt_token');
+
+  if (!JWT_TOKEN) {
+    const plexToken = getPlexToken();
+    if (plexToken) {
+      const success = await authenticateWithPlex(plexToken);
+      if (!success) {
+        alert('Failed to authenticate with Plex. Please check your token.');
+        return false;
+      }
+    } else {
+      alert('Plex token is required to use this application.');
+      return false;
+    }
+  }
+
+  return true;
+}
+
+// Load libraries using new API
+async function loadLibraries() {
+  try {
+    const response = await makeAuthenticatedRequest('/api/libraries');
+    if (response.ok) {
+      const data = await response.json();
+      updateLibrarySelector(data.libraries);
+    } else if (response.status === 401) {
+      // Token expired, re-authenticate
+      localStorage.removeItem('jwt_token');
+      JWT_TOKEN = null;
+      await initializeAuth();
+      // Retry
+      await loadLibraries();
+    }
+  } catch (error) {
+    console.error('Failed to load libraries:', error);
+  }
+}
+
+// Update library selector dropdown
+function updateLibrarySelector(libraries) {
+  const selector = document.querySelector('select[name="library"]');
+  if (selector) {
+    selector.innerHTML = '';
+    libraries.forEach(lib => {
+      const option = document.createElement('option');
+      option.value = lib.title;
+      option.textContent = `${lib.title} (${lib.type})`;
+      selector.appendChild(option);
+    });
+  }
+}
+
+// Get new movie suggestion
+async function getNewSuggestion(library = '') {
+  try {
+    const url = library ? `/api/suggest?library=${encodeURIComponent(library)}` : '/api/suggest';
+    const response = await makeAuthenticatedRequest(url);
+
+    if (response.ok) {
+      const data = await response.json();
+      updateMovieDisplay(data.movie);
+    } else if (response.status === 401) {
+      // Token expired, re-authenticate
+      localStorage.removeItem('jwt_token');
+      JWT_TOKEN = null;
+      await initializeAuth();
+      // Retry
+      await getNewSuggestion(library);
+    } else {
+      const errorData = await response.json();
+      showError(errorData.error || 'Failed to get suggestion');
+    }
+  } catch (error) {
+    console.error('Failed to get suggestion:', error);
+    showError('Failed to get suggestion');
+  }
+}
+
+// Update movie display with new data
+function updateMovieDisplay(movie) {
+  // Update title
+  const titleElement = document.querySelector('.movie-title');
+  if (titleElement) titleElement.textContent = movie.title;
+
+  // Update year
+  const yearElement = document.querySelector('.movie-year');
+  if (yearElement) yearElement.textContent = movie.year ? `(${movie.year})` : '';
+
+  // Update summary
+  const summaryElement = document.querySelector('.movie-summary');
+  if (summaryElement) summaryElement.textContent = movie.summary;
+
+  // Update poster
+  const posterElement = document.querySelector('.movie-poster');
+  if (posterElement) posterElement.src = movie.poster_url;
+
+  // Update watch link
+  const watchElement = document.querySelector('.watch-link');
+  if (watchElement) watchElement.href = movie.watch_url;
+
+  // Update trailer links
+  const trailerElement = document.querySelector('.trailer-link');
+  if (trailerElement) {
+    trailerElement.href = movie.external_trailer_url || movie.trailer_url || '#';
+  }
+
+  // Update cast
+  updateCastDisplay(movie.cast);
+}
+
+// Update cast display
+function updateCastDisplay(cast) {
+  const castContainer = document.querySelector('.cast-container');
+  if (castContainer && cast) {
+    castContainer.innerHTML = '';
+    cast.forEach(actor => {
+      const actorDiv = document.createElement('div');
+      actorDiv.className = 'cast-member';
+      actorDiv.innerHTML = `
+        <img src="${actor.thumb}" alt="${actor.name}" class="actor-thumb">
+        <span class="actor-name">${actor.name}</span>
+      `;
+      castContainer.appendChild(actorDiv);
+    });
+  }
+}
+
+// Show error message
+function showError(message) {
+  const errorElement = document.querySelector('.error-message');
+  if (errorElement) {
+    errorElement.textContent = message;
+    errorElement.style.display = 'block';
+  } else {
+    alert(message);
+  }
+}
+
+// Show success message
+function showSuccess(message) {
+  const successElement = document.querySelector('.success-message');
+  if (successElement) {
+    successElement.textContent = message;
+    successElement.style.display = 'block';
+    setTimeout(() => {
+      successElement.style.display = 'none';
+    }, 3000);
+  }
+}
+
+// Settings modal functions
+function showSettings() {
+  const modal = document.getElementById('settingsModal');
+  const currentToken = localStorage.getItem('plex_token');
+  const tokenInput = document.getElementById('plexTokenInput');
+
+  if (currentToken) {
+    tokenInput.value = currentToken;
+  }
+
+  modal.style.display = 'block';
+}
+
+function hideSettings() {
+  const modal = document.getElementById('settingsModal');
+  modal.style.display = 'none';
+}
+
+async function updatePlexToken() {
+  const tokenInput = document.getElementById('plexTokenInput');
+  const newToken = tokenInput.value.trim();
+
+  if (!newToken) {
+    alert('Please enter a valid Plex token');
+    return;
+  }
+
+  // Clear old tokens
+  localStorage.removeItem('jwt_token');
+  localStorage.setItem('plex_token', newToken);
+  JWT_TOKEN = null;
+
+  // Try to authenticate with new token
+  const success = await authenticateWithPlex(newToken);
+  if (success) {
+    showSuccess('Plex token updated successfully!');
+    hideSettings();
+    // Reload libraries with new token
+    await loadLibraries();
+  } else {
+    alert('Invalid Plex token. Please check your token and try again.');
+    localStorage.removeItem('plex_token');
+  }
+}
+
+function clearPlexToken() {
+  if (confirm('Are you sure you want to clear your Plex token? You will need to re-enter it to continue using the app.')) {
+    localStorage.removeItem('plex_token');
+    localStorage.removeItem('jwt_token');
+    JWT_TOKEN = null;
+    hideSettings();
+    showSuccess('Plex token cleared. Please refresh the page to re-authenticate.');
+  }
+}
+
+// Close modal when clicking outside of it
+window.onclick = function(event) {
+  const modal = document.getElementById('settingsModal');
+  if (event.target === modal) {
+    hideSettings();
+  }
+}
+
+// Initialize the application
+document.addEventListener('DOMContentLoaded', async function() {
+  // Check if environment token is available (passed from backend)
+  const hasEnvToken = document.body.getAttribute('data-has-env-token') === 'true';
+
+  if (hasEnvToken) {
+    // Even with environment token, we need JWT for like/dislike/watch API
+    console.log('Using environment Plex token');
+
+    // Get Plex token from environment
+    const envPlexToken = document.body.getAttribute('data-plex-token');
+    if (envPlexToken) {
+      // First try to use stored JWT token
+      JWT_TOKEN = localStorage.getItem('separate_backend_jwt_token');
+
+      if (!JWT_TOKEN) {
+        // Authenticate with separate backend to get JWT token for like/dislike/watch API
+        const success = await authenticateWithSeparateBackend(envPlexToken);
+        if (success) {
+          console.log('JWT token obtained for like/dislike/watch API calls');
+        } else {
+          console.warn('Failed to get JWT token for like/dislike/watch functionality');
+        }
+      }
+    }
+
+    // Set up event listeners for traditional form-based navigation
+    setupTraditionalNavigation();
+  } else {
+    // Use new JWT authentication system for this app
+    const success = await initializeAuth();
+    if (success) {
+      // Also try to authenticate with separate backend if we have a plex token
+      const plexToken = localStorage.getItem('plex_token');
+      if (plexToken) {
+        await authenticateWithSeparateBackend(plexToken);
+      }
+
+      await loadLibraries();
+      // Add event listeners for buttons
+      const suggestButton = document.querySelector('.suggest-button');
+      if (suggestButton) {
+        suggestButton.addEventListener('click', () => {
+          const selector = document.querySelector('select[name="library"]');
+          const selectedLibrary = selector ? selector.value : '';
+          getNewSuggestion(selectedLibrary);
+        });
+      }
+    }
+  }
+});
+
+// Setup traditional form-based navigation for environment token mode
+function setupTraditionalNavigation() {
+  // The existing form-based system works fine when environment token is available
+  // No additional JavaScript needed for basic functionality
+  console.log('Traditional navigation mode active');
+}
@@ -0,0 +1,1057 @@
+// Global variables
+let currentRoom = null;
+let currentUser = null;
+let jwtToken = null;
+let currentMovie = null;
+let movieQueue = []; // Queue for preloaded movies
+let isLoadingMovies = false; // Flag to prevent multiple simultaneous loads
+let roomCache = {}; // Cache room info to avoid repeated requests
+let swipedMoviesCache = new Set(); // Cache swiped movies locally
+let posterCache = new Map(); // Cache for poster URLs to avoid re-downloading
+let previousMatches = new Set(); // Track previous matches for notifications
+let notificationTimeout = null; // Timeout for match notifications
+let pendingSwipes = []; // Swipes waiting to be sent in the next batch
+let isFlushingSwipes = false; // Flag to prevent overlapping batch requests
+let swipeFlushInterval = null; // Interval that sends queued swipes
+
+// Swipes are batched: sent every few seconds, or as soon as a batch fills up
+const SWIPE_FLUSH_INTERVAL = 3000;
+const SWIPE_BATCH_SIZE = 20;
+
+// Backend configuration (BACKEND_API_URL) is set by the page
+
+// Initialize the app
+document.addEventListener('DOMContentLoaded', function() {
+  console.log('Plex Match initialized with backend:', BACKEND_API_URL);
+  initializeAuth();
+});
+
+// Authentication setup
+function initializeAuth() {
+  // Check if we have a Plex token from the main app
+  const hasEnvToken = HAS_ENV_TOKEN;
+  const plexToken = ENV_PLEX_TOKEN;
+
+  if (hasEnvToken && plexToken) {
+    // Use environment token directly
+    authenticateWithPlex(plexToken);
+  } else {
+    // Need to get token from user
+    const storedToken = localStorage.getItem('plexToken');
+    if (storedToken) {
+      authenticateWithPlex(storedToken);
+    } else {
+      promptForPlexToken();
+    }
+  }
+}
+
+function promptForPlexToken() {
+  const token = prompt('Please enter your Plex token to use Plex Match:');
+  if (token) {
+    authenticateWithPlex(token);
+  } else {
+    showError('Plex token is required to use Plex Match');
+  }
+}
+
+function authenticateWithPlex(plexToken) {
+  fetch('/auth/plex', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify({ plex_token: plexToken })
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.token) {
+      jwtToken = data.token;
+      localStorage.setItem('plexToken', plexToken);
+      console.log('Authentication successful');
+      // Load active rooms after authentication
+      loadActiveRooms();
+    } else {
+      throw new Error(data.error || 'Authentication failed');
+    }
+  })
+  .catch(error => {
+    showError('Authentication failed: ' + error.message);
+    promptForPlexToken();
+  });
+}
+
+// Modal functions
+function showCreateRoomModal() {
+  document.getElementById('createRoomModal').style.display = 'block';
+}
+
+function showJoinRoomModal() {
+  document.getElementById('joinRoomModal').style.display = 'block';
+}
+
+function closeModal(modalId) {
+  document.getElementById(modalId).style.display = 'none';
+}
+
+// Room creation
+document.getElementById('createRoomForm').addEventListener('submit', function(e) {
+  e.preventDefault();
+
+  const formData = new FormData(e.target);
+  const roomData = {
+    name: formData.get('roomName'),
+    library: formData.get('library'),
+    min_participants: parseInt(formData.get('minParticipants')),
+    creator_username: formData.get('creatorUsername')
+  };
+
+  createRoom(roomData);
+});
+
+function createRoom(roomData) {
+  fetch('/api/match/rooms', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    body: JSON.stringify(roomData)
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.room_id) {
+      joinRoomWithId(data.room_id, roomData.creator_username);
+      closeModal('createRoomModal');
+    } else {
+      throw new Error(data.error || 'Failed to create room');
+    }
+  })
+  .catch(error => {
+    showError('Failed to create room: ' + error.message);
+  });
+}
+
+// Room joining
+document.getElementById('joinRoomForm').addEventListener('submit', function(e) {
+  e.preventDefault();
+
+  const formData = new FormData(e.target);
+  joinRoomWithId(formData.get('joinRoomId'), formData.get('joinerUsername'));
+});
+
+function joinRoomWithId(roomId, username) {
+  fetch(`/api/match/rooms/${roomId}/join`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    body: JSON.stringify({
+      username: username
+    })
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.user_id || data.message) {
+      currentUser = {
+        username: username
+      };
+      loadRoom(roomId);
+      closeModal('joinRoomModal');
+    } else {
+      throw new Error(data.error || 'Failed to join room');
+    }
+  })
+  .catch(error => {
+    showError('Failed to join room: ' + error.message);
+  });
+}
+
+// Room management
+function loadRoom(roomId) {
+  fetch(`/api/match/rooms/${roomId}`, {
+    headers: {
+      'Authorization': `Bearer ${jwtToken}`
+    }
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.id || data.name) {
+      currentRoom = data;
+      restoreSwipeQueue();
+      displayRoom();
+      loadNextMovie();
+      loadMatches();
+    } else {
+      throw new Error(data.error || 'Failed to load room');
+    }
+  })
+  .catch(error => {
+    showError('Failed to load room: ' + error.message);
+  });
+}
+
+function displayRoom() {
+  document.getElementById('welcome-screen').style.display = 'none';
+  document.getElementById('room-screen').style.display = 'block';
+
+  document.getElementById('room-name').textContent = currentRoom.name;
+  document.getElementById('room-id').textContent = currentRoom.id;
+  document.getElementById('room-library').textContent = currentRoom.library_filter;
+
+  const participantsList = document.getElementById('participants-list');
+  participantsList.innerHTML = '';
+  if (currentRoom.users && currentRoom.users.length > 0) {
+    currentRoom.users.forEach(user => {
+      const span = document.createElement('span');
+      span.className = 'participant';
+      span.textContent = user.username;
+      participantsList.appendChild(span);
+    });
+  }
+}
+
+// Movie swiping with optimized loading
+function loadNextMovie() {
+  // If we have movies in queue, use the next one immediately
+  if (movieQueue.length > 0) {
+    currentMovie = movieQueue.shift();
+    displayMovie(currentMovie);
+
+    // Preload more movies if queue is getting low (but don't block UI)
+    if (movieQueue.length <= 1 && !isLoadingMovies) {
+      setTimeout(preloadMovies, 100); // Async preload
+    }
+    return;
+  }
+
+  // Show loading only when no movies in queue
+  document.getElementById('loading').style.display = 'block';
+  document.getElementById('movie-card-container').innerHTML = '';
+  document.getElementById('no-more-movies').style.display = 'none';
+
+  // Load single movie quickly
+  fetchSingleMovie()
+    .then(movie => {
+      document.getElementById('loading').style.display = 'none';
+      if (movie) {
+        currentMovie = movie;
+        displayMovie(movie);
+
+        // Start background preloading
+        if (!isLoadingMovies) {
+          setTimeout(preloadMovies, 200);
+        }
+      } else {
+        // No more movies
+        document.getElementById('no-more-movies').style.display = 'block';
+      }
+    })
+    .catch(error => {
+      document.getElementById('loading').style.display = 'none';
+      showError('Failed to load movie: ' + error.message);
+    });
+}
+
+// Fast single movie fetch
+function fetchSingleMovie() {
+  return fetch(`/api/match/rooms/${currentRoom.id}/next-movie`, {
+    headers: {
+      'Authorization': `Bearer ${jwtToken}`
+    }
+  })
+  .then(response => {
+    if (response.status === 204) {
+      return null; // No more movies
+    }
+    if (!response.ok) {
+      throw new Error('Failed to fetch movie');
+    }
+    return response.json();
+  })
+  .then(data => {
+    if (data && data.movie) {
+      return data.movie;
+    }
+    return null;
+  });
+}
+
+// Add movies to the queue, skipping ones already queued, shown or swiped.
+// Titles other participants liked can be served by both the single and batch endpoints.
+function enqueueMovies(movies) {
+  let added = 0;
+  movies.forEach(movie => {
+    const isDuplicate = swipedMoviesCache.has(movie.id) ||
+      (currentMovie && currentMovie.id === movie.id) ||
+      movieQueue.some(queued => queued.id === movie.id);
+    if (!isDuplicate) {
+      movieQueue.push(movie);
+      added++;
+    }
+  });
+  return added;
+}
+
+// Optimized preload function
+function preloadMovies() {
+  if (isLoadingMovies || !currentRoom || movieQueue.length >= 5) return;
+
+  isLoadingMovies = true;
+  console.log('Background preloading movies...');
+
+  // Use batch endpoint for faster loading
+  fetch(`/api/match/rooms/${currentRoom.id}/movies/3`, {
+    headers: {
+      'Authorization': `Bearer ${jwtToken}`
+    }
+  })
+  .then(response => {
+    if (!response.ok) {
+      throw new Error('Batch loading failed');
+    }
+    return response.json();
+  })
+  .then(data => {
+    if (data.movies && Array.isArray(data.movies)) {
+      const added = enqueueMovies(data.movies);
+      console.log(`✅ Preloaded ${added} movies. Queue: ${movieQueue.length}`);
+
+      // Start preloading posters immediately
+      setTimeout(preloadQueuedPosters, 100);
+    }
+  })
+  .catch(error => {
+    console.warn('Batch preload failed, trying individual loading:', error);
+    // Fallback to individual loading
+    preloadMoviesIndividually();
+  })
+  .finally(() => {
+    isLoadingMovies = false;
+  });
+}
+
+// Fallback individual loading (simplified)
+function preloadMoviesIndividually() {
+  const promises = [];
+  for (let i = 0; i < 2; i++) {
+    promises.push(fetchSingleMovie());
+  }
+
+  Promise.allSettled(promises)
+    .then(results => {
+      const movies = results
+        .filter(result => result.status === 'fulfilled' && result.value)
+        .map(result => result.value);
+
+      if (movies.length > 0) {
+        const added = enqueueMovies(movies);
+        console.log(`✅ Individually loaded ${added} movies. Queue: ${movieQueue.length}`);
+
+        // Start preloading posters for newly loaded movies
+        setTimeout(preloadQueuedPosters, 100);
+      }
+    });
+}
+
+function displayMovie(movie) {
+  const container = document.getElementById('movie-card-container');
+  const posterUrl = movie.poster_url || 'https://via.placeholder.com/300x450/333/e5a00d?text=No+Poster';
+
+  container.innerHTML = `
+    <div class="movie-card" id="current-movie-card">
+      <div class="poster-container">
+        <img src="${posterUrl}" alt="${movie.title}" class="movie-poster" 
+             loading="eager"
+             crossorigin="anonymous"
+             onerror="this.src='https://via.placeholder.com/300x450/333/e5a00d?text=No+Poster'; this.style.opacity='1';"
+             onload="this.style.opacity='1'; this.nextElementSibling.style.display='none';"
+             style="opacity: 0; transition: opacity 0.2s ease;">
+        <div class="poster-loading" style="display: block;">
+          📽️ Loading poster...
+        </div>
+      </div>
+      <div class="movie-info">
+        <div class="movie-title">${movie.title}</div>
+        <div class="movie-year">${movie.year || 'Unknown Year'}</div>
+        <div class="movie-summary">${movie.summary || 'No summary available.'}</div>
+      </div>
+    </div>
+    <div class="swipe-buttons">
+      <button class="swipe-btn pass" onclick="swipeMovie('left')" title="Not Interested">
+        <svg width="24" height="24" viewBox="0 0 24 24" fill="currentColor">
+          <path d="M19 6.41L17.59 5 12 10.59 6.41 5 5 6.41 10.59 12 5 17.59 6.41 19 12 13.41 17.59 19 19 17.59 13.41 12z"/>
+        </svg>
+      </button>
+      <button class="swipe-btn like" onclick="swipeMovie('right')" title="Add to Watchlist">
+        <svg width="24" height="24" viewBox="0 0 24 24" fill="currentColor">
+          <path d="M12 21.35l-1.45-1.32C5.4 15.36 2 12.28 2 8.5 2 5.42 4.42 3 7.5 3c1.74 0 3.41.81 4.5 2.09C13.09 3.81 14.76 3 16.5 3 19.58 3 22 5.42 22 8.5c0 3.78-3.4 6.86-8.55 11.54L12 21.35z"/>
+        </svg>
+      </button>
+      <button class="swipe-btn super" onclick="swipeMovie('super')" title="Must Watch!">
+        <svg width="24" height="24" viewBox="0 0 24 24" fill="currentColor">
+          <path d="M12 2l3.09 6.26L22 9.27l-5 4.87 1.18 6.88L12 17.77l-6.18 3.25L7 14.14 2 9.27l6.91-1.01L12 2z"/>
+        </svg>
+      </button>
+    </div>
+  `;
+
+  // Check if poster is already cached by attempting immediate load
+  const posterImg = container.querySelector('.movie-poster');
+  if (posterImg.complete && posterImg.naturalHeight !== 0) {
+    // Image is already cached
+    posterImg.style.opacity = '1';
+    container.querySelector('.poster-loading').style.display = 'none';
+  }
+
+  // Preload posters for movies in queue
+  preloadQueuedPosters();
+}
+
+// Preload poster images for better perceived performance
+function preloadQueuedPosters() {
+  if (movieQueue.length === 0) return;
+
+  // Preload next 2-3 posters
+  const postersToPreload = movieQueue.slice(0, 3);
+
+  postersToPreload.forEach((movie, index) => {
+    if (movie.poster_url && 
+        movie.poster_url !== 'https://via.placeholder.com/300x450/333/e5a00d?text=No+Poster' &&
+        !posterCache.has(movie.poster_url)) {
+
+      // Create hidden image element to preload
+      const img = new Image();
+      img.onload = () => {
+        posterCache.set(movie.poster_url, true); // Mark as cached
+        console.log(`✅ Preloaded poster ${index + 1}/${postersToPreload.length}`);
+      };
+      img.onerror = () => {
+        console.warn(`⚠️ Failed to preload poster ${index + 1}`);
+      };
+
+      // Start preloading with staggered timing
+      setTimeout(() => {
+        img.src = movie.poster_url;
+      }, index * 50); // Reduced stagger time for faster loading
+    }
+  });
+}
+
+function swipeMovie(direction) {
+  if (!currentMovie) return;
+
+  // Cache the swiped movie locally
+  swipedMoviesCache.add(currentMovie.id);
+
+  const swipeData = {
+    movie_id: currentMovie.id,
+    movie_title: currentMovie.title,
+    movie_year: currentMovie.year,
+    direction: direction
+  };
+
+  // Start animation immediately for better UX
+  const card = document.getElementById('current-movie-card');
+  if (card) {
+    card.style.transform = direction === 'left' ? 'translateX(-100vw) rotate(-30deg)' : 'translateX(100vw) rotate(30deg)';
+    card.style.opacity = '0';
+
+    // Load next movie immediately (don't wait for API response)
+    setTimeout(() => {
+      loadNextMovie();
+    }, 150);
+  } else {
+    // If no card to animate, load next movie immediately
+    loadNextMovie();
+  }
+
+  // Queue the swipe; it is sent to the backend with the next batch (don't block UI)
+  queueSwipe(swipeData);
+}
+
+// Swipe queue - kept in localStorage so swipes made offline survive a reload
+function swipeQueueKey() {
+  return `pendingSwipes_${currentRoom.id}`;
+}
+
+function saveSwipeQueue() {
+  try {
+    localStorage.setItem(swipeQueueKey(), JSON.stringify(pendingSwipes));
+  } catch (e) {
+    // Storage full or disabled - the in-memory queue still works
+  }
+}
+
+function restoreSwipeQueue() {
+  try {
+    pendingSwipes = JSON.parse(localStorage.getItem(swipeQueueKey()) || '[]');
+  } catch (e) {
+    pendingSwipes = [];
+  }
+  pendingSwipes.forEach(swipe => swipedMoviesCache.add(swipe.movie_id));
+
+  if (!swipeFlushInterval) {
+    swipeFlushInterval = setInterval(() => flushSwipes(), SWIPE_FLUSH_INTERVAL);
+  }
+  flushSwipes();
+}
+
+function newIdempotencyKey() {
+  if (window.crypto && crypto.randomUUID) {
+    return crypto.randomUUID();
+  }
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+function queueSwipe(swipeData) {
+  pendingSwipes.push({ ...swipeData, idempotency_key: newIdempotencyKey() });
+  saveSwipeQueue();
+  if (pendingSwipes.length >= SWIPE_BATCH_SIZE) {
+    flushSwipes();
+  }
+}
+
+function flushSwipes(keepalive = false) {
+  if (isFlushingSwipes || !currentRoom || pendingSwipes.length === 0 || !navigator.onLine) return;
+  isFlushingSwipes = true;
+
+  const roomId = currentRoom.id;
+  const batch = pendingSwipes.slice(0, SWIPE_BATCH_SIZE);
+  fetch(`/api/match/rooms/${roomId}/swipes`, {
+    method: 'POST',
+    keepalive: keepalive,
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    body: JSON.stringify({ swipes: batch })
+  })
+  .then(response => response.json().then(data => ({ status: response.status, data })))
+  .then(({ status, data }) => {
+    if (!currentRoom || currentRoom.id !== roomId) {
+      // Left the room meanwhile; the queue in localStorage is resent (and deduplicated) on return
+      return;
+    }
+    if (status === 400) {
+      // The batch will never be accepted, so drop it rather than retrying forever
+      console.warn('⚠️ Swipe batch rejected:', data.error);
+      const rejected = new Set(batch.map(swipe => swipe.idempotency_key));
+      pendingSwipes = pendingSwipes.filter(swipe => !rejected.has(swipe.idempotency_key));
+      batch.forEach(swipe => swipedMoviesCache.delete(swipe.movie_id));
+      saveSwipeQueue();
+      return;
+    }
+    if (!data.results) {
+      console.warn('⚠️ Swipe batch failed, will retry:', data.error);
+      return;
+    }
+
+    // Recorded and duplicate swipes are done; failed and skipped ones stay queued
+    const done = new Set(data.results
+      .filter(result => result.status === 'recorded' || result.status === 'duplicate')
+      .map(result => result.idempotency_key));
+    pendingSwipes = pendingSwipes.filter(swipe => !done.has(swipe.idempotency_key));
+    saveSwipeQueue();
+    console.log(`✅ ${done.size} swipes recorded`);
+
+    const liked = batch.some(swipe => done.has(swipe.idempotency_key) && swipe.direction !== 'left');
+    if (data.matches.length > 0 || liked) {
+      // Update matches in background
+      setTimeout(loadMatches, 500);
+
+      // Set up automatic match checking for notifications
+      if (!notificationTimeout) {
+        notificationTimeout = setInterval(() => {
+          loadMatches();
+        }, 10000); // Check every 10 seconds for new matches
+      }
+    }
+  })
+  .catch(error => {
+    console.error('❌ Swipe batch error, will retry:', error);
+  })
+  .finally(() => {
+    isFlushingSwipes = false;
+  });
+}
+
+window.addEventListener('online', () => flushSwipes());
+window.addEventListener('pagehide', () => flushSwipes(true));
+
+// Title search: find a specific movie and add it to the room
+const TITLE_SEARCH_DELAY = 150;
+let titleSearchTimeout = null;
+let titleSearchController = null;
+
+function onTitleSearchInput(query) {
+  clearTimeout(titleSearchTimeout);
+  if (titleSearchController) titleSearchController.abort();
+  if (!query.trim()) {
+    document.getElementById('title-search-results').innerHTML = '';
+    return;
+  }
+  titleSearchTimeout = setTimeout(() => searchTitles(query), TITLE_SEARCH_DELAY);
+}
+
+function searchTitles(query) {
+  if (!currentRoom) return;
+  titleSearchController = new AbortController();
+  const params = new URLSearchParams({ q: query, library: currentRoom.library_filter, limit: 8 });
+  fetch(`/api/search?${params}`, {
+    headers: {
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    signal: titleSearchController.signal
+  })
+  .then(response => response.json())
+  .then(data => displayTitleResults(data.movies || []))
+  .catch(error => {
+    if (error.name !== 'AbortError') console.error('Title search failed:', error);
+  });
+}
+
+function displayTitleResults(movies) {
+  const container = document.getElementById('title-search-results');
+  container.innerHTML = '';
+  movies.forEach(movie => {
+    const row = document.createElement('div');
+    row.className = 'title-search-result';
+
+    const label = document.createElement('span');
+    label.textContent = movie.year ? `${movie.title} (${movie.year})` : movie.title;
+    if (movie.original_title && movie.original_title !== movie.title) {
+      const original = document.createElement('small');
+      original.textContent = ` ${movie.original_title}`;
+      label.appendChild(original);
+    }
+
+    const button = document.createElement('button');
+    button.className = 'btn';
+    button.textContent = 'Add';
+    button.onclick = () => addToRoomPool(movie);
+
+    row.appendChild(label);
+    row.appendChild(button);
+    container.appendChild(row);
+  });
+}
+
+function addToRoomPool(movie) {
+  fetch(`/api/match/rooms/${currentRoom.id}/pool`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    body: JSON.stringify({ movie_id: movie.id })
+  })
+  .then(response => response.json().then(data => ({ ok: response.ok, data })))
+  .then(({ ok, data }) => {
+    if (!ok) throw new Error(data.error || 'Failed to add movie');
+    document.getElementById('title-search-input').value = '';
+    document.getElementById('title-search-results').innerHTML = '';
+
+    // Show it next, unless it was already swiped or is on screen
+    const added = data.movie;
+    if (swipedMoviesCache.has(added.id) || (currentMovie && currentMovie.id === added.id)) return;
+    movieQueue = movieQueue.filter(queued => queued.id !== added.id);
+    movieQueue.unshift(added);
+    if (!currentMovie || document.getElementById('no-more-movies').style.display === 'block') loadNextMovie();
+  })
+  .catch(error => {
+    showError('Failed to add movie: ' + error.message);
+  });
+}
+
+// Matches
+function loadMatches() {
+  fetch(`/api/match/rooms/${currentRoom.id}/matches`, {
+    headers: {
+      'Authorization': `Bearer ${jwtToken}`
+    }
+  })
+  .then(response => response.json())
+  .then(data => {
+    displayMatches(data.matches || []);
+  })
+  .catch(error => {
+    console.error('Failed to load matches:', error);
+  });
+}
+
+function displayMatches(matches) {
+  const container = document.getElementById('matches-container');
+
+  if (matches.length === 0) {
+    container.innerHTML = '<p style="color: #ccc;">No matches yet. Keep swiping!</p>';
+    return;
+  }
+
+  // Check for new matches and show notifications
+  checkForNewMatches(matches);
+
+  container.innerHTML = matches.map(match => {
+    const posterUrl = match.poster_url || 'https://via.placeholder.com/60x90/333/e5a00d?text=No+Poster';
+    const summary = match.summary ? (match.summary.length > 150 ? match.summary.substring(0, 150) + '...' : match.summary) : 'No summary available.';
+
+    return `
+      <div class="match-item" data-movie-id="${match.movie_id || match.id}">
+        <div class="match-header">
+          <div class="match-info">
+            <div class="match-title">${match.movie_title} (${match.movie_year || 'N/A'})</div>
+            <div class="match-likes">Liked by: ${match.liked_by || 'Unknown'}</div>
+            <div class="match-likes">${match.like_count || 0} ❤️</div>
+            <div class="match-summary">${summary}</div>
+            <div class="match-actions">
+              <button class="match-btn" onclick="addToWatchlist('${match.movie_id || match.id}', '${match.movie_title}')" title="Add to Plex Watchlist">
+                📚 Add to Watchlist
+              </button>
+              <button class="match-btn watched" onclick="markAsWatched('${match.movie_id || match.id}', '${match.movie_title}')" title="Mark as Watched">
+                ✅ Mark Watched
+              </button>
+              <button class="match-btn secondary" onclick="openInPlex('${match.movie_id || match.id}', '${match.movie_title}')" title="Open in Plex">
+                🎬 Open in Plex
+              </button>
+            </div>
+          </div>
+          <img src="${posterUrl}" alt="${match.movie_title}" class="match-poster" 
+               onerror="this.src='https://via.placeholder.com/60x90/333/e5a00d?text=No+Poster';">
+        </div>
+      </div>
+    `;
+  }).join('');
+}
+
+function refreshMatches() {
+  loadMatches();
+}
+
+// Notification System
+function checkForNewMatches(matches) {
+  const currentMatchIds = new Set(matches.map(match => match.movie_id || match.id));
+
+  // Find new matches
+  const newMatches = matches.filter(match => {
+    const matchId = match.movie_id || match.id;
+    return !previousMatches.has(matchId);
+  });
+
+  // Show notifications for new matches
+  newMatches.forEach(match => {
+    showMatchNotification(match);
+  });
+
+  // Update previous matches set
+  previousMatches.clear();
+  currentMatchIds.forEach(id => previousMatches.add(id));
+}
+
+function showMatchNotification(match) {
+  const container = document.getElementById('notification-container');
+  const notificationId = `notification-${Date.now()}`;
+
+  const notification = document.createElement('div');
+  notification.className = 'notification';
+  notification.id = notificationId;
+  notification.innerHTML = `
+    <div class="notification-header">
+      <div class="notification-title">🎉 New Match!</div>
+      <button class="notification-close" onclick="hideNotification('${notificationId}')">&times;</button>
+    </div>
+    <div class="notification-body">
+      <span class="notification-movie">${match.movie_title}</span> was liked by multiple users!
+    </div>
+  `;
+
+  container.appendChild(notification);
+
+  // Trigger show animation
+  setTimeout(() => {
+    notification.classList.add('show');
+  }, 100);
+
+  // Auto-hide after 5 seconds
+  setTimeout(() => {
+    hideNotification(notificationId);
+  }, 5000);
+
+  // Play notification sound (if available)
+  playNotificationSound();
+}
+
+function hideNotification(notificationId) {
+  const notification = document.getElementById(notificationId);
+  if (notification) {
+    notification.classList.add('hide');
+    setTimeout(() => {
+      notification.remove();
+    }, 400);
+  }
+}
+
+function playNotificationSound() {
+  // Try to play a subtle notification sound
+  try {
+    const audio = new Audio('data:audio/wav;base64,UklGRnoGAABXQVZFZm10IBAAAAABAAEAQB8AAEAfAAABAAgAZGF0YQoGAACBhYqFbF1fdJivrJBhNjVgodDbq2EcBj+a2/LDciUFLIHO8tiJNwgZaLvt559NEAxQp+PwtmMcBjiR1/LMeSwFJHfH8N2QQAoUXrTp66hVFApGn+DyvmEcBDSP2O/PfC8Fol6yqbNSfUhNvWaNvOFdBgI5Gn3bxNe6AAAABAAEQAAkEwYIJERAXw=');
+    audio.volume = 0.3;
+    audio.play().catch(() => {
+      // Ignore audio play errors (user interaction may be required)
+    });
+  } catch (e) {
+    // Ignore audio errors
+  }
+}
+
+// Match Action Functions
+function addToWatchlist(movieId, movieTitle) {
+  const button = event.target;
+  button.disabled = true;
+  button.innerHTML = '⏳ Adding...';
+
+  fetch(`/api/watchlist/add`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    body: JSON.stringify({
+      movie_id: movieId,
+      movie_title: movieTitle
+    })
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.success || data.message) {
+      button.innerHTML = '✅ Added!';
+      button.classList.add('watched');
+      showSuccessMessage(`"${movieTitle}" added to your Plex watchlist!`);
+    } else {
+      throw new Error(data.error || 'Failed to add to watchlist');
+    }
+  })
+  .catch(error => {
+    console.error('Watchlist error:', error);
+    button.disabled = false;
+    button.innerHTML = '📚 Add to Watchlist';
+    showError('Failed to add to watchlist: ' + error.message);
+  });
+}
+
+function markAsWatched(movieId, movieTitle) {
+  const button = event.target;
+  button.disabled = true;
+  button.innerHTML = '⏳ Marking...';
+
+  fetch(`/api/watch/mark`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`
+    },
+    body: JSON.stringify({
+      movie_id: movieId,
+      movie_title: movieTitle
+    })
+  })
+  .then(response => response.json())
+  .then(data => {
+    if (data.success || data.message) {
+      button.innerHTML = '✅ Watched!';
+      button.disabled = true;
+      showSuccessMessage(`"${movieTitle}" marked as watched!`);
+    } else {
+      throw new Error(data.error || 'Failed to mark as watched');
+    }
+  })
+  .catch(error => {
+    console.error('Mark watched error:', error);
+    button.disabled = false;
+    button.innerHTML = '✅ Mark Watched';
+    showError('Failed to mark as watched: ' + error.message);
+  });
+}
+
+function openInPlex(movieId, movieTitle) {
+  // Try to open in Plex app, fallback to web interface
+  const plexAppUrl = `plex://movie/${movieId}`;
+  const plexWebUrl = `https://app.plex.tv/desktop/#!/media/${movieId}`;
+
+  // Try app first
+  const iframe = document.createElement('iframe');
+  iframe.style.display = 'none';
+  iframe.src = plexAppUrl;
+  document.body.appendChild(iframe);
+
+  // Fallback to web after 1 second
+  setTimeout(() => {
+    window.open(plexWebUrl, '_blank');
+    document.body.removeChild(iframe);
+  }, 1000);
+
+  showSuccessMessage(`Opening "${movieTitle}" in Plex...`);
+}
+
+function showSuccessMessage(message) {
+  const existingSuccess = document.querySelector('.temp-success');
+  if (existingSuccess) {
+    existingSuccess.remove();
+  }
+
+  const successDiv = document.createElement('div');
+  successDiv.className = 'success temp-success';
+  successDiv.textContent = message;
+  successDiv.style.position = 'fixed';
+  successDiv.style.top = '20px';
+  successDiv.style.left = '50%';
+  successDiv.style.transform = 'translateX(-50%)';
+  successDiv.style.zIndex = '10001';
+  successDiv.style.maxWidth = '90vw';
+
+  document.body.appendChild(successDiv);
+
+  setTimeout(() => {
+    successDiv.remove();
+  }, 3000);
+}
+
+function leaveRoom() {
+  if (confirm('Are you sure you want to leave this room?')) {
+    // Clear notification polling
+    if (notificationTimeout) {
+      clearInterval(notificationTimeout);
+      notificationTimeout = null;
+    }
+
+    // Clear previous matches for notifications
+    previousMatches.clear();
+
+    // Send whatever is still queued; anything left stays in localStorage for next time
+    flushSwipes(true);
+    clearInterval(swipeFlushInterval);
+    swipeFlushInterval = null;
+    pendingSwipes = [];
+
+    currentRoom = null;
+    currentUser = null;
+    currentMovie = null;
+    movieQueue = []; // Clear the movie queue
+    isLoadingMovies = false;
+
+    document.getElementById('room-screen').style.display = 'none';
+    document.getElementById('welcome-screen').style.display = 'block';
+  }
+}
+
+// Utility functions
+function showError(message) {
+  const errorDiv = document.getElementById('error-message');
+  errorDiv.textContent = message;
+  errorDiv.style.display = 'block';
+
+  setTimeout(() => {
+    errorDiv.style.display = 'none';
+  }, 5000);
+}
+
+// Active Rooms Management
+function loadActiveRooms() {
+  if (!jwtToken) {
+    console.log('No JWT token, skipping room load');
+    return;
+  }
+
+  const container = document.getElementById('active-rooms-container');
+  container.innerHTML = '<div class="loading">Loading active rooms...</div>';
+
+  fetch('/api/match/rooms', {
+    headers: {
+      'Authorization': `Bearer ${jwtToken}`
+    }
+  })
+  .then(response => response.json())
+  .then(data => {
+    displayActiveRooms(data.rooms || []);
+  })
+  .catch(error => {
+    console.error('Failed to load active rooms:', error);
+    container.innerHTML = '<div class="error">Failed to load rooms</div>';
+  });
+}
+
+function displayActiveRooms(rooms) {
+  const container = document.getElementById('active-rooms-container');
+
+  if (rooms.length === 0) {
+    container.innerHTML = `
+      <div class="empty-rooms">
+        <div class="empty-rooms-icon">🎬</div>
+        <p>No active rooms found</p>
+        <p style="font-size: 0.9em; opacity: 0.7;">Create a new room to get started!</p>
+      </div>
+    `;
+    return;
+  }
+
+  container.innerHTML = rooms.map(room => {
+    const createdDate = new Date(room.created_at).toLocaleDateString();
+    const expiresDate = new Date(room.expires_at).toLocaleDateString();
+
+    return `
+      <div class="room-card" onclick="promptJoinRoom('${room.id}', '${room.name}')">
+        <div class="room-card-header">
+          <h4 class="room-card-title">${room.name}</h4>
+          <span class="room-card-id">${room.id}</span>
+        </div>
+        <div class="room-card-details">
+          <div class="room-detail">
+            <span class="room-detail-label">Library:</span>
+            <span class="room-detail-value">${room.library_filter}</span>
+          </div>
+          <div class="room-detail">
+            <span class="room-detail-label">Min. Participants:</span>
+            <span class="room-detail-value">${room.min_participants}</span>
+          </div>
+          <div class="room-detail">
+            <span class="room-detail-label">Participants:</span>
+            <span class="room-detail-value room-participants">${room.participant_count}</span>
+          </div>
+          <div class="room-detail">
+            <span class="room-detail-label">Created:</span>
+            <span class="room-detail-value">${createdDate}</span>
+          </div>
+        </div>
+        <div class="room-card-actions">
+          <button class="room-join-btn" onclick="event.stopPropagation(); promptJoinRoom('${room.id}', '${room.name}')">
+            Join Room
+          </button>
+        </div>
+      </div>
+    `;
+  }).join('');
+}
+
+function promptJoinRoom(roomId, roomName) {
+  const username = prompt(`Enter your name to join "${roomName}":`);
+  if (username && username.trim()) {
+    joinRoomWithId(roomId, username.trim());
+  }
+}
+
+// Close modals when clicking outside
+window.onclick = function(event) {
+  const modals = document.querySelectorAll('.modal');
+  modals.forEach(modal => {
+    if (event.target === modal) {
+      modal.style.display = 'none';
+    }
+  });
+}
+
+// Optional: Register service worker for better caching (only in production)
+if ('serviceWorker' in navigator && window.location.protocol === 'https:') {
+  navigator.serviceWorker.register('/sw.js').catch(() => {
+    // Service worker registration failed, but that's ok
+  });
+}
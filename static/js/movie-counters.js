@@ -0,0 +1,61 @@
+// Like/dislike/watch counters of the suggested movie; the page defines movieKey
+const API_BASE = "https://plex-like.satrawi.cc";
+function getMovieId(key) {
+  const match = key.match(/(\d+)$/);
+  return match ? match[1] : key;
+}
+const movieId = getMovieId(movieKey);
+
+function showCounters(counts) {
+  document.getElementById('like-count').textContent = ` ${counts.likes || 0}`;
+  document.getElementById('dislike-count').textContent = ` ${counts.dislikes || 0}`;
+  document.getElementById('watch-count').textContent = counts.watches || 0;
+  ['like-count', 'dislike-count', 'watch-count'].forEach(id => {
+    document.getElementById(id).classList.remove('loading');
+  });
+}
+
+function updateLikeCount() {
+  // Add loading class
+  document.getElementById('like-count').classList.add('loading');
+  document.getElementById('dislike-count').classList.add('loading');
+  document.getElementById('watch-count').classList.add('loading');
+
+  // All three counters in one cached request
+  fetch(`/api/counters?ids=${encodeURIComponent(movieId)}`)
+    .then(r => r.json())
+    .then(data => showCounters((data.counters || {})[movieId] || {}));
+}
+
+function updateCounter(action) {
+  // The response already includes this write, so no second round trip is needed
+  fetch(`/api/counters/${encodeURIComponent(movieId)}/${action}`, {
+    method: "POST",
+    headers: {
+      "Authorization": `Bearer ${JWT_TOKEN}`
+    }
+  })
+    .then(r => r.json())
+    .then(data => {
+      if (data.counters) {
+        showCounters(data.counters);
+      } else {
+        updateLikeCount();
+      }
+    });
+}
+
+function likeMovie() {
+  updateCounter('like');
+}
+
+function dislikeMovie() {
+  updateCounter('dislike');
+}
+
+function trackWatchClick() {
+  updateCounter('watch');
+}
+
+// Initial load
+updateLikeCount();
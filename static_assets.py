@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Sources of the page stylesheets and scripts (edit these, not the build output)
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+ASSET_SOURCES = ('css', 'js')
+
+# Fingerprinted copies written by `python static_assets.py`, with .gz/.br variants and a manifest
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Fingerprinted files never change under their name, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# favicon.ico, icon.png and logo.png keep their names, so they are cached for a shorter while
+ICON_MAX_AGE = int(os.getenv("ICON_MAX_AGE", str(30 * 24 * 3600)))
+
+# Precompressed variants, in the order they are preferred
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+_manifest = None
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build():
+    """
+    Copy every stylesheet and script under static/css and static/js to
+    dist/<name>.<hash>.<ext>, next to gzip and brotli versions of it, and
+    map source names to them in dist/manifest.json. Returns the manifest.
+    """
+    import brotli
+
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+    manifest = {}
+    for source in ASSET_SOURCES:
+        for root, _, files in os.walk(os.path.join(STATIC_DIR, source)):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+                stem, ext = os.path.splitext(name)
+                built = f"{stem}.{fingerprint(data)}{ext}"
+                target = os.path.join(DIST_DIR, built)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # Built once per release, so spend the time on the smallest files
+                for suffix, body in (('', data),
+                                     ('.gz', gzip.compress(data, compresslevel=9, mtime=0)),
+                                     ('.br', brotli.compress(data, quality=11))):
+                    with open(target + suffix, 'wb') as f:
+                        f.write(body)
+                manifest[name] = built
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest():
+    """The build manifest, or an empty one when assets have not been built"""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(name):
+    """URL of a stylesheet or script, fingerprinted when the assets were built"""
+    built = load_manifest().get(name)
+    if built:
+        return f"/dist/{built}"
+    # Unbuilt checkout: serve the source through Flask's static route
+    return f"/static/{name}"
+
+
+def init_app(app):
+    """Expose asset_url() to templates and serve the fingerprinted files"""
+    from flask import abort, request, send_from_directory
+
+    import encoding
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.route('/dist/<path:filename>')
+    def dist_asset(filename):
+        """Serve a fingerprinted asset, precompressed when the client accepts it"""
+        if not os.path.isfile(os.path.join(DIST_DIR, filename)) or filename == 'manifest.json':
+            abort(404)
+        available = [coding for coding, suffix in PRECOMPRESSED
+                     if os.path.isfile(os.path.join(DIST_DIR, filename + suffix))]
+        coding = encoding.negotiate(request.headers.get('Accept-Encoding'), offered=available)
+        suffix = dict(PRECOMPRESSED)[coding] if coding else ''
+        response = send_from_directory(DIST_DIR, filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                                       max_age=IMMUTABLE_MAX_AGE)
+        if coding:
+            response.headers['Content-Encoding'] = coding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+
+if __name__ == "__main__":
+    manifest = build()
+    for name, built in sorted(manifest.items()):
+        sizes = [os.path.getsize(os.path.join(DIST_DIR, built + suffix)) for suffix in ('', '.gz', '.br')]
+        print(f"{name:<28} -> dist/{built}  ({sizes[0]} B, gzip {sizes[1]} B, br {sizes[2]} B)")
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import resilience
+
+# Fully enriched suggestions kept ready per (user, library); 0 disables the pool
+SUGGESTION_POOL_SIZE = int(os.getenv("SUGGESTION_POOL_SIZE", "3"))
+SUGGESTION_POOL_WORKERS = int(os.getenv("SUGGESTION_POOL_WORKERS", "2"))
+
+# Least recently used buffers beyond this are dropped, which bounds memory
+MAX_SUGGESTION_POOLS = int(os.getenv("MAX_SUGGESTION_POOLS", "16"))
+
+
+class _Buffer:
+    """Ring buffer of (rating_key, suggestion) for one token and library"""
+
+    def __init__(self, token, library_name, size):
+        self.token = token
+        self.library_name = library_name
+        self.items = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.refilling = False
+
+
+class SuggestionPool:
+    """
+    Keeps a few fully enriched suggestions per library ready in memory.
+
+    build(token, library_name) returns (rating_key, suggestion) or None and
+    runs on background workers; validate(token, rating_key) is called on the
+    request path to make sure a pooled item is still unwatched.
+    """
+
+    def __init__(self, build, validate, size=SUGGESTION_POOL_SIZE, workers=SUGGESTION_POOL_WORKERS,
+                 max_pools=MAX_SUGGESTION_POOLS):
+        self.build = build
+        self.validate = validate
+        self.size = size
+        self.max_pools = max_pools
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='suggestion-pool')
+
+    @property
+    def enabled(self):
+        return self.size > 0 and not self._stopped.is_set()
+
+    def _buffer(self, token, library_name):
+        key = (hashlib.sha256(token.encode('utf-8')).hexdigest(), library_name)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = _Buffer(token, library_name, self.size)
+                self._buffers[key] = buffer
+            self._buffers.move_to_end(key)
+            while len(self._buffers) > self.max_pools:
+                self._buffers.popitem(last=False)
+        return buffer
+
+    def take(self, token, library_name):
+        """Pop a ready suggestion (or None if the buffer is empty) and schedule a refill"""
+        if not self.enabled:
+            return None
+        buffer = self._buffer(token, library_name)
+        suggestion = None
+        while suggestion is None:
+            with buffer.lock:
+                if not buffer.items:
+                    break
+                rating_key, candidate = buffer.items.popleft()
+            if self.validate(token, rating_key):
+                suggestion = candidate
+        self._refill(buffer)
+        return suggestion
+
+    def prime(self, token, library_name):
+        """Start filling the buffer for a library without taking anything"""
+        if self.enabled:
+            self._refill(self._buffer(token, library_name))
+
+    def _refill(self, buffer):
+        with buffer.lock:
+            if buffer.refilling or len(buffer.items) >= self.size:
+                return
+            buffer.refilling = True
+        try:
+            self._executor.submit(self._fill, buffer)
+        except RuntimeError:
+            # Executor already shut down
+            buffer.refilling = False
+
+    def _fill(self, buffer):
+        try:
+            # Bounded so a tiny library that keeps yielding duplicates cannot spin forever
+            for _ in range(self.size * 2):
+                if self._stopped.is_set():
+                    return
+                with buffer.lock:
+                    if len(buffer.items) >= self.size:
+                        return
+                    pooled = {rating_key for rating_key, _ in buffer.items}
+                # Prefill yields scraper capacity to suggestions someone is waiting on
+                with resilience.background():
+                    result = self.build(buffer.token, buffer.library_name)
+                if result is None:
+                    return
+                with buffer.lock:
+                    if result[0] not in pooled and len(buffer.items) < self.size:
+                        buffer.items.append(result)
+        except Exception as e:
+            print(f"Suggestion pool refill failed: {e}")
+        finally:
+            with buffer.lock:
+                buffer.refilling = False
+
+    def shutdown(self):
+        """Stop refilling and drop everything that is pooled"""
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._buffers.clear()
@@ -0,0 +1,55 @@
+import os
+
+import cache
+import database
+
+# Seconds the receipt of a bulk swipe is kept in the shared tier (rooms expire after a day)
+SWIPE_RECEIPT_TTL = int(os.getenv("SWIPE_RECEIPT_TTL", str(24 * 3600)))
+
+# Receipts are claimed with SET NX in the shared tier when there is one, so
+# a batch resent to another replica finds them. Without CACHE_REDIS_URL they
+# live in the local SQLite file, and idempotency only holds with one replica.
+
+
+def _key(room_id, user_id, key):
+    return f"{cache.CACHE_PREFIX}:swipe-receipt:{room_id}:{user_id}:{key}"
+
+
+def lookup(room_id, user_id, keys):
+    """{key: result} of idempotency keys already claimed; result is None while a swipe is being applied"""
+    shared = cache.shared_tier()
+    if shared is None:
+        return database.get_swipe_receipts(room_id, user_id, keys)
+    found = shared.get_many([_key(room_id, user_id, key) for key in keys])
+    return {key: found[_key(room_id, user_id, key)] for key in keys if _key(room_id, user_id, key) in found}
+
+
+def claim(room_id, user_id, key):
+    """
+    Claim an idempotency key right before its swipe is applied; False if
+    another request holds it or applied it already. Raises when the
+    shared tier cannot be reached.
+    """
+    shared = cache.shared_tier()
+    if shared is None:
+        return database.claim_swipe_receipt(room_id, user_id, key)
+    # The claim expires on its own if the request holding it dies
+    return shared.add(_key(room_id, user_id, key), None, database.SWIPE_CLAIM_TIMEOUT)
+
+
+def complete(room_id, user_id, key, movie_id, result):
+    """Store the result of a claimed key's swipe; raises if it could not be stored"""
+    shared = cache.shared_tier()
+    if shared is None:
+        database.complete_swipe_receipt(room_id, user_id, key, movie_id, result)
+    else:
+        shared.put(_key(room_id, user_id, key), result, SWIPE_RECEIPT_TTL)
+
+
+def release(room_id, user_id, keys):
+    """Drop claims on keys whose swipes were not applied, so they can be retried"""
+    shared = cache.shared_tier()
+    if shared is None:
+        database.release_swipe_receipts(room_id, user_id, keys)
+    elif keys:
+        shared.delete([_key(room_id, user_id, key) for key in keys])
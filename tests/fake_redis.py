@@ -0,0 +1,106 @@
+"""In-memory stand-in for the redis-py client methods cache.SharedTier uses"""
+import queue
+import threading
+import time
+
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        with self.server.lock:
+            self.server.subscribers.setdefault(channel, []).append(self.messages)
+
+    def listen(self):
+        while True:
+            message = self.messages.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+
+class FakePipeline:
+    def __init__(self, server):
+        self.server = server
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+        return self
+
+    def execute(self):
+        self.server.calls['pipeline'] += 1
+        for key, ttl, value in self.commands:
+            self.server.set(key, value, ex=ttl, count=False)
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    """Strings with expiry and pub/sub; set `down` to make every call fail like a lost connection"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (bytes value, expires_at or None)
+        self.subscribers = {}
+        self.calls = {'get': 0, 'mget': 0, 'set': 0, 'pipeline': 0, 'delete': 0, 'publish': 0}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError('fake redis is down')
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    def set(self, key, value, nx=False, ex=None, count=True):
+        self._check()
+        if count:
+            self.calls['set'] += 1
+        with self.lock:
+            if nx and self._live(key) is not None:
+                return None
+            self.data[key] = (value.encode() if isinstance(value, str) else value,
+                              time.time() + ex if ex else None)
+            return True
+
+    def get(self, key):
+        self._check()
+        self.calls['get'] += 1
+        with self.lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def mget(self, keys):
+        self._check()
+        self.calls['mget'] += 1
+        with self.lock:
+            return [entry[0] if entry else None for entry in map(self._live, keys)]
+
+    def pipeline(self, transaction=True):
+        self._check()
+        return FakePipeline(self)
+
+    def delete(self, *keys):
+        self._check()
+        self.calls['delete'] += 1
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def publish(self, channel, message):
+        self._check()
+        self.calls['publish'] += 1
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for messages in subscribers:
+            messages.put({'type': 'message', 'channel': channel, 'data': message})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        self._check()
+        return FakePubSub(self)
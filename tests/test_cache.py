@@ -0,0 +1,84 @@
+"""The two cache tiers, invalidation between replicas and the shared tier's circuit breaker"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cache  # noqa: E402
+import resilience  # noqa: E402
+from fake_redis import FakeRedis  # noqa: E402
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    monkeypatch.setattr(cache, '_namespaces', {})
+    monkeypatch.setattr(resilience, '_providers', {})
+    client = FakeRedis()
+    cache.use(client)
+    yield client
+    cache.use(None)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_lookups_batch_into_one_mget_and_writes_into_one_pipeline(redis):
+    ns = cache.namespace('posters', ttl=60)
+    ns.set_many({'a': 1, 'b': [2], 'c': {'x': 3}})
+    assert redis.calls['pipeline'] == 1
+
+    # Another replica has nothing locally and reads everything in one round trip
+    ns.local.delete([ns._key(key) for key in 'abcd'])
+    assert ns.get_many(['a', 'b', 'c', 'd', 'a']) == {'a': 1, 'b': [2], 'c': {'x': 3}}
+    assert redis.calls['mget'] == 1
+
+    # Shared hits are copied into the local tier
+    assert ns.get_many(['a', 'b', 'c']) == {'a': 1, 'b': [2], 'c': {'x': 3}}
+    assert redis.calls['mget'] == 1
+
+
+def test_deletes_are_broadcast_to_every_replica(redis):
+    ns = cache.namespace('posters', ttl=60)
+    ns.set('a', 'old')
+    assert ns.get('a') == 'old'
+
+    # Another replica on the same server changes the entry and invalidates it
+    full_key = ns._key('a')
+    redis.set(full_key, '"new"')
+    assert ns.get('a') == 'old'  # Still served from the local tier
+    cache.SharedTier(redis).delete([full_key])
+
+    assert wait_for(lambda: not ns.local.get_many([full_key]))
+    assert ns.get('a') is None
+    redis.set(full_key, '"new"')
+    assert ns.get('a') == 'new'
+
+
+def test_a_down_shared_tier_turns_into_misses_and_opens_its_circuit(redis, monkeypatch):
+    monkeypatch.setattr(resilience, 'CIRCUIT_MIN_CALLS', 3)
+    ns = cache.namespace('posters', ttl=60)
+    ns.set('a', 1)
+    redis.down = True
+
+    # Writes and deletes swallow the failure; the local tier keeps working
+    ns.set('b', 2)
+    ns.delete('c')
+    assert ns.get('a') == 1
+    assert ns.get('d') is None
+    assert resilience.provider('cache').state()['state'] == 'open'
+
+    # While the circuit is open the server is not called at all
+    redis.down = False
+    redis.set(ns._key('d'), '4')
+    assert ns.get('d') is None
+    assert redis.calls['mget'] == 0
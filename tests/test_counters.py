@@ -0,0 +1,113 @@
+"""Cached per-movie counters with local writes layered on top until the next fetch"""
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import cache  # noqa: E402
+import counters  # noqa: E402
+from counters import CounterCache  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    fake_time = types.SimpleNamespace(time=clock, sleep=time.sleep)
+    monkeypatch.setattr(cache, 'time', fake_time)
+    monkeypatch.setattr(counters, 'time', fake_time)
+    monkeypatch.setattr(cache, '_namespaces', {})
+    cache.use(None)
+    return clock
+
+
+class Backend:
+    """Counts as the backend stores them; on_fetch runs while a fetch is under way"""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.fetches = []
+        self.on_fetch = None
+
+    def __call__(self, movie_ids):
+        self.fetches.append(list(movie_ids))
+        if self.on_fetch:
+            self.on_fetch()
+        return {movie_id: dict(self.counts[movie_id]) for movie_id in movie_ids if movie_id in self.counts}
+
+
+def test_writes_show_until_a_later_fetch_includes_them(clock):
+    backend = Backend({'1': {'likes': 4, 'dislikes': 0, 'watches': 1}})
+    counter_cache = CounterCache(backend, ttl=15)
+    assert counter_cache.get_many(['1', '2']) == {'1': {'likes': 4, 'dislikes': 0, 'watches': 1}}
+
+    clock.now += 1
+    counter_cache.apply_write('1', 'likes', 1)
+    counter_cache.apply_write('1', 'dislikes', -1)  # Never below zero
+    backend.counts['1']['likes'] = 5
+    assert counter_cache.get_many(['1'])['1'] == {'likes': 5, 'dislikes': 0, 'watches': 1}
+    assert len(backend.fetches) == 1
+
+    # A fetch started after the write already counts it, so it is not added twice
+    clock.now += 15
+    assert counter_cache.get_many(['1'])['1'] == {'likes': 5, 'dislikes': 0, 'watches': 1}
+    assert len(backend.fetches) == 2
+    assert counter_cache._pending == {}
+
+
+def test_a_write_during_a_fetch_stays_on_top_of_its_counts(clock):
+    backend = Backend({'1': {'likes': 4}})
+    counter_cache = CounterCache(backend, ttl=15)
+
+    def write_while_fetching():
+        clock.now += 0.5
+        counter_cache.apply_write('1', 'likes', 1)
+
+    backend.on_fetch = write_while_fetching
+    # The backend read may have missed the write, so it is kept until the next fetch
+    assert counter_cache.get_many(['1'])['1'] == {'likes': 5}
+    backend.on_fetch = None
+    clock.now += 1
+    assert counter_cache.get_many(['1'])['1'] == {'likes': 5}
+    assert counter_cache._pending['1'] == [('likes', 1, 1000.5)]
+
+
+def test_concurrent_reads_share_one_fetch(clock):
+    release = threading.Event()
+    backend = Backend({'1': {'likes': 2}})
+    backend.on_fetch = lambda: release.wait(timeout=5)
+    counter_cache = CounterCache(backend)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(counter_cache.get_many(['1'])))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == [{'1': {'likes': 2}}] * 6
+    assert backend.fetches == [['1']]
+
+
+def test_failed_fetches_return_nothing_and_are_retried(clock):
+    backend = Backend({'1': {'likes': 2}})
+    counter_cache = CounterCache(backend)
+    backend.on_fetch = lambda: 1 / 0
+    assert counter_cache.get_many(['1']) == {}
+    backend.on_fetch = None
+    assert counter_cache.get_many(['1']) == {'1': {'likes': 2}}
+    assert len(backend.fetches) == 2
@@ -0,0 +1,42 @@
+"""Idempotency keys of bulk swipes are claimed before their swipes are applied"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'match.db'))
+    database.init_db()
+
+
+def test_a_key_is_claimed_once():
+    assert database.claim_swipe_receipt('room', 'user', 'a')
+    # A concurrent copy of the batch sees the key pending
+    assert not database.claim_swipe_receipt('room', 'user', 'a')
+    assert database.get_swipe_receipts('room', 'user', ['a', 'b']) == {'a': None}
+
+    database.complete_swipe_receipt('room', 'user', 'a', '1', {'movie_id': '1', 'match': False})
+    database.release_swipe_receipts('room', 'user', ['a'])
+    assert not database.claim_swipe_receipt('room', 'user', 'a')
+    assert database.get_swipe_receipts('room', 'user', ['a']) == {'a': {'movie_id': '1', 'match': False}}
+
+
+def test_released_keys_can_be_claimed_again():
+    database.claim_swipe_receipt('room', 'user', 'a')
+    database.release_swipe_receipts('room', 'user', ['a'])
+    assert database.claim_swipe_receipt('room', 'user', 'a')
+
+
+def test_stale_claims_are_taken_over():
+    database.claim_swipe_receipt('room', 'user', 'a')
+    conn = database.get_db_connection()
+    with conn:
+        conn.execute("UPDATE swipe_receipts SET created_at = datetime('now', '-1 hour')")
+    conn.close()
+    assert database.claim_swipe_receipt('room', 'user', 'a')
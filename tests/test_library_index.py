@@ -0,0 +1,64 @@
+"""Snapshot records are built from section listings of the FakePlex benchmark stub"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+pytest.importorskip('plexapi')
+
+import library_index  # noqa: E402
+from stubs import FakePlex  # noqa: E402
+
+
+def test_item_record_does_not_reload_partial_items():
+    from plexapi.server import PlexServer
+
+    plex = FakePlex(library_size=20, seed=3).start()
+    try:
+        items = PlexServer(plex.url, 'test-token').library.section('Movies').all()
+        plex.reset_counts()
+        records = [library_index.item_record(item, 'main') for item in items]
+    finally:
+        plex.stop()
+
+    # The stub lists no original titles; a missing value must not fetch the full item
+    assert plex.total_requests == 0
+    assert records[0]['original_title'] == ''
+    assert records[0]['genres'] == plex.items[0]['genres']
+    assert records[0]['year'] == plex.items[0]['year']
+
+
+def test_matches_follows_snapshot_filtering():
+    record = {'genres': ['Comedy', 'Drama'], 'year': 1994, 'content_rating': 'PG-13', 'duration': 100}
+    assert library_index.matches(record, {})
+    assert library_index.matches(record, {'genre': {'comedy', 'horror'}, 'decade': {'1990'}})
+    assert not library_index.matches(record, {'genre': {'comedy'}, 'rating': {'r'}})
+
+
+def test_first_snapshot_is_built_in_the_background(tmp_path, monkeypatch):
+    import threading
+    monkeypatch.setattr(library_index, 'INDEX_DIR', str(tmp_path))
+    release = threading.Event()
+    record = {'rating_key': 1, 'title': 'Heat', 'original_title': '', 'year': 1995, 'summary': '', 'thumb': '',
+              'duration': 170, 'content_rating': 'R', 'genres': ['Crime'], 'unwatched': True, 'server': 'main'}
+
+    def scan():
+        release.wait(5)
+        return [record]
+
+    with pytest.raises(library_index.SnapshotPending):
+        library_index.get_snapshot(scan, 'token', 'Movies')
+    # Asking again does not start a second scan or wait for the first
+    with pytest.raises(library_index.SnapshotPending):
+        library_index.get_snapshot(scan, 'token', 'Movies')
+    release.set()
+    for _ in range(100):
+        try:
+            snapshot = library_index.get_snapshot(scan, 'token', 'Movies')
+            break
+        except library_index.SnapshotPending:
+            threading.Event().wait(0.05)
+    assert snapshot.record(0)['title'] == 'Heat'
@@ -0,0 +1,77 @@
+"""Partial-agreement ranking of room swipes and its mix with exploration picks"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import matching  # noqa: E402
+
+
+def swipe(user, movie, direction, title=None):
+    return {'user_id': user, 'movie_id': movie, 'movie_title': title or f"Title {movie}",
+            'movie_year': 2000, 'swipe_direction': direction}
+
+
+ROOM_SWIPES = [
+    swipe('ann', '1', 'right'),
+    swipe('bob', '2', 'right'),
+    swipe('ann', '2', 'super'),
+    swipe('bob', '3', 'right'),
+    swipe('cat', '3', 'left'),
+    swipe('bob', '4', 'left'),
+    swipe('cat', '5', 'right'),
+    swipe('ann', '5', 'right'),
+    swipe('bob', '6', 'super'),
+    swipe('dan', '6', 'left'),
+    swipe('dan', '6', 'left'),
+    swipe('dan', '6', 'left'),
+    swipe('dan', '6', 'left'),
+    swipe('dan', '7', 'right'),
+]
+
+
+def test_candidates_rank_by_agreement_then_age():
+    ranked = matching.rank_candidates(ROOM_SWIPES, 'eve')
+    assert [c['id'] for c in ranked] == ['2', '5', '1', '7', '3']
+    assert ranked[0] == {'id': '2', 'title': 'Title 2', 'year': 2000, 'score': 3.0, 'likes': 2, 'first_seen': 1}
+    # 1 and 7 tie on score; 1 was liked first. A dislike lowers 3, four cancel out 6
+    assert ranked[2]['score'] == ranked[3]['score'] == 1.0
+    assert ranked[4]['score'] == 0.5
+
+
+def test_candidates_skip_own_swipes_and_exclusions():
+    ranked = matching.rank_candidates(ROOM_SWIPES, 'ann', exclude={'3'})
+    # Ann swiped 1, 2 and 5; 4 and 6 have no positive balance
+    assert [c['id'] for c in ranked] == ['7']
+    assert matching.rank_candidates([], 'ann') == []
+
+
+class ScriptedRandom:
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def random(self):
+        return self.values.pop(0)
+
+
+def explorer(*picks):
+    remaining = list(picks)
+    return lambda: remaining.pop(0) if remaining else None
+
+
+def test_interleave_follows_the_exploit_ratio():
+    picks = matching.interleave_candidates(['a', 'b'], explorer('x', 'y'), 4, exploit_ratio=0.5,
+                                           rng=ScriptedRandom(0.1, 0.9, 0.2, 0.9))
+    assert picks == [('exploit', 'a'), ('explore', 'x'), ('exploit', 'b'), ('explore', 'y')]
+
+
+def test_interleave_falls_back_when_either_source_runs_out():
+    # No agreement candidates: everything is explored
+    assert matching.interleave_candidates([], explorer('x', 'y'), 3) == [('explore', 'x'), ('explore', 'y')]
+    # Library exhausted: the remaining agreement candidates fill the batch
+    picks = matching.interleave_candidates(['a', 'b', 'c'], explorer(), 2, rng=ScriptedRandom(0.99, 0.99))
+    assert picks == [('exploit', 'a'), ('exploit', 'b')]
+    # The caller's list is left alone
+    exploit = ['a']
+    matching.interleave_candidates(exploit, explorer(), 1, rng=ScriptedRandom(0.0))
+    assert exploit == ['a']
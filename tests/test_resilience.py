@@ -0,0 +1,121 @@
+"""Circuit breaking, adaptive timeouts and rate limits of scraper providers"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import resilience  # noqa: E402
+
+
+def test_background_calls_keep_the_interactive_reserve(monkeypatch):
+    monkeypatch.setattr(resilience, 'BACKGROUND_MAX_WAIT', 0)
+    provider = resilience.Provider('test', rate=0.001, burst=10)
+
+    admitted = 0
+    with resilience.background():
+        for _ in range(10):
+            try:
+                provider.acquire()
+                admitted += 1
+            except resilience.Unavailable:
+                pass
+    assert admitted == 5
+
+    for _ in range(5):
+        provider.acquire()
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setattr(resilience, 'CIRCUIT_WINDOW', 10)
+    monkeypatch.setattr(resilience, 'CIRCUIT_MIN_CALLS', 4)
+    monkeypatch.setattr(resilience, 'CIRCUIT_FAILURE_RATE', 0.5)
+    monkeypatch.setattr(resilience, 'CIRCUIT_COOLDOWN', 0)
+    return resilience.Provider('test')
+
+
+def call(provider, failed, latency=0.01, timeout=5.0):
+    provider.acquire()
+    granted = provider.timeout(timeout)
+    provider.record(failed, latency, timed_out=failed and latency >= granted)
+    return granted
+
+
+def test_circuit_opens_on_the_failure_rate_of_recent_calls(provider, monkeypatch):
+    monkeypatch.setattr(resilience, 'CIRCUIT_COOLDOWN', 60)
+    for failed in [False] * 8 + [True] * 3:
+        call(provider, failed)
+    # 3 failures in a window of 10 stay under the rate
+    assert provider.state()['state'] == 'closed'
+    assert provider.state()['recent_calls'] == 10
+    call(provider, True)
+    call(provider, True)
+    assert provider.state()['state'] == 'open'
+    with pytest.raises(resilience.Unavailable):
+        provider.acquire()
+
+
+def test_half_open_admits_one_probe_whose_outcome_decides(provider):
+    for _ in range(4):
+        call(provider, True)
+    assert provider.state()['state'] == 'open'
+
+    provider.acquire()  # Cooldown over: the probe
+    assert provider.state()['state'] == 'half_open'
+    with pytest.raises(resilience.Unavailable):
+        provider.acquire()
+    provider.record(True, 0.01)
+    assert provider.state()['state'] == 'open'
+
+    call(provider, False)
+    assert provider.state() == {'state': 'closed', 'recent_calls': 0, 'recent_failures': 0}
+
+
+def test_adaptive_timeout_follows_p95(provider):
+    assert call(provider, False) == 5.0  # Too few samples yet
+    for _ in range(20):
+        call(provider, False, latency=0.2)
+    assert provider.timeout(5.0) == pytest.approx(0.6)
+    assert provider.timeout(0.4) == 0.4  # Capped by the call's own timeout
+
+
+def slow_call(provider, latency):
+    """A call to a provider needing latency seconds, cut short by its timeout"""
+    provider.acquire()
+    granted = provider.timeout(5.0)
+    provider.record(latency > granted, min(latency, granted), timed_out=latency > granted)
+    return latency <= granted
+
+
+def test_a_slower_provider_is_not_locked_out(provider):
+    for _ in range(20):
+        slow_call(provider, 0.2)
+    # The provider now needs 1.5 s, over the 0.6 s adaptive timeout
+    outcomes = [slow_call(provider, 1.5) for _ in range(10)]
+    assert not outcomes[0]
+    assert all(outcomes[-5:])
+    assert provider.state()['state'] == 'closed'
+
+
+def test_half_open_probes_get_the_static_timeout(provider):
+    for _ in range(20):
+        call(provider, False, latency=0.2)
+    for _ in range(20):
+        call(provider, True)
+    assert provider.state()['state'] == 'open'
+    provider.acquire()
+    assert provider.timeout(5.0) == 5.0
+    provider.record(False, 1.5)
+    # Latencies from before the circuit opened are dropped
+    assert provider.timeout(5.0) == 5.0
+
+
+def test_timed_out_calls_raise_the_adaptive_timeout(provider):
+    for _ in range(20):
+        call(provider, False, latency=0.2)
+    before = provider.timeout(5.0)
+    call(provider, True, latency=before)
+    call(provider, True, latency=before)
+    assert provider.timeout(5.0) > before
@@ -0,0 +1,73 @@
+"""Random picks issue real listing requests against the FakePlex benchmark stub"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+pytest.importorskip('plexapi')
+
+import sampling  # noqa: E402
+from stubs import FakePlex  # noqa: E402
+
+
+@pytest.fixture
+def section():
+    from plexapi.server import PlexServer
+
+    plex = FakePlex(library_size=50, seed=3).start()
+    try:
+        yield PlexServer(plex.url, 'test-token').library.section('Movies'), plex
+    finally:
+        plex.stop()
+
+
+def test_unwatched_key_is_a_section_path(section):
+    section, _ = section
+    assert sampling._unwatched_key(section).startswith(f"/library/sections/{section.key}/all?")
+
+
+def test_count_unwatched_queries_the_section(section):
+    section, plex = section
+    unwatched = sum(not item['watched'] for item in plex.items)
+    assert sampling.count_unwatched(section) == unwatched
+    assert plex.counts['section_search'] == 1
+
+
+@pytest.mark.parametrize('mode', ['offset', 'random', 'full'])
+def test_sample_unwatched_returns_distinct_unwatched_items(section, mode):
+    section, plex = section
+    picks = sampling.sample_unwatched(section, k=5, mode=mode)
+    keys = [int(item.ratingKey) for item in picks]
+    assert len(keys) == 5
+    assert len(set(keys)) == 5
+    assert not any(plex.by_key[key]['watched'] for key in keys)
+
+
+@pytest.mark.parametrize('mode', ['offset', 'random'])
+def test_sample_unwatched_finds_the_last_items_left(section, mode):
+    section, plex = section
+    unwatched = [str(item['ratingKey']) for item in plex.items if not item['watched']]
+    exclude = set(unwatched[:-2])
+    picks = sampling.sample_unwatched(section, k=2, exclude=exclude, mode=mode)
+    assert sorted(str(item.ratingKey) for item in picks) == sorted(unwatched[-2:])
+
+
+def test_listing_fallback_pages_in_bounded_windows(section, monkeypatch):
+    section, plex = section
+    monkeypatch.setattr(sampling, 'LISTING_WINDOW', 4)
+    unwatched = [str(item['ratingKey']) for item in plex.items if not item['watched']]
+    exclude = set(unwatched[:-3])
+    sizes = []
+    fetch_items = section.fetchItems
+
+    def recording_fetch(key, **kwargs):
+        sizes.append(kwargs.get('container_size'))
+        return fetch_items(key, **kwargs)
+
+    monkeypatch.setattr(section, 'fetchItems', recording_fetch)
+    picks = sampling.sample_unwatched(section, k=1, exclude=exclude, mode='offset')
+    assert len(picks) == 1 and str(picks[0].ratingKey) in unwatched[-3:]
+    assert all(size is not None and size <= 4 for size in sizes)
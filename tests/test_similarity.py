@@ -0,0 +1,87 @@
+"""Neighbour ranking, the PSIM file format and index builds against the FakePlex benchmark stub"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import similarity  # noqa: E402
+
+
+def features(*tags):
+    return {tag: similarity.FEATURE_WEIGHTS[tag.partition(':')[0]] for tag in tags}
+
+
+ITEMS = [
+    (1, features('genre:crime', 'director:mann', 'cast:de niro')),
+    (2, features('genre:crime', 'director:mann', 'cast:pacino')),
+    (3, features('genre:crime', 'cast:de niro')),
+    (4, features('genre:comedy', 'cast:pacino')),
+    (5, features('genre:comedy', 'director:mann')),
+    (6, features('genre:western', 'cast:eastwood')),
+]
+
+
+def test_neighbours_rank_by_shared_weighted_features():
+    neighbours = similarity.build_neighbours(ITEMS, k=3)
+    ranked = [key for key, _ in neighbours[1]]
+    # Titles sharing nothing never show up; sharing director and genre beats sharing the director
+    assert set(ranked) == {2, 3, 5}
+    assert ranked.index(2) < ranked.index(5)
+    scores = [score for _, score in neighbours[1]]
+    assert scores == sorted(scores, reverse=True)
+    # Cosine similarity is symmetric
+    assert dict(neighbours[2])[1] == pytest.approx(dict(neighbours[1])[2])
+    # Tags only one title has carry no signal
+    assert neighbours[6] == []
+
+
+def test_index_file_round_trip(tmp_path):
+    neighbours = similarity.build_neighbours(ITEMS, k=3)
+    metadata = {key: {'title': f"Title {key}", 'year': 1990 + key, 'poster_url': ''} for key, _ in ITEMS}
+    path = str(tmp_path / 'similarity_movies.idx')
+    similarity.write_index(path, neighbours, metadata, k=3)
+
+    index = similarity.SimilarityIndex(path)
+    assert index.count == len(ITEMS)
+    results = index.neighbours(1, limit=3)
+    assert [entry['id'] for entry in results] == [str(key) for key, _ in neighbours[1]]
+    assert results[0]['title'] == f"Title {neighbours[1][0][0]}"
+    assert results[0]['score'] == pytest.approx(neighbours[1][0][1], abs=1e-4)
+
+    excluded = str(neighbours[1][0][0])
+    assert [entry['id'] for entry in index.neighbours(1, exclude={excluded}, limit=1)] == [str(neighbours[1][1][0])]
+    assert index.neighbours(99) == []
+
+
+def test_build_index_reads_full_tag_lists(tmp_path, monkeypatch):
+    pytest.importorskip('plexapi')
+    from plexapi.server import PlexServer
+    from stubs import LISTING_ROLES, FakePlex
+
+    monkeypatch.setattr(similarity, 'INDEX_DIR', str(tmp_path))
+    monkeypatch.setattr(similarity, 'METADATA_BATCH', 16)
+    built = {}
+    build_neighbours = similarity.build_neighbours
+
+    def capture(items, k):
+        built.update(items)
+        return build_neighbours(items, k)
+
+    monkeypatch.setattr(similarity, 'build_neighbours', capture)
+    plex = FakePlex(library_size=40, seed=3).start()
+    try:
+        server = PlexServer(plex.url, 'test-token')
+        plex.reset_counts()
+        path, count = similarity.build_index(server, 'Movies')
+    finally:
+        plex.stop()
+
+    assert count == 40
+    # One listing, then full items in batches rather than one request per title
+    assert plex.counts['metadata'] == 3
+    item = next(item for item in plex.items if len(item['cast']) > LISTING_ROLES)
+    assert f"cast:{item['cast'][LISTING_ROLES].lower()}" in built[item['ratingKey']]
+    assert similarity.SimilarityIndex(path).count == 40
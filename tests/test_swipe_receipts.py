@@ -0,0 +1,49 @@
+"""Bulk swipe receipts are claimed in the shared tier when there is one"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import cache  # noqa: E402
+import database  # noqa: E402
+import resilience  # noqa: E402
+import swipe_receipts  # noqa: E402
+from fake_redis import FakeRedis  # noqa: E402
+
+
+@pytest.fixture
+def redis(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'match.db'))
+    database.init_db()
+    monkeypatch.setattr(resilience, '_providers', {})
+    client = FakeRedis()
+    cache.use(client)
+    yield client
+    cache.use(None)
+
+
+def test_a_claim_in_the_shared_tier_is_seen_by_every_replica(redis):
+    assert swipe_receipts.claim('room', 'user', 'a')
+    # Another replica (same server, no local state) finds the claim
+    assert not swipe_receipts.claim('room', 'user', 'a')
+    assert swipe_receipts.lookup('room', 'user', ['a', 'b']) == {'a': None}
+
+    swipe_receipts.complete('room', 'user', 'a', '1', {'movie_id': '1', 'match': True})
+    assert swipe_receipts.lookup('room', 'user', ['a']) == {'a': {'movie_id': '1', 'match': True}}
+    # Nothing went to the local file
+    assert database.get_swipe_receipts('room', 'user', ['a']) == {}
+
+
+def test_released_claims_can_be_retried(redis):
+    swipe_receipts.claim('room', 'user', 'a')
+    swipe_receipts.release('room', 'user', ['a'])
+    assert swipe_receipts.claim('room', 'user', 'a')
+
+
+def test_claims_fail_loudly_when_the_shared_tier_is_down(redis):
+    redis.down = True
+    with pytest.raises(ConnectionError):
+        swipe_receipts.claim('room', 'user', 'a')
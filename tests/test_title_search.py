@@ -0,0 +1,51 @@
+"""Title search over a snapshot file written from generated records"""
+import gc
+import os
+import sys
+import weakref
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import library_index  # noqa: E402
+import title_search  # noqa: E402
+
+TITLES = [('The Lord of the Rings', '', 2001), ('Amélie', 'Le Fabuleux Destin d\'Amélie Poulain', 2001),
+          ('Spirited Away', 'Sen to Chihiro no Kamikakushi', 2001), ('Lord of War', '', 2005)]
+
+
+def write_snapshot(tmp_path):
+    records = [{'rating_key': i + 1, 'title': title, 'original_title': original, 'year': year,
+                'summary': '', 'thumb': '', 'duration': 120, 'content_rating': 'PG', 'genres': [],
+                'unwatched': True, 'server': 'main'}
+               for i, (title, original, year) in enumerate(TITLES)]
+    path = str(tmp_path / 'library.idx')
+    library_index.write_snapshot(path, records)
+    return library_index.LibrarySnapshot(path)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    return write_snapshot(tmp_path)
+
+
+def titles(snapshot, query):
+    return [snapshot.record(i)['title'] for i, _ in title_search.get_index(snapshot).search(query)]
+
+
+def test_search_matches_prefixes_typos_and_original_titles(snapshot):
+    assert titles(snapshot, 'lord of the')[0] == 'The Lord of the Rings'
+    assert titles(snapshot, 'lrod')[:2] == ['Lord of War', 'The Lord of the Rings']
+    assert titles(snapshot, 'amelie') == ['Amélie']
+    assert titles(snapshot, 'kamikak') == ['Spirited Away']
+    assert titles(snapshot, '2005') == ['Lord of War']
+
+
+def test_index_does_not_keep_its_snapshot_alive(tmp_path):
+    snapshot = write_snapshot(tmp_path)
+    title_search.get_index(snapshot)
+    ref = weakref.ref(snapshot)
+    del snapshot
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,126 @@
+"""Cached Plex token verification and the per-client throttle on rejected logins"""
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import cache  # noqa: E402
+import token_verification  # noqa: E402
+from token_verification import FailureThrottle, TokenVerifier  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    fake_time = types.SimpleNamespace(time=clock, monotonic=clock, sleep=time.sleep)
+    monkeypatch.setattr(cache, 'time', fake_time)
+    monkeypatch.setattr(token_verification, 'time', fake_time)
+    monkeypatch.setattr(cache, '_namespaces', {})
+    cache.use(None)
+    return clock
+
+
+class Plex:
+    """Answers token checks, optionally holding every answer until released"""
+
+    def __init__(self, valid=('good',)):
+        self.valid = set(valid)
+        self.calls = 0
+        self.down = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, plex_token, plex_url):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        if self.down:
+            raise ConnectionError('Plex is down')
+        return plex_token in self.valid
+
+
+def test_answers_are_cached_for_their_ttl(clock):
+    plex = Plex()
+    verifier = TokenVerifier(plex, ttl=60, invalid_ttl=10)
+
+    assert verifier.verify('good', 'http://plex') is True
+    assert verifier.verify('bad', 'http://plex') is False
+    assert verifier.verify('good', 'http://plex') is True
+    assert verifier.verify('bad', 'http://plex') is False
+    assert plex.calls == 2
+    assert verifier.is_known_valid('good', 'http://plex')
+    # The same token for another server is a different entry
+    assert not verifier.is_known_valid('good', 'http://other')
+
+    clock.now += 11
+    assert verifier.verify('bad', 'http://plex') is False
+    assert plex.calls == 3  # Rejections expire first
+    clock.now += 50
+    assert verifier.verify('good', 'http://plex') is True
+    assert plex.calls == 4
+
+
+def test_an_unreachable_plex_is_not_cached(clock):
+    plex = Plex()
+    verifier = TokenVerifier(plex)
+    plex.down = True
+    assert verifier.verify('good', 'http://plex') is None
+    plex.down = False
+    assert verifier.verify('good', 'http://plex') is True
+    assert plex.calls == 2
+
+
+def test_concurrent_verifications_of_a_token_share_one_check(clock):
+    plex = Plex()
+    plex.release.clear()
+    verifier = TokenVerifier(plex)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(verifier.verify('good', 'http://plex')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    plex.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == [True] * 8
+    assert plex.calls == 1
+
+
+def test_throttle_counts_failures_in_a_sliding_window(clock):
+    throttle = FailureThrottle(limit=3, window=60)
+    for _ in range(2):
+        throttle.record_failure('10.0.0.1')
+        clock.now += 10
+    assert throttle.retry_after('10.0.0.1') == 0
+
+    throttle.record_failure('10.0.0.1')
+    # Throttled until the oldest of the last three failures (20 s ago) leaves the window
+    assert throttle.retry_after('10.0.0.1') == 40
+    assert throttle.retry_after('10.0.0.2') == 0
+    clock.now += 39.5
+    assert throttle.retry_after('10.0.0.1') == 1
+    clock.now += 0.5
+    assert throttle.retry_after('10.0.0.1') == 0
+
+
+def test_throttle_forgets_the_least_recent_clients(clock):
+    throttle = FailureThrottle(limit=1, window=60, max_clients=2)
+    for client in ('a', 'b', 'c'):
+        throttle.record_failure(client)
+    assert throttle.retry_after('a') == 0
+    assert throttle.retry_after('b') == 60
+    assert throttle.retry_after('c') == 60
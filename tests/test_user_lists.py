@@ -0,0 +1,48 @@
+"""Streaming pages out of backend list bodies"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import user_lists  # noqa: E402
+
+
+def chunked(data, size):
+    body = json.dumps(data).encode('utf-8')
+    return body, [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('size', [1, 7, 4096])
+def test_read_page_streams_a_page_out_of_an_object(size):
+    data = {'total': 3, 'note': {'nested': [1, 2]}, 'watchlist': [{'id': i, 'title': f"Film é {i}"} for i in range(25)]}
+    body, chunks = chunked(data, size)
+    page = user_lists.read_page(chunks, offset=10, limit=5, keep_max=len(body))
+    assert page['items_key'] == 'watchlist'
+    assert page['page'] == data['watchlist'][10:15]
+    assert page['total'] == 25
+    assert page['items'] == data['watchlist']
+    assert page['etag'] == user_lists.make_etag(body)
+
+
+def test_read_page_drops_the_full_list_of_large_bodies():
+    body, chunks = chunked([12345, 678, 9] * 100, 5)
+    page = user_lists.read_page(chunks, offset=0, limit=3, keep_max=100)
+    assert page['items_key'] == 'items'
+    assert page['page'] == [12345, 678, 9]
+    assert page['total'] == 300
+    assert page['items'] is None
+
+
+def test_read_page_rejects_truncated_lists():
+    body, _ = chunked({'history': [1, 2, 3]}, 1)
+    with pytest.raises(ValueError):
+        user_lists.read_page([body[:-3]], offset=0, limit=2)
+
+
+def test_cursor_records_the_list_version():
+    etag = user_lists.make_etag(b'[1, 2, 3]')
+    offset, version = user_lists.decode_cursor(user_lists.encode_cursor(2, etag))
+    assert (offset, version) == (2, user_lists.list_version(etag))
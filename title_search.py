@@ -0,0 +1,200 @@
+import heapq
+import re
+import threading
+import unicodedata
+import weakref
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+# Results a typeahead query returns at most
+MAX_SEARCH_RESULTS = 20
+
+# Vocabulary words a one- or two-letter prefix expands to at most
+MAX_PREFIX_WORDS = 300
+
+# Scores of a query word matching a title word exactly, by prefix, or with a typo
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+TYPO_SCORE = 0.6
+
+_WORD = re.compile(r'\w+')
+
+_indexes = weakref.WeakKeyDictionary()  # LibrarySnapshot -> TitleIndex
+_lock = threading.Lock()
+
+
+def normalize(text):
+    """Lowercase words of a title, ignoring accents and punctuation"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return _WORD.findall(''.join(ch for ch in text if not unicodedata.combining(ch)).casefold())
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def typo_limit(length):
+    """Edits a query word of a given length may be away from a title word"""
+    return 0 if length < 4 else 1 if length < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """Edit distance counting a swap of neighbouring letters as one edit, or limit + 1 once past limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class TitleIndex:
+    """
+    Typeahead index over the titles, original titles and years of a library
+    snapshot.
+
+    Title words form a sorted vocabulary with the positions of the items
+    using each word, so a query word is matched by prefix with two bisects.
+    Typos are found through indexes over the vocabulary rather than the
+    titles: single-letter deletions (for short words and swapped letters)
+    and trigrams (for longer words), confirmed with an edit distance.
+    Every query word has to match; items are ranked by how well they do.
+    """
+
+    def __init__(self, snapshot):
+        # No reference to the snapshot is kept: indexes are cached weakly by snapshot
+        postings = defaultdict(set)
+        self._title_words = []
+        for i, (title, original_title, year) in enumerate(snapshot.titles()):
+            words = normalize(title)
+            self._title_words.append(words)
+            for word in words + normalize(original_title):
+                postings[word].add(i)
+            if year:
+                postings[str(year)].add(i)
+
+        self.vocabulary = sorted(postings)
+        self._postings = [array('I', sorted(postings[word])) for word in self.vocabulary]
+        self._deletions = defaultdict(list)
+        self._trigrams = defaultdict(list)
+        for word_id, word in enumerate(self.vocabulary):
+            if word.isdigit() or not typo_limit(len(word) + 1):
+                continue
+            for deletion in _deletions(word):
+                self._deletions[deletion].append(word_id)
+            for gram in _trigrams(word):
+                self._trigrams[gram].append(word_id)
+
+    def _word_id(self, word):
+        i = bisect_left(self.vocabulary, word)
+        return i if i < len(self.vocabulary) and self.vocabulary[i] == word else None
+
+    def _typo_candidates(self, word, limit):
+        candidates = set()
+        for variant in _deletions(word) | {word}:
+            # Title words one deletion away, or with a letter more or less than the query word
+            candidates.update(self._deletions.get(variant, ()))
+            word_id = self._word_id(variant)
+            if word_id is not None:
+                candidates.add(word_id)
+        if limit > 1:
+            grams = _trigrams(word)
+            # Each edit breaks at most three trigrams
+            needed = max(1, len(grams) - 3 * limit)
+            shared = defaultdict(int)
+            for gram in grams:
+                for word_id in self._trigrams.get(gram, ()):
+                    shared[word_id] += 1
+            candidates.update(word_id for word_id, count in shared.items() if count >= needed)
+        return candidates
+
+    def _word_scores(self, word, prefix):
+        """{vocabulary id: score} of the title words a query word matches"""
+        scores = {}
+        word_id = self._word_id(word)
+        if word_id is not None:
+            scores[word_id] = EXACT_SCORE
+        if prefix:
+            start = bisect_left(self.vocabulary, word)
+            end = bisect_left(self.vocabulary, word + '\U0010ffff')
+            if len(word) < 3:
+                end = min(end, start + MAX_PREFIX_WORDS)
+            for word_id in range(start, end):
+                scores.setdefault(word_id, PREFIX_SCORE)
+
+        limit = typo_limit(len(word))
+        if limit and not word.isdigit():
+            for word_id in self._typo_candidates(word, limit):
+                if word_id in scores:
+                    continue
+                candidate = self.vocabulary[word_id]
+                distance = edit_distance(word, candidate, limit)
+                if prefix and distance > limit and len(candidate) > len(word):
+                    # A typo in a word that is still being typed
+                    distance = edit_distance(word, candidate[:len(word)], limit)
+                if distance <= limit:
+                    scores[word_id] = TYPO_SCORE - 0.1 * distance
+        return scores
+
+    def search(self, query, limit=MAX_SEARCH_RESULTS, mask=None):
+        """
+        Return up to limit (position, score) pairs for a query, best first.
+        The last query word matches by prefix (it may still be typed); a mask
+        restricts results to its items, e.g. unwatched ones.
+        """
+        words = normalize(query)
+        if not words:
+            return []
+        totals = None
+        for n, word in enumerate(words):
+            best = {}
+            for word_id, score in self._word_scores(word, prefix=n == len(words) - 1).items():
+                for i in self._postings[word_id]:
+                    if best.get(i, 0) < score:
+                        best[i] = score
+            if totals is None:
+                totals = best
+            else:
+                totals = {i: totals[i] + score for i, score in best.items() if i in totals}
+            if not totals:
+                return []
+
+        if mask is not None:
+            totals = {i: score for i, score in totals.items() if mask >> i & 1}
+
+        def rank(item):
+            i, score = item
+            title_words = self._title_words[i]
+            # Titles starting with the query come first, then shorter (closer) titles
+            starts = title_words[:len(words) - 1] == words[:-1] and bool(title_words) and \
+                len(title_words) >= len(words) and title_words[len(words) - 1].startswith(words[-1])
+            return score + (0.5 if starts else 0.0) - 0.01 * len(title_words)
+
+        return [(i, round(rank((i, score)), 3))
+                for i, score in heapq.nlargest(limit, totals.items(), key=rank)]
+
+
+def get_index(snapshot):
+    """The title index of a snapshot, built on first use; a refreshed snapshot gets a new one"""
+    index = _indexes.get(snapshot)
+    if index is None:
+        with _lock:
+            index = _indexes.get(snapshot)
+            if index is None:
+                index = _indexes[snapshot] = TitleIndex(snapshot)
+    return index
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import cache
+
+# Seconds a Plex token that Plex accepted is trusted before /auth/plex asks Plex again
+VERIFIED_TOKEN_TTL = int(os.getenv("VERIFIED_TOKEN_TTL", "3600"))
+
+# Seconds a token Plex rejected is answered with 401 without asking Plex again
+INVALID_TOKEN_TTL = int(os.getenv("INVALID_TOKEN_TTL", "60"))
+
+# Tokens of each kind kept in this process (the shared cache tier holds them for all replicas)
+MAX_CACHED_TOKENS = int(os.getenv("MAX_CACHED_TOKENS", "1024"))
+
+# Clients sending this many rejected tokens within the window get 429 until the oldest falls out
+AUTH_FAILURE_LIMIT = int(os.getenv("AUTH_FAILURE_LIMIT", "5"))
+AUTH_FAILURE_WINDOW = int(os.getenv("AUTH_FAILURE_WINDOW", "60"))
+MAX_THROTTLED_CLIENTS = 4096
+
+# Seconds a request waits for a verification of the same token already under way
+VERIFY_WAIT_TIMEOUT = 15
+
+
+def token_key(plex_token, plex_url):
+    """Cache key of a token for a server; the token itself is never stored"""
+    return hashlib.sha256(f"{plex_url}\0{plex_token}".encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class TokenVerifier:
+    """
+    Remembers which Plex tokens Plex accepted or rejected, so repeated logins
+    cost no handshake. Only an explicit rejection is cached as invalid; when
+    Plex cannot be reached the answer is None and nothing is cached. A token
+    arriving while the same token is being verified waits for that answer.
+
+    check(plex_token, plex_url) returns True or False for tokens Plex accepted
+    or rejected and raises when Plex could not answer.
+    """
+
+    def __init__(self, check, ttl=VERIFIED_TOKEN_TTL, invalid_ttl=INVALID_TOKEN_TTL,
+                 max_entries=MAX_CACHED_TOKENS):
+        self.check = check
+        self._valid = cache.namespace('verified_tokens', ttl=ttl, max_local=max_entries)
+        self._invalid = cache.namespace('invalid_tokens', ttl=invalid_ttl, max_local=max_entries)
+        self._inflight = {}  # token key -> _Flight
+        self._lock = threading.Lock()
+
+    def is_known_valid(self, plex_token, plex_url):
+        return self._valid.get(token_key(plex_token, plex_url)) is not None
+
+    def verify(self, plex_token, plex_url):
+        """True if Plex accepts the token, False if it rejects it, None if Plex could not be asked"""
+        key = token_key(plex_token, plex_url)
+        if self._valid.get(key) is not None:
+            return True
+        if self._invalid.get(key) is not None:
+            return False
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait(timeout=VERIFY_WAIT_TIMEOUT)
+            return flight.result
+
+        try:
+            flight.result = bool(self.check(plex_token, plex_url))
+            (self._valid if flight.result else self._invalid).set(key, 1)
+        except Exception as e:
+            print(f"Failed to verify Plex token: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+        return flight.result
+
+
+class FailureThrottle:
+    """Sliding-window count of rejected logins per client, bounded to the most recent clients"""
+
+    def __init__(self, limit=AUTH_FAILURE_LIMIT, window=AUTH_FAILURE_WINDOW, max_clients=MAX_THROTTLED_CLIENTS):
+        self.limit = limit
+        self.window = window
+        self.max_clients = max_clients
+        self._failures = OrderedDict()  # client -> deque of failure times
+        self._lock = threading.Lock()
+
+    def _recent(self, client, now):
+        failures = self._failures.get(client)
+        if failures is None:
+            return None
+        while failures and now - failures[0] >= self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[client]
+            return None
+        return failures
+
+    def retry_after(self, client):
+        """Seconds until a client may try again, or 0 if it is not throttled"""
+        if not self.limit:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(client, now)
+            if failures is None or len(failures) < self.limit:
+                return 0
+            return max(1, int(failures[-self.limit] + self.window - now + 0.999))
+
+    def record_failure(self, client):
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(client, now)
+            if failures is None:
+                failures = self._failures[client] = deque(maxlen=max(self.limit, 1))
+            failures.append(now)
+            self._failures.move_to_end(client)
+            while len(self._failures) > self.max_clients:
+                self._failures.popitem(last=False)
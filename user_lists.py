@@ -0,0 +1,227 @@
+import base64
+import codecs
+import hashlib
+import json
+import os
+
+import cache
+
+# How long a user's watchlist/history ETag (and parsed pages) are trusted without asking the backend
+USER_LIST_TTL = int(os.getenv("USER_LIST_TTL", "60"))
+
+# Users whose lists are cached; least recently used ones are dropped first
+MAX_USER_LISTS = int(os.getenv("MAX_USER_LISTS", "64"))
+
+# Bodies up to this size are buffered to compute an ETag; larger ones are streamed through untagged
+USER_LIST_BUFFER_MAX = int(os.getenv("USER_LIST_BUFFER_MAX", str(1024 * 1024)))
+
+MAX_PAGE_SIZE = 200
+
+
+def user_key(jwt_token):
+    """Stable, non-reversible identifier for a backend JWT"""
+    return hashlib.sha256(jwt_token.encode('utf-8')).hexdigest()[:32]
+
+
+def make_etag(data):
+    """Strong ETag for a body (or any bytes/str that identifies a representation)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header covers an ETag"""
+    if not if_none_match or not etag:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or any(value.removeprefix('W/') == etag for value in candidates)
+
+
+def list_version(etag):
+    """Short form of a list's ETag stored in its cursors"""
+    return etag.strip('"')[:12]
+
+
+def encode_cursor(offset, etag):
+    payload = json.dumps({'o': offset, 'v': list_version(etag)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (offset, version) from a cursor; raises ValueError for malformed ones"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(payload['o'])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset, payload.get('v', '')
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _TextStream:
+    """Decoded text of a byte stream, read into a buffer as far as needed"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder('utf-8')().decode
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """Append the next chunk; False once the stream is exhausted"""
+        if self.eof:
+            return False
+        if self.pos > 64 * 1024:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            self.buffer += self._decode(b'', final=True)
+            return False
+        self.buffer += self._decode(chunk)
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (without consuming it), or '' at the end"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.more():
+                return ''
+
+    def value(self):
+        """Decode the next JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise ValueError("Truncated or invalid JSON list")
+            # A number ending at the buffer's end may continue in the next chunk
+            if end == len(self.buffer) and self.more():
+                continue
+            self.pos = end
+            return value
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError("Invalid JSON list")
+        self.pos += 1
+        return char
+
+
+def iter_list_items(chunks):
+    """
+    Yield the key of the list inside a backend response body ("items" for a
+    bare array, else the first key holding an array) and then its items,
+    decoding one item at a time, so memory is bounded by the largest item
+    rather than the body.
+    """
+    stream = _TextStream(chunks)
+    start = stream.expect('[{')
+    if start == '{':
+        while True:
+            if stream.peek() == '}':
+                yield 'items'
+                return
+            key = stream.value()
+            stream.expect(':')
+            if stream.peek() == '[':
+                stream.expect('[')
+                break
+            stream.value()  # Not a list: skip it
+            if stream.expect(',}') == '}':
+                yield 'items'
+                return
+    else:
+        key = 'items'
+
+    yield key
+    if stream.peek() == ']':
+        return
+    while True:
+        yield stream.value()
+        if stream.expect(',]') == ']':
+            return
+
+
+def read_page(chunks, offset, limit, keep_max=USER_LIST_BUFFER_MAX):
+    """
+    Stream a backend list body and return dict(etag, items_key, page, total,
+    items). Only the requested page is kept, plus every item (for caching)
+    while the body read so far is at most keep_max bytes; items is None for
+    larger bodies.
+    """
+    chunks = iter(chunks)
+    digest = hashlib.sha256()
+    size = 0
+
+    def tracked():
+        nonlocal size
+        for chunk in chunks:
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    items_iter = iter_list_items(tracked())
+    items_key = next(items_iter)
+    page = []
+    items = []
+    total = 0
+    for item in items_iter:
+        if offset <= total < offset + limit:
+            page.append(item)
+        if items is not None:
+            items.append(item)
+            if size > keep_max:
+                items = None
+        total += 1
+    for _ in tracked():
+        pass  # Hash anything after the list, so the ETag matches the whole body
+    if size > keep_max:
+        items = None
+    return {'etag': f'"{digest.hexdigest()[:32]}"', 'items_key': items_key,
+            'page': page, 'total': total, 'items': items}
+
+
+class UserListCache:
+    """Per-user ETags, and parsed items once a page was asked for, with a short TTL"""
+
+    def __init__(self, ttl=USER_LIST_TTL, max_entries=MAX_USER_LISTS):
+        # (user, path) -> dict(etag, items_key, items), shared by all replicas
+        self._entries = cache.namespace('user_lists', ttl=ttl, max_local=max_entries)
+
+    @staticmethod
+    def _key(key):
+        user, path = key
+        return f"{user}:{path}"
+
+    def get(self, key):
+        """Fresh entry for a key, or None"""
+        return self._entries.get(self._key(key))
+
+    def put(self, key, etag, items_key=None, items=None):
+        if items is None:
+            old = self._entries.get(self._key(key))
+            if old is not None and old['etag'] == etag:
+                # Same representation as before, so the parsed items are still valid
+                items_key, items = old['items_key'], old['items']
+        self._entries.set(self._key(key), {'etag': etag, 'items_key': items_key, 'items': items})
+
+    def invalidate(self, user, *paths):
+        """Drop a user's lists on every replica, e.g. after they changed them"""
+        self._entries.delete(*(self._key((user, path)) for path in paths))